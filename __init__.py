@@ -27,5 +27,6 @@ MDST_LOGGER = logging.getLogger('md_spine_tools')
 
 try:
     from .mdst_ui import register, unregister
+    from .mdst_api import ImportOptions, ImportResult, import_spine
 except Exception:
     traceback.print_exc()
@@ -0,0 +1,79 @@
+import time
+
+from . import MDST_LOGGER
+from .mdst_bake import bake_constraints
+from .mdst_io import delete_helper, imported_actions, load_animation, load_skeleton, load_spine, reduce_actions
+
+
+###
+# Function level import for scripts and `blender --background`, no panel, Text datablock or window involved.
+# ImportOptions carries the same fields as the MDSTSpine property group, load_spine and load_animation read either.
+# spine_path / atlas_path are files on disk, animation None picks the last animation as the panel does.
+class ImportOptions:
+    defaults = {
+        'spine_ref': None,
+        'spine_path': '',
+        'atlas_ref': None,
+        'atlas_path': '',
+        'layer_gap': -0.01,
+        'chk_auto_load_animation': True,
+        'chk_alternative_mesh': True,
+        'chk_separate_material': True,
+        'chk_pool_material': False,
+        'merge_mode': 'NONE',
+        'clipping_mode': 'GEOMETRY',
+        'chk_create_static_action': True,
+        'chk_import_all_animations': False,
+        'chk_bake_constraints': False,
+        'chk_reduce_keys': False,
+        'reduce_tolerance': 0.001,
+        'armature_constrain': True,
+        'animation': None,
+        # remove existing objects, meshes, materials, actions... like the Load Spine button
+        'clear_scene': True,
+    }
+
+    def __init__(self, **options):
+        for k, v in self.defaults.items():
+            setattr(self, k, v)
+        for k, v in options.items():
+            if k not in self.defaults:
+                raise TypeError(f'Unknown import option: {k}')
+            setattr(self, k, v)
+
+
+class ImportResult:
+    def __init__(self, armature_control, armature, meshes, action, actions, elapsed):
+        self.armature_control = armature_control
+        self.armature = armature
+        self.meshes = meshes
+        # the rootControl action of the loaded animation, actions also holds the static and per slot actions
+        self.action = action
+        self.actions = actions
+        self.elapsed = elapsed
+
+
+def import_spine(spine_path, atlas_path, options=None):
+    options = options or ImportOptions()
+    options.spine_ref, options.spine_path = None, str(spine_path)
+    options.atlas_ref, options.atlas_path = None, str(atlas_path)
+
+    start = time.perf_counter()
+    if options.clear_scene:
+        delete_helper(['objects', 'armatures', 'meshes', 'curves', 'materials', 'actions', 'collections'])
+
+    armature_control, armature, meshes = load_spine(options)
+
+    action = None
+    # load_animation falls back to the last animation when none is named
+    if options.chk_auto_load_animation and load_skeleton(options).animation_names:
+        action = load_animation(options)
+        if options.chk_bake_constraints:
+            bake_constraints(options)
+        if options.chk_reduce_keys:
+            reduce_actions(options.reduce_tolerance)
+    actions = imported_actions() if action else []
+
+    elapsed = time.perf_counter() - start
+    MDST_LOGGER.info(f'Imported {spine_path} in {elapsed:.2f}s, {len(meshes)} meshes')
+    return ImportResult(armature_control, armature, meshes, action, actions, elapsed)
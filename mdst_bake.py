@@ -0,0 +1,755 @@
+import math
+
+import bpy
+import numpy as np
+
+from . import MDST_LOGGER
+from .mdst_io import TRANSFORM_MODES, Bone, FCurveKeys, Skeleton, _inherit, load_skeleton, load_vertex, skin_vertices, write_fcurve
+
+
+###
+# Constraint baking: Spine's IK, transform and path constraint solvers run in python for every frame of an action,
+#   the constrained bones get their resulting local transforms as plain keys and the live Blender constraints
+#   (IK, COPY_LOCATION, COPY_ROTATION, SPLINE_IK) and hooked path curves are removed from both armatures.
+# Bone timelines are read back from the rootControl f-curves, so the bake follows exactly what is played.
+# Constraint timelines (ik, transform, path) are sampled from the skeleton with spine's curves.
+# Solvers follow spine-runtimes 4.0 (IkConstraint, TransformConstraint, PathConstraint), skeleton at the origin, scale 1.
+EPSILON = 0.00001
+BAKED_CONSTRAINTS = {'IK', 'COPY_LOCATION', 'COPY_ROTATION', 'SPLINE_IK'}
+
+# pose bone channel, index, Skeleton local column, blender to spine, spine to blender
+CHANNELS = [
+    ('location', 1, 0, float, float),
+    ('location', 2, 1, float, float),
+    ('rotation_euler', 0, 2, math.degrees, math.radians),
+    ('scale', 1, 3, float, float),
+    ('scale', 2, 4, float, float),
+]
+
+
+def _wrap(degrees):
+    if degrees > 180:
+        return degrees - 360
+    if degrees < -180:
+        return degrees + 360
+    return degrees
+
+
+def _wrap_radians(r):
+    if r > math.pi:
+        return r - 2 * math.pi
+    if r < -math.pi:
+        return r + 2 * math.pi
+    return r
+
+
+def _cubic(p0, p1, p2, p3, s):
+    u = 1 - s
+    return u * u * u * p0 + 3 * u * u * s * p1 + 3 * u * s * s * p2 + s * s * s * p3
+
+
+# key fields missing in the file take defaults, linked: (field, source) pairs defaulting to another field like mixY to mixX
+def fill_keys(keys, defaults, linked=()):
+    filled = []
+    for key in keys:
+        full = dict(defaults, **key)
+        for field, source in linked:
+            if field not in key:
+                full[field] = full[source]
+        filled.append(full)
+    return filled
+
+
+# value of one timeline channel at time (seconds), bezier curves hold cx1, cy1, cx2, cy2 per channel
+# before the first key the constraint keeps its setup value
+def sample(keys, time, field, setup, channel=0):
+    if not keys or time < keys[0].get('time', 0):
+        return setup
+    for key, next_key in zip(keys, keys[1:]):
+        t1 = next_key.get('time', 0)
+        if time >= t1:
+            continue
+        t0, v0, v1 = key.get('time', 0), key[field], next_key[field]
+        curve = key.get('curve')
+        if curve == 'stepped' or isinstance(v0, bool):
+            return v0
+        if isinstance(curve, list):
+            cx1, cy1, cx2, cy2 = curve[channel * 4:channel * 4 + 4]
+            low, high = 0.0, 1.0
+            for _ in range(24):
+                s = (low + high) / 2
+                if _cubic(t0, cx1, cx2, t1, s) < time:
+                    low = s
+                else:
+                    high = s
+            return _cubic(v0, cy1, cy2, v1, (low + high) / 2)
+        return v0 + (v1 - v0) * (time - t0) / (t1 - t0)
+    return keys[-1][field]
+
+
+###
+# Applied local (Skeleton local columns) and world transforms of every bone for one frame.
+# set_local is spine's updateWorldTransform for one bone, set_world its updateAppliedTransform,
+#   update re-solves the whole hierarchy so children follow the bones a constraint changed.
+class Pose:
+    def __init__(self, skeleton, local):
+        self.skeleton = skeleton
+        self.local = np.array(local, dtype=float)
+        self.update()
+
+    def update(self):
+        self.world = self.skeleton.solve(self.local)
+
+    def parent_world(self, idx):
+        parent = self.skeleton.parent[idx]
+        return self.world[parent].tolist() if parent >= 0 else [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+
+    def mode(self, idx):
+        return TRANSFORM_MODES[self.skeleton.mode[idx]]
+
+    def set_local(self, idx, x, y, rotation, scale_x, scale_y, shear_x, shear_y):
+        self.local[idx] = x, y, rotation, scale_x, scale_y, shear_x, shear_y
+        rx, ry = math.radians(rotation + shear_x), math.radians(rotation + 90 + shear_y)
+        la, lb = math.cos(rx) * scale_x, math.cos(ry) * scale_y
+        lc, ld = math.sin(rx) * scale_x, math.sin(ry) * scale_y
+        if self.skeleton.parent[idx] < 0:
+            self.world[idx] = la, lb, lc, ld, x, y
+            return
+
+        pa, pb, pc, pd, px, py = self.parent_world(idx)
+        self.world[idx, 4:] = pa * x + pb * y + px, pc * x + pd * y + py
+        self.world[idx, :4] = _inherit(
+            self.mode(idx), *[np.array([v]) for v in (pa, pb, pc, pd, la, lb, lc, ld)], self.local[idx:idx + 1]
+        )[0]
+
+    def set_world(self, idx, a, b, c, d, world_x, world_y):
+        self.world[idx] = a, b, c, d, world_x, world_y
+        pa, pb, pc, pd, px, py = self.parent_world(idx)
+        pid = 1 / (pa * pd - pb * pc)
+        dx, dy = world_x - px, world_y - py
+        x, y = (dx * pd - dy * pb) * pid, (dy * pa - dx * pc) * pid
+
+        ia, ib, ic, id = pid * pd, pid * pb, pid * pc, pid * pa
+        ra, rb = ia * a - ib * c, ia * b - ib * d
+        rc, rd = id * c - ic * a, id * d - ic * b
+        scale_x = math.hypot(ra, rc)
+        if scale_x > 0.0001:
+            det = ra * rd - rb * rc
+            scale_y = det / scale_x
+            shear_y = math.degrees(math.atan2(ra * rb + rc * rd, det))
+            rotation = math.degrees(math.atan2(rc, ra))
+        else:
+            scale_x, scale_y, shear_y = 0, math.hypot(rb, rd), 0
+            rotation = 90 - math.degrees(math.atan2(rd, rb))
+        self.local[idx] = x, y, rotation, scale_x, scale_y, 0, shear_y
+
+
+###
+# mix: A value from 0 to 1 indicating the influence the constraint has on the bones. Assume 1 if omitted.
+# softness: Distance from the target bone to begin slowing the bones. Assume 0 if omitted.
+# bendPositive: If true, the bones bend in the positive rotation direction. Assume true if omitted.
+class IkConstraint:
+    def __init__(self, ik_data, index, bones, animation):
+        self.order = 0
+        self.mix = 1.0
+        self.softness = 0.0
+        self.bendPositive = True
+        self.compress = self.stretch = self.uniform = False
+
+        for k, v in ik_data.items():
+            setattr(self, k, v)
+
+        self.bone_idx = [index[bone] for bone in self.bones]
+        self.target_idx = index[self.target]
+        self.lengths = [bones[idx].length for idx in self.bone_idx]
+        self.keys = fill_keys(animation.get('ik', {}).get(self.name, []), {
+            'mix': 1.0, 'softness': 0.0, 'bendPositive': True, 'compress': False, 'stretch': False,
+        })
+
+    def apply(self, pose, time):
+        mix = sample(self.keys, time, 'mix', self.mix, 0)
+        if mix == 0:
+            return
+        softness = sample(self.keys, time, 'softness', self.softness, 1)
+        bend = 1 if sample(self.keys, time, 'bendPositive', self.bendPositive) else -1
+        compress = sample(self.keys, time, 'compress', self.compress)
+        stretch = sample(self.keys, time, 'stretch', self.stretch)
+
+        target_x, target_y = pose.world[self.target_idx, 4:].tolist()
+        if len(self.bone_idx) == 1:
+            self.apply_one(pose, self.bone_idx[0], self.lengths[0], target_x, target_y, compress, stretch, self.uniform, mix)
+        else:
+            self.apply_two(pose, target_x, target_y, bend, stretch, self.uniform, softness, mix)
+        pose.update()
+
+    @staticmethod
+    def apply_one(pose, bone, length, target_x, target_y, compress, stretch, uniform, alpha):
+        x, y, rotation, scale_x, scale_y, shear_x, shear_y = pose.local[bone].tolist()
+        pa, pb, pc, pd, px, py = pose.parent_world(bone)
+        world_x, world_y = pose.world[bone, 4:].tolist()
+        mode = pose.mode(bone)
+
+        rotation_ik = -shear_x - rotation
+        if mode == 'onlyTranslation':
+            tx, ty = target_x - world_x, target_y - world_y
+        else:
+            if mode == 'noRotationOrReflection':
+                s = abs(pa * pd - pb * pc) / (pa * pa + pc * pc)
+                pb, pd = -pc * s, pa * s
+                rotation_ik += math.degrees(math.atan2(pc, pa))
+            dx, dy = target_x - px, target_y - py
+            det = pa * pd - pb * pc
+            tx, ty = (dx * pd - dy * pb) / det - x, (dy * pa - dx * pc) / det - y
+
+        rotation_ik += math.degrees(math.atan2(ty, tx))
+        if scale_x < 0:
+            rotation_ik += 180
+        rotation_ik = _wrap(rotation_ik)
+
+        if compress or stretch:
+            if mode in ('noScale', 'noScaleOrReflection'):
+                tx, ty = target_x - world_x, target_y - world_y
+            b = length * scale_x
+            dd = math.hypot(tx, ty)
+            if ((compress and dd < b) or (stretch and dd > b)) and b > 0.0001:
+                s = (dd / b - 1) * alpha + 1
+                scale_x *= s
+                if uniform:
+                    scale_y *= s
+        pose.set_local(bone, x, y, rotation + rotation_ik * alpha, scale_x, scale_y, shear_x, shear_y)
+
+    def apply_two(self, pose, target_x, target_y, bend, stretch, uniform, softness, alpha):
+        parent, child = self.bone_idx[0], self.bone_idx[-1]
+        px, py, parent_rotation, psx, psy, _, _ = pose.local[parent].tolist()
+        cx, child_y, child_rotation, child_scale_x, child_scale_y, child_shear_x, child_shear_y = pose.local[child].tolist()
+        sx, sy, csx = psx, psy, child_scale_x
+
+        if psx < 0:
+            psx, os1, s2 = -psx, 180, -1
+        else:
+            os1, s2 = 0, 1
+        if psy < 0:
+            psy, s2 = -psy, -s2
+        if csx < 0:
+            csx, os2 = -csx, 180
+        else:
+            os2 = 0
+
+        a, b, c, d, parent_x, parent_y = pose.world[parent].tolist()
+        u = abs(psx - psy) <= 0.0001
+        if not u or stretch:
+            cy = 0
+            cwx, cwy = a * cx + parent_x, c * cx + parent_y
+        else:
+            cy = child_y
+            cwx, cwy = a * cx + b * cy + parent_x, c * cx + d * cy + parent_y
+
+        a, b, c, d, pp_x, pp_y = pose.parent_world(parent)
+        id = 1 / (a * d - b * c)
+        x, y = cwx - pp_x, cwy - pp_y
+        dx, dy = (x * d - y * b) * id - px, (y * a - x * c) * id - py
+        l1, l2 = math.hypot(dx, dy), self.lengths[-1] * csx
+        if l1 < 0.0001:
+            self.apply_one(pose, parent, self.lengths[0], target_x, target_y, False, stretch, False, alpha)
+            pose.set_local(child, cx, cy, 0, child_scale_x, child_scale_y, child_shear_x, child_shear_y)
+            return
+
+        x, y = target_x - pp_x, target_y - pp_y
+        tx, ty = (x * d - y * b) * id - px, (y * a - x * c) * id - py
+        dd = tx * tx + ty * ty
+        if softness != 0:
+            softness *= psx * (csx + 1) * 0.5
+            td = math.sqrt(dd)
+            sd = td - l1 - l2 * psx + softness
+            if sd > 0:
+                p = min(1, sd / (softness * 2)) - 1
+                p = (sd - softness * (1 - p * p)) / td
+                tx -= p * tx
+                ty -= p * ty
+                dd = tx * tx + ty * ty
+
+        if u:
+            l2 *= psx
+            cos = (dd - l1 * l1 - l2 * l2) / (2 * l1 * l2)
+            if cos < -1:
+                cos, a2 = -1, math.pi * bend
+            elif cos > 1:
+                cos, a2 = 1, 0
+                if stretch:
+                    s = (math.sqrt(dd) / (l1 + l2) - 1) * alpha + 1
+                    sx *= s
+                    if uniform:
+                        sy *= s
+            else:
+                a2 = math.acos(cos) * bend
+            a = l1 + l2 * cos
+            b = l2 * math.sin(a2)
+            a1 = math.atan2(ty * a - tx * b, tx * a + ty * b)
+        else:
+            a1, a2 = self.solve_ellipse(l1, l2, psx, psy, tx, ty, dd, bend)
+
+        os = math.atan2(cy, cx) * s2
+        a1 = _wrap((a1 - os) * 180 / math.pi + os1 - parent_rotation)
+        pose.set_local(parent, px, py, parent_rotation + a1 * alpha, sx, sy, 0, 0)
+        a2 = _wrap(((a2 + os) * 180 / math.pi - child_shear_x) * s2 + os2 - child_rotation)
+        pose.set_local(child, cx, cy, child_rotation + a2 * alpha, child_scale_x, child_scale_y, child_shear_x, child_shear_y)
+
+    # non uniformly scaled parent, the child's reach is an ellipse
+    @staticmethod
+    def solve_ellipse(l1, l2, psx, psy, tx, ty, dd, bend):
+        a, b = psx * l2, psy * l2
+        aa, bb, ta = a * a, b * b, math.atan2(ty, tx)
+        c = bb * l1 * l1 + aa * dd - aa * bb
+        c1, c2 = -2 * bb * l1, bb - aa
+        d = c1 * c1 - 4 * c2 * c
+        if d >= 0:
+            q = math.sqrt(d)
+            if c1 < 0:
+                q = -q
+            q = -(c1 + q) * 0.5
+            r0, r1 = q / c2 if c2 else math.inf, c / q if q else math.inf
+            r = r0 if abs(r0) < abs(r1) else r1
+            if r * r <= dd:
+                y = math.sqrt(dd - r * r) * bend
+                return ta - math.atan2(y, r), math.atan2(y / psy, (r - l1) / psx)
+
+        min_angle, min_x, min_y = math.pi, l1 - a, 0
+        max_angle, max_x, max_y = 0, l1 + a, 0
+        min_dist, max_dist = min_x * min_x, max_x * max_x
+        c = -a * l1 / (aa - bb) if aa != bb else 2
+        if -1 <= c <= 1:
+            c = math.acos(c)
+            x, y = a * math.cos(c) + l1, b * math.sin(c)
+            d = x * x + y * y
+            if d < min_dist:
+                min_angle, min_dist, min_x, min_y = c, d, x, y
+            if d > max_dist:
+                max_angle, max_dist, max_x, max_y = c, d, x, y
+        if dd <= (min_dist + max_dist) * 0.5:
+            return ta - math.atan2(min_y * bend, min_x), min_angle * bend
+        return ta - math.atan2(max_y * bend, max_x), max_angle * bend
+
+
+###
+# rotation, x, y, scaleX, scaleY, shearY: offsets from the target bone. Assume 0 if omitted.
+# mixRotate, mixX, mixScaleX, mixShearY: Assume 1 if omitted, mixY and mixScaleY default to mixX and mixScaleX.
+# local: the local transform is affected instead of the world one, relative: adjusted relatively instead of set.
+class TransformConstraint:
+    mixes = ['mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY']
+
+    def __init__(self, tk_data, index, animation):
+        self.order = 0
+        self.rotation = self.x = self.y = self.scaleX = self.scaleY = self.shearY = 0
+        self.mixRotate = self.mixX = self.mixScaleX = self.mixShearY = 1.0
+        self.local = self.relative = False
+
+        for k, v in tk_data.items():
+            setattr(self, k, v)
+        self.mixY = tk_data.get('mixY', self.mixX)
+        self.mixScaleY = tk_data.get('mixScaleY', self.mixScaleX)
+
+        self.bone_idx = [index[bone] for bone in self.bones]
+        self.target_idx = index[self.target]
+        self.keys = fill_keys(
+            animation.get('transform', {}).get(self.name, []), dict.fromkeys(self.mixes, 1.0),
+            [('mixY', 'mixX'), ('mixScaleY', 'mixScaleX')],
+        )
+
+    def apply(self, pose, time):
+        mixes = [sample(self.keys, time, mix, getattr(self, mix), channel) for channel, mix in enumerate(self.mixes)]
+        if not any(mixes):
+            return
+        if self.local:
+            self.apply_local(pose, *mixes)
+        else:
+            self.apply_world(pose, *mixes)
+        pose.update()
+
+    def apply_world(self, pose, mix_rotate, mix_x, mix_y, mix_scale_x, mix_scale_y, mix_shear_y):
+        ta, tb, tc, td, target_x, target_y = pose.world[self.target_idx].tolist()
+        reflect = math.pi / 180 if ta * td - tb * tc > 0 else -math.pi / 180
+        offset_rotation, offset_shear_y = self.rotation * reflect, self.shearY * reflect
+        offset_x = ta * self.x + tb * self.y + target_x
+        offset_y = tc * self.x + td * self.y + target_y
+        relative = self.relative
+
+        for bone in self.bone_idx:
+            a, b, c, d, world_x, world_y = pose.world[bone].tolist()
+            if mix_rotate != 0:
+                r = math.atan2(tc, ta) + offset_rotation
+                if not relative:
+                    r -= math.atan2(c, a)
+                r = _wrap_radians(r) * mix_rotate
+                cos, sin = math.cos(r), math.sin(r)
+                a, b, c, d = cos * a - sin * c, cos * b - sin * d, sin * a + cos * c, sin * b + cos * d
+
+            if relative:
+                world_x += offset_x * mix_x
+                world_y += offset_y * mix_y
+            else:
+                world_x += (offset_x - world_x) * mix_x
+                world_y += (offset_y - world_y) * mix_y
+
+            if mix_scale_x != 0:
+                s = math.hypot(a, c)
+                if relative:
+                    s = (math.hypot(ta, tc) - 1 + self.scaleX) * mix_scale_x + 1
+                elif s != 0:
+                    s = (s + (math.hypot(ta, tc) - s + self.scaleX) * mix_scale_x) / s
+                a, c = a * s, c * s
+            if mix_scale_y != 0:
+                s = math.hypot(b, d)
+                if relative:
+                    s = (math.hypot(tb, td) - 1 + self.scaleY) * mix_scale_y + 1
+                elif s != 0:
+                    s = (s + (math.hypot(tb, td) - s + self.scaleY) * mix_scale_y) / s
+                b, d = b * s, d * s
+
+            if mix_shear_y > 0:
+                by = math.atan2(d, b)
+                if relative:
+                    r = _wrap_radians(math.atan2(td, tb) - math.atan2(tc, ta))
+                    r = by + (r - math.pi / 2 + offset_shear_y) * mix_shear_y
+                else:
+                    r = _wrap_radians(math.atan2(td, tb) - math.atan2(tc, ta) - (by - math.atan2(c, a)))
+                    r = by + (r + offset_shear_y) * mix_shear_y
+                s = math.hypot(b, d)
+                b, d = math.cos(r) * s, math.sin(r) * s
+            pose.set_world(bone, a, b, c, d, world_x, world_y)
+
+    def apply_local(self, pose, mix_rotate, mix_x, mix_y, mix_scale_x, mix_scale_y, mix_shear_y):
+        tx, ty, target_rotation, target_scale_x, target_scale_y, _, target_shear_y = pose.local[self.target_idx].tolist()
+        for bone in self.bone_idx:
+            x, y, rotation, scale_x, scale_y, shear_x, shear_y = pose.local[bone].tolist()
+            if self.relative:
+                rotation += (target_rotation + self.rotation) * mix_rotate
+                x += (tx + self.x) * mix_x
+                y += (ty + self.y) * mix_y
+                scale_x *= (target_scale_x - 1 + self.scaleX) * mix_scale_x + 1
+                scale_y *= (target_scale_y - 1 + self.scaleY) * mix_scale_y + 1
+                shear_y += (target_shear_y + self.shearY) * mix_shear_y
+            else:
+                rotation += _wrap(target_rotation - rotation + self.rotation) * mix_rotate
+                x += (tx - x + self.x) * mix_x
+                y += (ty - y + self.y) * mix_y
+                if scale_x != 0:
+                    scale_x += (target_scale_x - scale_x + self.scaleX) * mix_scale_x
+                if scale_y != 0:
+                    scale_y += (target_scale_y - scale_y + self.scaleY) * mix_scale_y
+                shear_y += _wrap(target_shear_y - shear_y + self.shearY) * mix_shear_y
+            pose.set_local(bone, x, y, rotation, scale_x, scale_y, shear_x, shear_y)
+
+
+###
+# positionMode: fixed or percent. Assume percent if omitted.
+# spacingMode: length, fixed, percent or proportional. Assume length if omitted.
+# rotateMode: tangent, chain or chainScale. Assume tangent if omitted.
+# rotation: offset from the path rotation, position, spacing: Assume 0 if omitted.
+# mixRotate, mixX: Assume 1 if omitted, mixY defaults to mixX.
+# The target slot's path attachment is skinned to the current pose, closed and constantSpeed as in the file.
+class PathConstraint:
+    def __init__(self, path_data, index, bones, slots, attachments, animation):
+        self.order = 0
+        self.positionMode = 'percent'
+        self.spacingMode = 'length'
+        self.rotateMode = 'tangent'
+        self.rotation = self.position = self.spacing = 0
+        self.mixRotate = self.mixX = 1.0
+
+        for k, v in path_data.items():
+            setattr(self, k, v)
+        self.mixY = path_data.get('mixY', self.mixX)
+
+        self.bone_idx = [index[bone] for bone in self.bones]
+        self.lengths = [bones[idx].length for idx in self.bone_idx]
+        slot = slots[self.target]
+        self.slot_bone_idx = index[slot['bone']]
+
+        attachment = list(attachments[self.target].values())[0]
+        self.closed = attachment.get('closed', False)
+        self.constant_speed = attachment.get('constantSpeed', True)
+        self.curve_lengths = attachment.get('lengths', [])
+        self.vertices = load_vertex(attachment['vertices'], attachment['vertexCount'], self.slot_bone_idx)
+
+        timelines = animation.get('path', {}).get(self.name, {})
+        self.position_keys = fill_keys(timelines.get('position', []), {'value': 0})
+        self.spacing_keys = fill_keys(timelines.get('spacing', []), {'value': 0})
+        self.mix_keys = fill_keys(timelines.get('mix', []), {'mixRotate': 1.0, 'mixX': 1.0}, [('mixY', 'mixX')])
+
+    def apply(self, pose, time):
+        mix_rotate = sample(self.mix_keys, time, 'mixRotate', self.mixRotate, 0)
+        mix_x = sample(self.mix_keys, time, 'mixX', self.mixX, 1)
+        mix_y = sample(self.mix_keys, time, 'mixY', self.mixY, 2)
+        if mix_rotate == 0 and mix_x == 0 and mix_y == 0:
+            return
+        position = sample(self.position_keys, time, 'value', self.position)
+        spacing = sample(self.spacing_keys, time, 'value', self.spacing)
+
+        tangents, scale = self.rotateMode == 'tangent', self.rotateMode == 'chainScale'
+        bone_count = len(self.bone_idx)
+        spaces_count = bone_count if tangents else bone_count + 1
+        spaces, lengths = [0.0] * spaces_count, [0.0] * bone_count
+
+        for i in range(spaces_count - 1):
+            a, _, c, _, _, _ = pose.world[self.bone_idx[i]].tolist()
+            setup_length = self.lengths[i]
+            length = math.hypot(setup_length * a, setup_length * c) if setup_length >= EPSILON else 0
+            lengths[i] = length
+            if self.spacingMode == 'percent':
+                spaces[i + 1] = spacing
+            elif self.spacingMode == 'proportional':
+                spaces[i + 1] = length if setup_length >= EPSILON else spacing
+            elif setup_length < EPSILON:
+                spaces[i + 1] = spacing
+            else:
+                spaces[i + 1] = (setup_length + spacing if self.spacingMode == 'length' else spacing) * length / setup_length
+        if self.spacingMode == 'proportional':
+            total = sum(length for length, setup_length in zip(lengths, self.lengths) if setup_length >= EPSILON)
+            if total > 0:
+                spaces = [spaces[0]] + [space * spaces_count / total * spacing for space in spaces[1:]]
+
+        world = skin_vertices(self.vertices, pose.world)[:, [0, 2]].ravel().tolist()
+        positions = self.compute_positions(world, spaces, position, tangents)
+
+        offset_rotation = self.rotation
+        if offset_rotation == 0:
+            tip = self.rotateMode == 'chain'
+        else:
+            tip = False
+            pa, pb, pc, pd, _, _ = pose.world[self.slot_bone_idx].tolist()
+            offset_rotation *= math.pi / 180 if pa * pd - pb * pc > 0 else -math.pi / 180
+
+        bone_x, bone_y = positions[0], positions[1]
+        for i, bone in enumerate(self.bone_idx):
+            a, b, c, d, world_x, world_y = pose.world[bone].tolist()
+            world_x += (bone_x - world_x) * mix_x
+            world_y += (bone_y - world_y) * mix_y
+            p = (i + 1) * 3
+            x, y = positions[p], positions[p + 1]
+            dx, dy = x - bone_x, y - bone_y
+            if scale and lengths[i] >= EPSILON:
+                s = (math.hypot(dx, dy) / lengths[i] - 1) * mix_rotate + 1
+                a, c = a * s, c * s
+            bone_x, bone_y = x, y
+
+            if mix_rotate > 0:
+                if tangents:
+                    r = positions[p - 1]
+                elif spaces[i + 1] < EPSILON:
+                    r = positions[p + 2]
+                else:
+                    r = math.atan2(dy, dx)
+                r -= math.atan2(c, a)
+                if tip:
+                    cos, sin = math.cos(r), math.sin(r)
+                    length = self.lengths[i]
+                    bone_x += (length * (cos * a - sin * c) - dx) * mix_rotate
+                    bone_y += (length * (sin * a + cos * c) - dy) * mix_rotate
+                else:
+                    r += offset_rotation
+                r = _wrap_radians(r) * mix_rotate
+                cos, sin = math.cos(r), math.sin(r)
+                a, b, c, d = cos * a - sin * c, cos * b - sin * d, sin * a + cos * c, sin * b + cos * d
+            pose.set_world(bone, a, b, c, d, world_x, world_y)
+        pose.update()
+
+    # x, y, rotation for each space along the path, world: skinned path vertices (handle, point, handle per bezier point)
+    def compute_positions(self, world, spaces, position, tangents):
+        out = [0.0] * (len(spaces) * 3 + 2)
+        vertices_length = len(world)
+        if self.closed:
+            world = world[2:] + world[0:4]
+            curve_count = vertices_length // 6
+        else:
+            world = world[2:vertices_length - 2]
+            curve_count = vertices_length // 6 - 1
+
+        if self.constant_speed:
+            curves, path_length = [], 0
+            for i in range(curve_count):
+                curve_length, _ = _bezier_lengths(*world[i * 6:i * 6 + 8], 4)
+                path_length += curve_length
+                curves.append(path_length)
+        else:
+            curves = self.curve_lengths[:curve_count]
+            path_length = curves[-1]
+
+        if self.positionMode == 'percent':
+            position *= path_length
+        multiplier = {'percent': path_length, 'proportional': path_length / len(spaces)}.get(self.spacingMode, 1)
+
+        curve, previous_curve, segments = 0, -1, []
+        for i, space in enumerate(spaces):
+            space *= multiplier
+            position += space
+            p, o = position, i * 3
+            if self.closed:
+                p %= path_length
+                curve = 0
+            elif p < 0:
+                _add_before(p, world[0:4], out, o)
+                continue
+            elif p > path_length:
+                _add_after(p - path_length, world[-4:], out, o)
+                continue
+
+            while p > curves[curve]:
+                curve += 1
+            previous = curves[curve - 1] if curve else 0
+            p = (p - previous) / (curves[curve] - previous) if curves[curve] != previous else 0
+            points = world[curve * 6:curve * 6 + 8]
+
+            if self.constant_speed:
+                # weight by the lengths of ten segments, spine's forward differencing
+                if curve != previous_curve:
+                    previous_curve = curve
+                    curve_length, segments = _bezier_lengths(*points, 10)
+                p *= segments[-1]
+                segment = 0
+                while segment < 9 and p > segments[segment]:
+                    segment += 1
+                previous = segments[segment - 1] if segment else 0
+                p = (segment + (p - previous) / (segments[segment] - previous) if segments[segment] != previous else segment) * 0.1
+            _add_curve(p, points, out, o, tangents or (i > 0 and space < EPSILON))
+        return out
+
+
+# accumulated length of each of n segments of a bezier curve, total and per segment
+def _bezier_lengths(x1, y1, cx1, cy1, cx2, cy2, x2, y2, n):
+    step = 1 / n
+    tmp_x, tmp_y = (x1 - cx1 * 2 + cx2) * 3 * step * step, (y1 - cy1 * 2 + cy2) * 3 * step * step
+    ddd_x, ddd_y = ((cx1 - cx2) * 3 - x1 + x2) * 6 * step ** 3, ((cy1 - cy2) * 3 - y1 + y2) * 6 * step ** 3
+    dd_x, dd_y = tmp_x * 2 + ddd_x, tmp_y * 2 + ddd_y
+    d_x, d_y = (cx1 - x1) * 3 * step + tmp_x + ddd_x / 6, (cy1 - y1) * 3 * step + tmp_y + ddd_y / 6
+    lengths, length = [], 0
+    for _ in range(n):
+        length += math.hypot(d_x, d_y)
+        lengths.append(length)
+        d_x, d_y = d_x + dd_x, d_y + dd_y
+        dd_x, dd_y = dd_x + ddd_x, dd_y + ddd_y
+    return length, lengths
+
+
+def _add_before(p, points, out, o):
+    x1, y1, x2, y2 = points
+    r = math.atan2(y2 - y1, x2 - x1)
+    out[o:o + 3] = x1 + p * math.cos(r), y1 + p * math.sin(r), r
+
+
+def _add_after(p, points, out, o):
+    x1, y1, x2, y2 = points
+    r = math.atan2(y2 - y1, x2 - x1)
+    out[o:o + 3] = x2 + p * math.cos(r), y2 + p * math.sin(r), r
+
+
+def _add_curve(p, points, out, o, tangents):
+    x1, y1, cx1, cy1, cx2, cy2, x2, y2 = points
+    if p < EPSILON or math.isnan(p):
+        out[o:o + 3] = x1, y1, math.atan2(cy1 - y1, cx1 - x1)
+        return
+    tt, u = p * p, 1 - p
+    uu, ut = u * u, u * p
+    x, y = _cubic(x1, cx1, cx2, x2, p), _cubic(y1, cy1, cy2, y2, p)
+    out[o:o + 2] = x, y
+    if tangents:
+        if p < 0.001:
+            out[o + 2] = math.atan2(cy1 - y1, cx1 - x1)
+        else:
+            out[o + 2] = math.atan2(y - (y1 * uu + cy1 * ut * 2 + cy2 * tt), x - (x1 * uu + cx1 * ut * 2 + cx2 * tt))
+
+
+def load_constraints(data, bones, skeleton, animation):
+    index = skeleton.index
+    slots = {slot['name']: slot for slot in data['slots']}
+    attachments = data['skins'][0]['attachments'] if data.get('skins') else {}
+    constraints = [IkConstraint(ik_data, index, bones, animation) for ik_data in data.get('ik', [])]
+    constraints += [TransformConstraint(tk_data, index, animation) for tk_data in data.get('transform', [])]
+    constraints += [PathConstraint(path_data, index, bones, slots, attachments, animation) for path_data in data.get('path', [])]
+    return sorted(constraints, key=lambda constraint: constraint.order)
+
+
+# bone locals (frames, bones, 7) read from the rootControl f-curves, unkeyed channels keep the setup pose
+def sample_locals(action, skeleton, frames):
+    local = np.repeat(skeleton.local[None], len(frames), axis=0)
+    for bone in skeleton.bones:
+        for prop, idx, column, to_spine, _ in CHANNELS:
+            fcurve = action.fcurves.find('pose.bones["{}_Control"].{}'.format(bone.name, prop), index=idx)
+            if fcurve:
+                local[:, bone.bone_idx, column] = [to_spine(fcurve.evaluate(frame)) for frame in frames]
+    return local
+
+
+def bake_action(action, animation, data, bones, skeleton, fps):
+    constraints = load_constraints(data, bones, skeleton, animation)
+    frames = list(range(int(action.frame_range[0]), int(math.ceil(action.frame_range[1])) + 1))
+    local = sample_locals(action, skeleton, frames)
+
+    for frame_idx, frame in enumerate(frames):
+        pose = Pose(skeleton, local[frame_idx])
+        for constraint in constraints:
+            constraint.apply(pose, frame / fps)
+        local[frame_idx] = pose.local
+
+    baked = sorted({idx for constraint in constraints for idx in constraint.bone_idx})
+    # solved rotations wrap at 180, keep consecutive frames on the short way round
+    local[:, baked, 2] = np.degrees(np.unwrap(np.radians(local[:, baked, 2]), axis=0))
+    for idx in baked:
+        group = bones[idx].name + '_Control'
+        for prop, channel, column, _, to_blender in CHANNELS:
+            keys = FCurveKeys()
+            for frame_idx, frame in enumerate(frames):
+                keys.add(frame, to_blender(local[frame_idx, idx, column]))
+            write_fcurve(action, 'pose.bones["{}"].{}'.format(group, prop), channel, keys, group)
+    return len(baked)
+
+
+def remove_live_constraints(data):
+    for obj_name in ['rootControl', 'root']:
+        for pose_bone in bpy.data.objects[obj_name].pose.bones:
+            for constraint in [constraint for constraint in pose_bone.constraints if constraint.type in BAKED_CONSTRAINTS]:
+                pose_bone.constraints.remove(constraint)
+
+    for path_data in data.get('path', []):
+        for suffix in ['_Control', '']:
+            curve_obj = bpy.data.objects.get(path_data['name'] + suffix + '_Curve')
+            if curve_obj:
+                bpy.data.objects.remove(curve_obj)
+        curve = bpy.data.curves.get(path_data['name'])
+        if curve and not curve.users:
+            bpy.data.curves.remove(curve)
+
+
+# bakes the loaded animation, or with Import All Animations every animation's rootControl action
+def bake_constraints(mdst_spine):
+    document = load_skeleton(mdst_spine)
+    data = document.data
+    if not (data.get('ik') or data.get('transform') or data.get('path')):
+        MDST_LOGGER.info('No constraints to bake')
+        return 0
+
+    bones = [Bone(idx, bone_data) for idx, bone_data in enumerate(data['bones'])]
+    skeleton = Skeleton(bones)
+    fps = data['skeleton'].get('fps', 30)
+    control_obj = bpy.data.objects['rootControl']
+
+    animation_data = control_obj.animation_data
+    if mdst_spine.chk_import_all_animations:
+        # push_nla_tracks names a track after its animation, the strip holds the action of this import
+        tracks = animation_data.nla_tracks if animation_data else {}
+        strips = {track.name: track.strips[0].action for track in tracks if len(track.strips)}
+        targets = [(name, strips.get(name)) for name in document.animation_names]
+    else:
+        action = animation_data.action if animation_data else None
+        targets = [(mdst_spine.animation or document.animation_names[-1], action)] if document.animation_names else []
+    targets = [(name, action) for name, action in targets if action]
+    if not targets:
+        MDST_LOGGER.error('No animation loaded to bake constraints into')
+        return 0
+
+    for name, action in targets:
+        count = bake_action(action, document.animation(name), data, bones, skeleton, fps)
+        MDST_LOGGER.info('Baked constraints of {} bones into {}'.format(count, action.name))
+
+    remove_live_constraints(data)
+    bpy.context.view_layer.update()
+    return len(targets)
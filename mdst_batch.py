@@ -0,0 +1,265 @@
+###
+# Batch converter, run with plain python:
+#   python mdst_batch.py <input dir> -o <output dir> -j 8 --format blend gltf
+# Every skeleton (.json, .skel, .skel.bytes) with an atlas next to it is one job. Jobs are fed to N persistent
+#   `blender -b --factory-startup --python mdst_batch.py -- --worker` processes, one JSON job per stdin line,
+#   each answers with a single `MDST_RESULT {...}` stdout line, so Blender starts once per worker and not per asset.
+# A worker that crashes or times out fails its job and is restarted for the next one.
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import os.path as path
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+
+BATCH_LOG = logging.getLogger("md_spine_tools.batch")
+RESULT_PREFIX = 'MDST_RESULT '
+SKELETON_SUFFIXES = ('.skel.bytes', '.skel', '.json')
+ATLAS_SUFFIXES = ('.atlas.txt', '.atlas')
+EXPORT_SUFFIXES = {'blend': '.blend', 'gltf': '.glb', 'fbx': '.fbx'}
+# spine json opens with the skeleton object, reports and config files at most hold a "skeleton" string
+SPINE_JSON_HEAD = re.compile(r'"skeleton"\s*:\s*\{')
+
+
+def find_atlas(skeleton_path):
+    folder, name = path.split(skeleton_path)
+    stem = next(name[:-len(suffix)] for suffix in SKELETON_SUFFIXES if name.endswith(suffix))
+    for suffix in ATLAS_SUFFIXES:
+        if path.isfile(path.join(folder, stem + suffix)):
+            return path.join(folder, stem + suffix)
+
+    # Master Duel folders usually hold a single atlas under another name
+    atlases = [f for f in os.listdir(folder) if f.endswith(ATLAS_SUFFIXES)]
+    return path.join(folder, atlases[0]) if len(atlases) == 1 else None
+
+
+def has_stem_atlas(skeleton_path):
+    stem = skeleton_path[:-len('.json')]
+    return any(path.isfile(stem + suffix) for suffix in ATLAS_SUFFIXES)
+
+
+def is_spine_json(skeleton_path):
+    if has_stem_atlas(skeleton_path):
+        return True
+    try:
+        with open(skeleton_path, encoding='utf-8', errors='replace') as f:
+            return bool(SPINE_JSON_HEAD.search(f.read(4096)))
+    except OSError:
+        return False
+
+
+# exclude: paths never taken as skeletons, like the report of this run
+def scan_assets(directory, exclude=()):
+    exclude = {path.abspath(excluded) for excluded in exclude}
+    assets = []
+    for folder, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith(SKELETON_SUFFIXES):
+                continue
+            skeleton_path = path.join(folder, name)
+            if path.abspath(skeleton_path) in exclude:
+                continue
+            if name.endswith('.json') and not is_spine_json(skeleton_path):
+                continue
+            atlas_path = find_atlas(skeleton_path)
+            if atlas_path:
+                assets.append((skeleton_path, atlas_path))
+            elif not name.endswith('.json'):
+                BATCH_LOG.warning('No atlas found for %s', skeleton_path)
+    return assets
+
+
+def output_stem(skeleton_path, input_dir, output_dir):
+    relative = path.relpath(skeleton_path, input_dir)
+    for suffix in SKELETON_SUFFIXES:
+        if relative.endswith(suffix):
+            return path.join(output_dir, relative[:-len(suffix)])
+
+
+###
+# Driver side, no bpy needed.
+class Worker:
+    def __init__(self, blender, timeout):
+        self.blender = blender
+        self.timeout = timeout
+        self.process = None
+
+    def start(self):
+        command = [self.blender, '-b', '--factory-startup', '--python', path.abspath(__file__), '--', '--worker']
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, bufsize=1,
+        )
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def run(self, job):
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        timer = threading.Timer(self.timeout, self.process.kill) if self.timeout else None
+        if timer:
+            timer.start()
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if line.startswith(RESULT_PREFIX):
+                    return json.loads(line[len(RESULT_PREFIX):])
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        finally:
+            if timer:
+                timer.cancel()
+
+        # stdout closed before a result, blender crashed or was killed by the timeout
+        code = self.process.wait()
+        self.process = None
+        return {'ok': False, 'error': f'Blender worker exited with code {code}'}
+
+
+def run_jobs(jobs, worker_count, blender, timeout):
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    results = []
+    lock = threading.Lock()
+
+    def work():
+        worker = Worker(blender, timeout)
+        try:
+            while True:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                result = worker.run(job)
+                result.update(skeleton=job['skeleton'], wall=time.perf_counter() - start)
+                with lock:
+                    results.append(result)
+                    status = 'ok' if result['ok'] else 'FAILED'
+                    BATCH_LOG.info('[%d/%d] %s %s %.2fs', len(results), len(jobs), status, job['skeleton'], result['wall'])
+                    if not result['ok']:
+                        BATCH_LOG.error(result['error'])
+        finally:
+            worker.stop()
+
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        for future in [executor.submit(work) for _ in range(min(worker_count, len(jobs)))]:
+            future.result()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert Master Duel Spine assets with background Blender workers')
+    parser.add_argument('input', help='directory scanned for skeleton and atlas pairs')
+    parser.add_argument('-o', '--output', help='output directory, defaults to the input directory')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='number of Blender workers')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'), help='Blender executable')
+    parser.add_argument('--format', nargs='+', choices=sorted(EXPORT_SUFFIXES), default=['blend'])
+    parser.add_argument('--animation', help='animation to load, defaults to the last one')
+    parser.add_argument('--all-animations', action='store_true', help='import every animation as its own action')
+    parser.add_argument('--bake-constraints', action='store_true', help='bake ik, transform and path constraints into keys')
+    parser.add_argument('--reduce-keys', type=float, metavar='TOLERANCE', help='remove keys reproduced within tolerance')
+    parser.add_argument('--merge-mode', choices=['NONE', 'PAGE', 'CHARACTER'], default='NONE')
+    parser.add_argument('--clipping-mode', choices=['GEOMETRY', 'BOOLEAN'], default='GEOMETRY')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per asset, 0 disables')
+    parser.add_argument('--report', help='write the per asset results as json')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s:  %(message)s')
+    output_dir = args.output or args.input
+    options = {
+        'animation': args.animation, 'chk_import_all_animations': args.all_animations,
+        'chk_bake_constraints': args.bake_constraints,
+        'chk_reduce_keys': args.reduce_keys is not None, 'reduce_tolerance': args.reduce_keys or 0.0,
+        'merge_mode': args.merge_mode, 'clipping_mode': args.clipping_mode,
+    }
+    jobs = [
+        {
+            'skeleton': skeleton_path, 'atlas': atlas_path, 'options': options,
+            'outputs': {f: output_stem(skeleton_path, args.input, output_dir) + EXPORT_SUFFIXES[f] for f in args.format},
+        }
+        for skeleton_path, atlas_path in scan_assets(args.input, [args.report] if args.report else [])
+    ]
+    BATCH_LOG.info('Found %d assets, running %d workers', len(jobs), min(args.jobs, len(jobs)))
+
+    start = time.perf_counter()
+    results = run_jobs(jobs, max(args.jobs, 1), args.blender, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if not result['ok']]
+    BATCH_LOG.info('Converted %d/%d assets in %.2fs', len(results) - len(failed), len(results), elapsed)
+    for result in failed:
+        BATCH_LOG.error('Failed %s: %s', result['skeleton'], result['error'].strip().splitlines()[-1])
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'elapsed': elapsed, 'results': results}, f, indent=2)
+    return 1 if failed else 0
+
+
+###
+# Worker side, runs inside Blender.
+def import_addon():
+    addon_dir = path.dirname(path.abspath(__file__))
+    sys.path.insert(0, path.dirname(addon_dir))
+    import importlib
+    return importlib.import_module(path.basename(addon_dir))
+
+
+def convert(addon, job):
+    import bpy
+
+    # fresh file per asset, images and node groups of the previous asset are gone too
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    result = addon.import_spine(job['skeleton'], job['atlas'], addon.ImportOptions(**job['options']))
+
+    timings = {'import': result.elapsed}
+    for export_format, filepath in job['outputs'].items():
+        start = time.perf_counter()
+        os.makedirs(path.dirname(filepath) or '.', exist_ok=True)
+        if export_format == 'blend':
+            bpy.ops.wm.save_as_mainfile(filepath=filepath, check_existing=False)
+        elif export_format == 'gltf':
+            bpy.ops.export_scene.gltf(filepath=filepath, export_format='GLB', export_animations=True)
+        elif export_format == 'fbx':
+            bpy.ops.export_scene.fbx(filepath=filepath, bake_anim=True, add_leaf_bones=False)
+        timings[export_format] = time.perf_counter() - start
+    return {'ok': True, 'meshes': len(result.meshes), 'actions': len(result.actions), 'timings': timings}
+
+
+def worker_main():
+    addon = import_addon()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = convert(addon, json.loads(line))
+        except Exception:
+            result = {'ok': False, 'error': traceback.format_exc()}
+        sys.stdout.write(RESULT_PREFIX + json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    # blender passes the script arguments after `--`
+    if '--worker' in sys.argv[sys.argv.index('--') + 1 if '--' in sys.argv else 1:]:
+        worker_main()
+    else:
+        sys.exit(main())
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import os.path as path
+import shutil
+
+import numpy as np
+
+
+CACHE_LOG = logging.getLogger("md_spine_tools.cache")
+
+
+def content_hash(*contents):
+    digest = hashlib.sha1()
+    for content in contents:
+        digest.update(content.encode('utf-8') if isinstance(content, str) else content)
+    return digest.hexdigest()
+
+
+class LRUCache(object):
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > max(self.max_size, 1):
+            evicted, _ = self.entries.popitem(last=False)
+            CACHE_LOG.info('Evicted %s', evicted)
+
+    def pop(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+###
+# One directory per key holding a manifest.json and one .npy file per array.
+# The manifest is written last and the directory renamed into place, so a half written entry is never read.
+# Arrays are memory-mapped on load, the directory mtime marks its last use for eviction.
+class DiskCache(object):
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        return path.join(self.directory, key)
+
+    def get(self, key):
+        entry_path = self.entry_path(key)
+        manifest_path = path.join(entry_path, 'manifest.json')
+        if not path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            arrays = {name: np.load(path.join(entry_path, name + '.npy'), mmap_mode='r') for name in manifest['arrays']}
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError):
+            CACHE_LOG.warning('Dropped unreadable cache entry %s', key, exc_info=True)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            return None
+        return manifest['meta'], arrays
+
+    def put(self, key, meta, arrays):
+        entry_path = self.entry_path(key)
+        temp_path = '%s.%d.tmp' % (entry_path, os.getpid())
+        try:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            os.makedirs(temp_path)
+            for name, value in arrays.items():
+                np.save(path.join(temp_path, name + '.npy'), np.ascontiguousarray(value), allow_pickle=False)
+            with open(path.join(temp_path, 'manifest.json'), 'w') as f:
+                json.dump({'meta': meta, 'arrays': list(arrays)}, f)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            CACHE_LOG.error('Failed writing cache entry %s', key, exc_info=True)
+            shutil.rmtree(temp_path, ignore_errors=True)
+            return
+        self.evict(keep=key)
+
+    def entries(self):
+        if not path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.name))
+        return sorted(entries)
+
+    # least recently used entries go first until the cache fits
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= size
+            CACHE_LOG.info('Evicted %s from disk cache', key)
+
+    def clear(self):
+        entries = self.entries()
+        for _, _, key in entries:
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+        return len(entries)
@@ -1,64 +1,86 @@
+from array import array
 import bpy
 import bmesh
 import json
+from json.decoder import scanstring
 import math
 import mathutils
+import numpy as np
 from pathlib import Path as _Path
 import re
 
-from . import MDST_LOGGER
+from . import MDST_LOGGER, MDST_SETTINGS
+from .mdst_cache import DiskCache, LRUCache, content_hash
+from .mdst_skel import read_skeleton_binary
 
 
 # vertices: For each vertex either an x,y pair or, for a weighted mesh
 #   first the number of bones which influence the vertex,
 #   then for that many bones: bone index, bind position X, bind position Y, weight.
 #   A mesh is weighted if the number of vertices > number of UVs.
-class Vertex:
-    def __init__(self, vertex_data, single_bone_idx=None):
-        self.vertex_data = []
-        if single_bone_idx:
-            self.bone_idx = [single_bone_idx]
-            self.bone_weight = [1.0]
-            self.bone_count = 1
-            self.vertex_data.append([vertex_data.pop(0), vertex_data.pop(0)])
-        else:
-            self.bone_idx = []
-            self.bone_weight = []
-            self.bone_count = vertex_data.pop(0)
-            for i in range(self.bone_count):
-                self.bone_idx.append(vertex_data.pop(0))
-                self.vertex_data.append([vertex_data.pop(0), vertex_data.pop(0)])
-                self.bone_weight.append(vertex_data.pop(0))
-
-        if sum(self.bone_weight) != 1.0:
-            self.bone_weight[0] = 1.0 - sum(self.bone_weight[1:])
-
-    def local_pos(self):
-        return [
-            sum(self.vertex_data[idx][0] * self.bone_weight[idx] for idx in range(self.bone_count)),
-            0,
-            sum(self.vertex_data[idx][1] * self.bone_weight[idx] for idx in range(self.bone_count))
-        ]
+# The flat array is walked once with a cursor into parallel influence arrays,
+#   offsets[i]:offsets[i + 1] is the influence range of vertex i.
+class VertexData:
+    def __init__(self, vertex_data, vertex_count, single_bone_idx=None):
+        if len(vertex_data) == vertex_count * 2:
+            self.bones = array('i', [single_bone_idx or 0]) * vertex_count
+            self.x = array('d', vertex_data[0::2])
+            self.y = array('d', vertex_data[1::2])
+            self.weights = array('d', [1.0]) * vertex_count
+            self.offsets = array('i', range(vertex_count + 1))
+            return
+
+        self.bones = array('i')
+        self.x = array('d')
+        self.y = array('d')
+        self.weights = array('d')
+        self.offsets = array('i', [0])
+
+        cursor = 0
+        while cursor < len(vertex_data):
+            bone_count = vertex_data[cursor]
+            influence = vertex_data[cursor + 1:cursor + 1 + bone_count * 4]
+            cursor += 1 + bone_count * 4
+
+            weights = influence[3::4]
+            if sum(weights) != 1.0:
+                weights[0] = 1.0 - sum(weights[1:])
+
+            self.bones.extend(influence[0::4])
+            self.x.extend(influence[1::4])
+            self.y.extend(influence[2::4])
+            self.weights.extend(weights)
+            self.offsets.append(len(self.bones))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [Vertex(self, i) for i in range(*idx.indices(len(self)))]
+        return Vertex(self, idx)
+
+    def __iter__(self):
+        return (Vertex(self, i) for i in range(len(self)))
 
-    def global_pos(self, bone_list):
-        return [
-            sum(((self.vertex_data[idx][0] * math.cos(bone_list[b_idx].abs_rotation) - self.vertex_data[idx][1] * math.sin(bone_list[b_idx].abs_rotation)) * bone_list[b_idx].abs_scale_x + bone_list[b_idx].abs_x) * self.bone_weight[idx] for idx, b_idx in enumerate(self.bone_idx)),
-            0,
-            sum(((self.vertex_data[idx][1] * math.cos(bone_list[b_idx].abs_rotation) + self.vertex_data[idx][0] * math.sin(bone_list[b_idx].abs_rotation)) * bone_list[b_idx].abs_scale_y + bone_list[b_idx].abs_y) * self.bone_weight[idx] for idx, b_idx in enumerate(self.bone_idx))
-        ]
 
-    def euler_pos(self, bone_list, mode='xyz', t='global'):
-        x, y, z = eval(f'self.{t}_pos(bone_list)')
-        local = locals()
-        return [eval(i, local) for i in mode]
+class Vertex:
+    def __init__(self, vertices, idx):
+        start, end = vertices.offsets[idx], vertices.offsets[idx + 1]
+        self.bone_idx = vertices.bones[start:end]
+        self.bone_weight = vertices.weights[start:end]
+        self.bone_count = end - start
+        self.vertex_data = list(zip(vertices.x[start:end], vertices.y[start:end]))
 
 
 class Bone:
     def __init__(self, idx, bone_data):
         self.length = 0
+        self.parent = self.parent_bone = None
         self.x = self.y = self.abs_x = self.abs_y = self.dx = self.dy = 0
         self.rotation = self.abs_rotation = self.roll = 0
         self.scaleX = self.scaleY = self.abs_scale_x = self.abs_scale_y = 1.0
+        self.matrix = (1.0, 0.0, 0.0, 1.0)
         self.transform = 'normal'
 
         self.shearX = self.shearY = 0
@@ -66,34 +88,130 @@ class Bone:
         for k, v in bone_data.items():
             setattr(self, k, v)
 
-        if self.shearX or self.shearY:
-            MDST_LOGGER.warning('Shear is not supported')
-
         self.bone_idx = idx
         self.rotation = math.radians(self.rotation)
 
-        if hasattr(self, 'transform') and self.transform == 'noRotationOrReflection':
-            self.rotation = 0
-
-    def set_parent(self, parent):
-        self.parent_bone = parent
-
-        self.abs_rotation = self.rotation + self.parent_bone.abs_rotation
-        self.abs_scale_x = self.scaleX * self.parent_bone.abs_scale_x
-        self.abs_scale_y = self.scaleY * self.parent_bone.abs_scale_y
+    def set_world(self, a, b, c, d, world_x, world_y):
+        self.matrix = (a, b, c, d)
+        self.abs_x, self.abs_y = world_x, world_y
 
-        self.abs_x = self.parent_bone.abs_scale_x * (self.x * math.cos(self.parent_bone.abs_rotation) - self.y * math.sin(self.parent_bone.abs_rotation)) + self.parent_bone.abs_x
-        self.abs_y = self.parent_bone.abs_scale_y * (self.y * math.cos(self.parent_bone.abs_rotation) + self.x * math.sin(self.parent_bone.abs_rotation)) + self.parent_bone.abs_y
-        # self.abs_x2 = self.abs_x + self.length * math.cos(self.abs_rotation) * self.abs_scale_x
-        # self.abs_y2 = self.abs_y + self.length * math.sin(self.abs_rotation) * self.abs_scale_y
+        self.abs_rotation = math.atan2(c, a)
+        self.abs_scale_x = math.hypot(a, c)
+        self.abs_scale_y = math.hypot(b, d)
 
-        self.dx = self.abs_scale_x * self.length * math.cos(self.abs_rotation)
-        self.dy = self.abs_scale_y * self.length * math.sin(self.abs_rotation)
+        # tail follows the bone's x axis
+        self.dx = a * self.length
+        self.dy = c * self.length
 
         roll = self.abs_rotation % (2 * math.pi)
         self.roll = - roll if roll < math.pi else (math.pi - (roll % math.pi))
 
 
+TRANSFORM_MODES = ['normal', 'onlyTranslation', 'noRotationOrReflection', 'noScale', 'noScaleOrReflection']
+
+
+###
+# Bone hierarchy resolved once by index: parent[i] is -1 for roots, levels groups bone indices by depth
+#   so a whole level can be solved from its parents' world transforms in one array step.
+# local columns: x, y, rotation, scaleX, scaleY, shearX, shearY (degrees as in spine)
+# world columns: a, b, c, d, worldX, worldY
+class Skeleton:
+    def __init__(self, bones):
+        self.bones = bones
+        self.index = {bone.name: bone.bone_idx for bone in bones}
+        self.parent = np.array([self.index[bone.parent] if bone.parent else -1 for bone in bones], dtype=np.intp)
+        self.mode = np.array([TRANSFORM_MODES.index(bone.transform) for bone in bones], dtype=np.intp)
+
+        self.children = [[] for _ in bones]
+        for idx, parent in enumerate(self.parent.tolist()):
+            if parent >= 0:
+                self.children[parent].append(idx)
+                bones[idx].parent_bone = bones[parent]
+
+        self.levels = []
+        level = [idx for idx, parent in enumerate(self.parent.tolist()) if parent < 0]
+        while level:
+            self.levels.append(np.array(level, dtype=np.intp))
+            level = [child for idx in level for child in self.children[idx]]
+        self.order = np.concatenate(self.levels) if self.levels else np.zeros(0, dtype=np.intp)
+
+        self.local = np.array([
+            [bone.x, bone.y, math.degrees(bone.rotation), bone.scaleX, bone.scaleY, bone.shearX, bone.shearY] for bone in bones
+        ], dtype=float).reshape(-1, 7)
+        self.world = self.solve(self.local)
+
+        for bone, (a, b, c, d, world_x, world_y) in zip(bones, self.world.tolist()):
+            bone.set_world(a, b, c, d, world_x, world_y)
+
+    def solve(self, local):
+        x, y, rotation, scale_x, scale_y, shear_x, shear_y = local.T
+        rotation_x = np.radians(rotation + shear_x)
+        rotation_y = np.radians(rotation + 90 + shear_y)
+        la, lb = np.cos(rotation_x) * scale_x, np.cos(rotation_y) * scale_y
+        lc, ld = np.sin(rotation_x) * scale_x, np.sin(rotation_y) * scale_y
+
+        world = np.empty((len(local), 6))
+        for level in self.levels:
+            parent = self.parent[level]
+            root = level[parent < 0]
+            world[root] = np.stack([la[root], lb[root], lc[root], ld[root], x[root], y[root]], axis=1)
+
+            level, parent = level[parent >= 0], parent[parent >= 0]
+            pa, pb, pc, pd, parent_x, parent_y = world[parent].T
+            world[level, 4] = pa * x[level] + pb * y[level] + parent_x
+            world[level, 5] = pc * x[level] + pd * y[level] + parent_y
+
+            for mode in np.unique(self.mode[level]).tolist():
+                mask = self.mode[level] == mode
+                idx = level[mask]
+                world[idx, :4] = _inherit(
+                    TRANSFORM_MODES[mode], pa[mask], pb[mask], pc[mask], pd[mask],
+                    la[idx], lb[idx], lc[idx], ld[idx], local[idx]
+                )
+        return world
+
+
+# child a, b, c, d from parent a, b, c, d for each spine transform inheritance mode
+def _inherit(mode, pa, pb, pc, pd, la, lb, lc, ld, local):
+    _, _, rotation, scale_x, scale_y, shear_x, shear_y = local.T
+
+    if mode == 'normal':
+        return np.stack([pa * la + pb * lc, pa * lb + pb * ld, pc * la + pd * lc, pc * lb + pd * ld], axis=1)
+
+    if mode == 'onlyTranslation':
+        return np.stack([la, lb, lc, ld], axis=1)
+
+    if mode == 'noRotationOrReflection':
+        s = pa * pa + pc * pc
+        valid = s > 0.0001
+        s = np.abs(pa * pd - pb * pc) / np.where(valid, s, 1)
+        prx = np.where(valid, np.degrees(np.arctan2(pc, pa)), 90 - np.degrees(np.arctan2(pd, pb)))
+        pb, pd = np.where(valid, pc * s, pb), np.where(valid, pa * s, pd)
+        pa, pc = np.where(valid, pa, 0), np.where(valid, pc, 0)
+
+        rx = np.radians(rotation + shear_x - prx)
+        ry = np.radians(rotation + shear_y - prx + 90)
+        la, lb = np.cos(rx) * scale_x, np.cos(ry) * scale_y
+        lc, ld = np.sin(rx) * scale_x, np.sin(ry) * scale_y
+        return np.stack([pa * la - pb * lc, pa * lb - pb * ld, pc * la + pd * lc, pc * lb + pd * ld], axis=1)
+
+    # noScale, noScaleOrReflection
+    cos, sin = np.cos(np.radians(rotation)), np.sin(np.radians(rotation))
+    za, zc = pa * cos + pb * sin, pc * cos + pd * sin
+    s = np.sqrt(za * za + zc * zc)
+    s = np.where(s > 0.00001, 1 / np.where(s > 0.00001, s, 1), s)
+    za, zc = za * s, zc * s
+    s = np.sqrt(za * za + zc * zc)
+    if mode == 'noScale':
+        s = np.where(pa * pd - pb * pc < 0, -s, s)
+    r = math.pi / 2 + np.arctan2(zc, za)
+    zb, zd = np.cos(r) * s, np.sin(r) * s
+
+    la, lb = np.cos(np.radians(shear_x)) * scale_x, np.cos(np.radians(90 + shear_y)) * scale_y
+    lc, ld = np.sin(np.radians(shear_x)) * scale_x, np.sin(np.radians(90 + shear_y)) * scale_y
+    return np.stack([za * la + zb * lc, za * lb + zb * ld, zc * la + zd * lc, zc * lb + zd * ld], axis=1)
+
+
 class IK_Bone:
     def __init__(self, ik_data, bone_dict):
         self.order = self.softness = 0
@@ -144,7 +262,7 @@ class TK_Bone:
 # rotateMix: A value from 0 to 1 indicating the influence the constraint has on the bones, where 0 means no affect, 1 means only the constraint, and between is a mix of the normal pose and the constraint. Assume 1 if omitted.
 # translateMix: See rotateMix.
 class Path:
-    def __init__(self, path_data, bone_dict, attachments):
+    def __init__(self, path_data, bone_dict, slots, attachments):
         for k, v in path_data.items():
             setattr(self, k, v)
 
@@ -154,61 +272,113 @@ class Path:
             setattr(self, k, v)
 
         # Path do have more than one vertices!
-        self.vertices = load_vertex(self.vertices, len(self.vertices) // 2 == self.vertexCount)
+        self.vertices = load_vertex(self.vertices, self.vertexCount, slots[self.target].bone_obj.bone_idx)
 
 
 class Slot:
     def __init__(self, slot_data, bone_dict, slot_idx):
+        self.color = 'ffffffff'
+        self.blend = 'normal'
+
         for k, v in slot_data.items():
             setattr(self, k, v)
         self.bone_obj = bone_dict[self.bone]
         self.slot_idx = slot_idx
 
 
+###
+# Atlas region, named by the line before its entries.
+# xy, size: position and size on the page (Spine Atlas 4.1 uses bounds)
+# offset, orig: whitespace stripped from the region and its original size (Spine Atlas 4.1 uses offsets)
+# rotate: degrees, Spine Atlas 4.0 uses bool instead of degrees
 class Atlas:
-    def __init__(self, atlas_data, atlas_image):
-        data = [i.strip() for i in atlas_data.split('\n') if i]
-        self.name = data.pop(0)
+    def __init__(self, name, atlas_image):
+        self.name = name
         self.atlas_image = atlas_image
-        self.rotate = False
-        self.bounds = []
-        for entry in data:
-            k, v = entry.split(':')
-            if ',' in v:
-                setattr(self, k, [int(i) if i.strip('- ').isdigit() else eval(i.strip().capitalize()) if bool(i) else i.strip() for i in v.split(',')])
-            else:
-                setattr(self, k, int(v) if v.strip('- ').isdigit() else eval(v.strip().capitalize()) if bool(v) else v.strip())
-
-        # Spine Atlas 4.0 uses bool instead of degrees
-        self.rotate = int(self.rotate)
-        if self.rotate == 1:
-            self.rotate = 90
-
-        # Spine Atlas 4.1 uses bounds
-        if self.bounds:
-            self.xy = self.bounds[:2]
-            self.size = self.bounds[2:]
+        self.rotate = 0
+        self.xy = [0, 0]
+        self.size = [0, 0]
+        self.offset = [0, 0]
+        self.orig = None
+        self.index = -1
+
+    def set_field(self, key, values):
+        if key == 'bounds':
+            self.xy, self.size = [int(i) for i in values[:2]], [int(i) for i in values[2:4]]
+        elif key == 'offsets':
+            self.offset, self.orig = [int(i) for i in values[:2]], [int(i) for i in values[2:4]]
+        elif key == 'rotate':
+            self.rotate = 90 if values[0] == 'true' else 0 if values[0] == 'false' else int(values[0])
+        elif key in ('xy', 'size', 'offset', 'orig', 'split', 'pad'):
+            setattr(self, key, [int(i) for i in values])
+        elif key == 'index':
+            self.index = int(values[0])
+        else:
+            setattr(self, key, values if len(values) > 1 else values[0])
 
 
 class AtlasImage:
-    def __init__(self, atlas_image_data):
-        self.image = re.search(r'.+\.(png|jpg|jpeg)', atlas_image_data).group(0)
-        self.size_x, self.size_y = [int(i) for i in re.search(r'size:(?:| )(\d+),(?:| )(\d+)', atlas_image_data).groups()]
-        self.filter_x, self.filter_y = re.search(r'filter:(?:| )(\w+),(?:| )(\w+)', atlas_image_data).groups()
+    def __init__(self, name):
+        self.image = name
+        self.size_x = self.size_y = 0
+        self.filter_x = self.filter_y = 'Linear'
+        self.format = 'RGBA8888'
+        self.repeat = 'none'
+        self.pma = None
+        self.scale = 1
+        self.atlas = []
+
+    def set_field(self, key, values):
+        if key == 'size':
+            self.size_x, self.size_y = [int(i) for i in values[:2]]
+        elif key == 'filter':
+            self.filter_x, self.filter_y = values[0], values[-1]
+        elif key == 'pma':
+            self.pma = values[0] == 'true'
+        elif key == 'scale':
+            self.scale = float(values[0])
+        else:
+            setattr(self, key, values if len(values) > 1 else values[0])
+
+
+# Single pass over the atlas lines: a blank line ends a page, a line without ':' names a page
+#   (when no page is open) or a region, any other line is an entry of the current page or region.
+# Returns the pages and a region index by name, the first region wins for indexed sequences.
+def load_atlas(atlas_data):
+    atlas_image = []
+    atlas_dict = {}
+    page = region = None
+    for line in atlas_data.splitlines():
+        line = line.strip()
+        if not line:
+            page = region = None
+        elif ':' not in line:
+            if page is None:
+                page = AtlasImage(line)
+                atlas_image.append(page)
+            else:
+                region = Atlas(line, page)
+                page.atlas.append(region)
+                atlas_dict.setdefault(line, region)
+        elif page is not None:
+            key, value = line.split(':', 1)
+            (region or page).set_field(key.strip(), [i.strip() for i in value.split(',')])
 
-        # Spine Atlas 4.0?
-        _format = re.search(r'format:(?:| )(\w+)', atlas_image_data)
-        self.format = _format.group(1) if _format else 'RGBA8888'
-        repeat = re.search(r'repeat:(?:| )(\w+)', atlas_image_data)
-        self.repeat = repeat.group(1) if repeat else 'none'
+    for region in atlas_dict.values():
+        if region.orig is None:
+            region.orig = list(region.size)
 
-        # Spine Atlas 4.1
-        pma = re.search(r'pma:(?:| )(\w+)', atlas_image_data)
-        self.pma = eval(pma.group(1).strip().capitalize()) if pma else None
-        scale = re.search(r'scale:(?:| )(\w+)', atlas_image_data)
-        self.scale = float(scale.group(1).strip()) if scale else 1
+    return atlas_image, atlas_dict
 
-        self.atlas = [Atlas(a[0], self) for a in re.findall(r'(^[^ :]+\n(.|\n)*?)(?=^[^ :]+\n|\Z)', atlas_image_data, re.MULTILINE)[1:]]
+
+# spine looks regions up by the attachment path, falling back to its name, then the skin key
+def find_region(atlas_dict, attachment_name, attachment, slot_name):
+    region_name = attachment.get('path', attachment.get('name', attachment_name))
+    if region_name in atlas_dict:
+        return atlas_dict[region_name]
+    if slot_name in atlas_dict:
+        return atlas_dict[slot_name]
+    MDST_LOGGER.error('Region {} not found in atlas'.format(region_name))
 
 
 class RGBA:
@@ -225,7 +395,25 @@ def get_material_node(nodes, node_type):
             return node
 
 
-def create_material(atlas, mesh_name, filepath):
+# atlas page images by page name, each loaded once on first use and shared by every material of the page
+class PageImages:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.images = {}
+
+    def get(self, atlas):
+        if atlas.image not in self.images:
+            image = None
+            if self.filepath:
+                try:
+                    image = bpy.data.images.load(str(self.filepath / atlas.image), check_existing=True)
+                except RuntimeError:
+                    MDST_LOGGER.error('Failed loading atlas page {}'.format(self.filepath / atlas.image))
+            self.images[atlas.image] = image
+        return self.images[atlas.image]
+
+
+def create_material(atlas, mesh_name, image):
     material = bpy.data.materials.new(mesh_name or atlas.image)
     material.use_nodes = True
     material.blend_method = 'BLEND'
@@ -237,8 +425,7 @@ def create_material(atlas, mesh_name, filepath):
     bsdf_node = get_material_node(material.node_tree.nodes, 'BSDF_PRINCIPLED')
     image_node = material.node_tree.nodes.new('ShaderNodeTexImage')
     image_node.location = (-600, 0)
-    if filepath:
-        image_node.image = bpy.data.images.load(str(filepath / atlas.image))
+    image_node.image = image
 
     # Assume keyframe does not define RGB
     material.node_tree.links.new(image_node.outputs['Color'], bsdf_node.inputs['Base Color'])
@@ -258,124 +445,839 @@ def create_material(atlas, mesh_name, filepath):
     return material
 
 
-def create_constrains(bones, armature_obj, iks, tks, paths, is_armature_control):
+###
+# One material per atlas page and blend mode, shared by every attachment on the page.
+# Slot tint and alpha are read from the object's mdst_color and mdst_alpha custom properties,
+#   so animating them does not need a node tree per attachment.
+def create_pooled_material(atlas, blend, image, attribute_type='OBJECT'):
+    material = bpy.data.materials.new(atlas.image if blend == 'normal' else '{}_{}'.format(atlas.image, blend))
+    material.use_nodes = True
+    material.blend_method = 'BLEND'
+    material.shadow_method = 'CLIP'
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+
+    bsdf_node = get_material_node(nodes, 'BSDF_PRINCIPLED')
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.location = (-900, 0)
+    image_node.image = image
+
+    color_node = nodes.new('ShaderNodeAttribute')
+    color_node.location = (-900, -300)
+    color_node.attribute_type = attribute_type
+    color_node.attribute_name = 'mdst_color'
+
+    alpha_node = nodes.new('ShaderNodeAttribute')
+    alpha_node.location = (-900, -500)
+    alpha_node.attribute_type = attribute_type
+    alpha_node.attribute_name = 'mdst_alpha'
+
+    tint_node = nodes.new('ShaderNodeMix')
+    tint_node.name = 'mdst_tint'
+    tint_node.location = (-600, 0)
+    tint_node.data_type = 'RGBA'
+    tint_node.blend_type = 'MULTIPLY'
+    tint_node.inputs[0].default_value = 1
+    links.new(image_node.outputs['Color'], tint_node.inputs[6])
+    links.new(color_node.outputs['Color'], tint_node.inputs[7])
+
+    opacity_node = nodes.new('ShaderNodeMath')
+    opacity_node.name = 'mdst_opacity'
+    opacity_node.location = (-600, -300)
+    opacity_node.operation = 'MULTIPLY'
+    links.new(image_node.outputs['Alpha'], opacity_node.inputs[0])
+    links.new(alpha_node.outputs['Fac'], opacity_node.inputs[1])
+
+    if blend == 'additive':
+        # light only adds up, the transparent shader keeps what is behind
+        nodes.remove(bsdf_node)
+        emission_node = nodes.new('ShaderNodeEmission')
+        emission_node.location = (-300, 0)
+        transparent_node = nodes.new('ShaderNodeBsdfTransparent')
+        transparent_node.location = (-300, -200)
+        add_node = nodes.new('ShaderNodeAddShader')
+        links.new(tint_node.outputs[2], emission_node.inputs['Color'])
+        links.new(opacity_node.outputs[0], emission_node.inputs['Strength'])
+        links.new(emission_node.outputs[0], add_node.inputs[0])
+        links.new(transparent_node.outputs[0], add_node.inputs[1])
+        links.new(add_node.outputs[0], get_material_node(nodes, 'OUTPUT_MATERIAL').inputs['Surface'])
+    else:
+        if blend != 'normal':
+            MDST_LOGGER.warning('Blend mode {} is shaded as normal'.format(blend))
+        links.new(tint_node.outputs[2], bsdf_node.inputs['Base Color'])
+        links.new(opacity_node.outputs[0], bsdf_node.inputs['Alpha'])
+
+    return material
+
+
+def set_slot_color(obj, color, suffix=''):
+    obj['mdst_color' + suffix] = [color.r, color.g, color.b]
+    obj['mdst_alpha' + suffix] = color.a
+
+
+###
+# Merged import, every mesh and region attachment goes into one mesh per atlas page (PAGE) or per character (CHARACTER).
+# Point attributes: mdst_slot (slot index), mdst_depth (layer offset, baked into y), mdst_color and mdst_alpha (slot setup color).
+# parts: dicts of page, slot, positions, triangles, uvs and influence (vertex, bone, weight) per attachment
+def write_merged_meshes(parts, merge_mode, bones, armature_obj, layer_gap, page_images):
+    if any(part['slot'].blend != 'normal' for part in parts):
+        MDST_LOGGER.warning('Slot blend modes are shaded as normal in merged mode')
+
+    groups = {}
+    for part in parts:
+        groups.setdefault(_Path(part['page'].image).stem if merge_mode == 'PAGE' else 'merged', []).append(part)
+
+    materials = {}
+    merged_objs = []
+    for name, group in groups.items():
+        pages = list({id(part['page']): part['page'] for part in group}.values())
+        vertex_counts = [len(part['positions']) for part in group]
+        offsets = np.cumsum([0] + vertex_counts[:-1])
+
+        slot_idx = np.repeat([part['slot'].slot_idx for part in group], vertex_counts).astype(np.int32)
+        depth = slot_idx * layer_gap
+        positions = np.concatenate([part['positions'] for part in group]).astype(float)
+        positions[:, 1] += depth
+        triangles = np.concatenate([np.asarray(part['triangles'], dtype=np.int32).reshape(-1, 3) + offset for part, offset in zip(group, offsets)])
+        uvs = np.concatenate([np.asarray(part['uvs'], dtype=float).reshape(-1, 2) for part in group])
+        colors = [RGBA(part['slot'].color) for part in group]
+        color = np.repeat([[c.r, c.g, c.b, c.a] for c in colors], vertex_counts, axis=0)
+        material_index = np.repeat([pages.index(part['page']) for part in group], [len(part['triangles']) for part in group])
+
+        mesh_object = bpy.data.meshes.new(name)
+        obj = bpy.data.objects.new(name, mesh_object)
+        bpy.context.scene.collection.objects.link(obj)
+
+        write_mesh(mesh_object, positions, triangles, uvs)
+        mesh_object.polygons.foreach_set('material_index', material_index.astype(np.int32))
+        mesh_object.attributes.new('mdst_slot', 'INT', 'POINT').data.foreach_set('value', slot_idx)
+        mesh_object.attributes.new('mdst_depth', 'FLOAT', 'POINT').data.foreach_set('value', depth.astype(np.float32))
+        mesh_object.attributes.new('mdst_color', 'FLOAT_COLOR', 'POINT').data.foreach_set('color', color.astype(np.float32).ravel())
+        mesh_object.attributes.new('mdst_alpha', 'FLOAT', 'POINT').data.foreach_set('value', color[:, 3].astype(np.float32))
+        mesh_object.update()
+
+        for page in pages:
+            # slot terms are added per object, so each merged mesh owns its materials
+            material = create_pooled_material(page, 'normal', page_images.get(page), 'GEOMETRY')
+            add_slot_node(material)
+            mesh_object.materials.append(material)
+
+        write_vertex_groups(
+            obj, [bone.name for bone in bones],
+            np.concatenate([np.asarray(part['influence'][0]) + offset for part, offset in zip(group, offsets)]),
+            np.concatenate([part['influence'][1] for part in group]),
+            np.concatenate([part['influence'][2] for part in group]),
+        )
+        obj.modifiers.new('Armature', 'ARMATURE').object = armature_obj
+        obj['mdst_slots'] = sorted(set(slot_idx.tolist()))
+        merged_objs.append(obj)
+
+    return merged_objs
+
+
+def add_slot_node(material):
+    slot_node = material.node_tree.nodes.new('ShaderNodeAttribute')
+    slot_node.name = 'mdst_slot'
+    slot_node.location = (-1200, 0)
+    slot_node.attribute_type = 'GEOMETRY'
+    slot_node.attribute_name = 'mdst_slot'
+
+
+###
+# An animated slot of a merged mesh reads its color, alpha and visibility from the object properties
+#   mdst_color_<slot>, mdst_alpha_<slot> and mdst_visible_<slot>.
+# The shader terms are only added once a slot is animated, static slots keep the point attributes.
+def add_merged_slot(obj, slot_idx, color):
+    suffix = '_{}'.format(slot_idx)
+    if 'mdst_alpha' + suffix in obj:
+        return
+    set_slot_color(obj, color, suffix)
+    obj['mdst_visible' + suffix] = 1.0
+
+    for material in obj.data.materials:
+        nodes, links = material.node_tree.nodes, material.node_tree.links
+        tint_node, opacity_node = nodes['mdst_tint'], nodes['mdst_opacity']
+        y = -200 * len(nodes)
+
+        is_slot_node = nodes.new('ShaderNodeMath')
+        is_slot_node.location = (-1200, y)
+        is_slot_node.operation = 'COMPARE'
+        is_slot_node.inputs[1].default_value = slot_idx
+        is_slot_node.inputs[2].default_value = 0.5
+        links.new(nodes['mdst_slot'].outputs['Fac'], is_slot_node.inputs[0])
+
+        attribute_nodes = []
+        for attribute_name in ['mdst_color', 'mdst_alpha', 'mdst_visible']:
+            attribute_node = nodes.new('ShaderNodeAttribute')
+            attribute_node.location = (-1500, y - 200 * len(attribute_nodes))
+            attribute_node.attribute_type = 'OBJECT'
+            attribute_node.attribute_name = attribute_name + suffix
+            attribute_nodes.append(attribute_node)
+        color_node, alpha_node, visible_node = attribute_nodes
+
+        visible_alpha_node = nodes.new('ShaderNodeMath')
+        visible_alpha_node.location = (-1200, y - 200)
+        visible_alpha_node.operation = 'MULTIPLY'
+        links.new(alpha_node.outputs['Fac'], visible_alpha_node.inputs[0])
+        links.new(visible_node.outputs['Fac'], visible_alpha_node.inputs[1])
+
+        alpha_mix_node = nodes.new('ShaderNodeMix')
+        alpha_mix_node.location = (-900, y)
+        links.new(is_slot_node.outputs[0], alpha_mix_node.inputs[0])
+        links.new(opacity_node.inputs[1].links[0].from_socket, alpha_mix_node.inputs[2])
+        links.new(visible_alpha_node.outputs[0], alpha_mix_node.inputs[3])
+        links.new(alpha_mix_node.outputs[0], opacity_node.inputs[1])
+
+        color_mix_node = nodes.new('ShaderNodeMix')
+        color_mix_node.location = (-900, y - 200)
+        color_mix_node.data_type = 'RGBA'
+        links.new(is_slot_node.outputs[0], color_mix_node.inputs[0])
+        links.new(tint_node.inputs[7].links[0].from_socket, color_mix_node.inputs[6])
+        links.new(color_node.outputs['Color'], color_mix_node.inputs[7])
+        links.new(color_mix_node.outputs[2], tint_node.inputs[7])
+
+
+###
+# Keys of one f-curve collected in python lists and written at once by write_fcurve:
+#   keyframe_points.add(n), then foreach_set of co, handles, interpolation and handle types, then fcurve.update().
+# handles: bezier handles (right of this key, left of the next key) of the segment starting at this key,
+#   sides without a handle stay AUTO_CLAMPED and are recalculated by update().
+INTERPOLATION_ENUM = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+HANDLE_ENUM = {'FREE': 0, 'AUTO_CLAMPED': 4}
+
+
+class FCurveKeys:
+    def __init__(self):
+        self.co = []
+        self.handle_left = []
+        self.handle_right = []
+        self.interpolation = []
+        self.next_handle_left = None
+
+    def __len__(self):
+        return len(self.co)
+
+    def add(self, frame, value, interpolation='LINEAR', handles=None):
+        self.co.append((frame, value))
+        self.handle_left.append(self.next_handle_left)
+        self.handle_right.append(handles[0] if handles else None)
+        self.next_handle_left = handles[1] if handles else None
+        self.interpolation.append('BEZIER' if handles else interpolation)
+
+
+# Spine timeline keys to FCurveKeys per channel.
+# raw: per channel the key values, transform: per channel the mapping of key and curve values to the property value.
+# A bezier curve holds cx1, cy1, cx2, cy2 for every channel in order, anything but LINEAR is stepped.
+def timeline_keys(timeline, fps, raw, transforms):
+    channels = [FCurveKeys() for _ in raw]
+    for key_idx, key in enumerate(timeline):
+        frame = round(key.get('time', 0) * fps)
+        curve = key.get('curve', 'LINEAR')
+        for idx, (keys, transform) in enumerate(zip(channels, transforms)):
+            value = transform(raw[idx][key_idx])
+            if type(curve) == list:
+                cx1, cy1, cx2, cy2 = curve[idx * 4:idx * 4 + 4]
+                keys.add(frame, value, handles=((cx1 * fps, transform(cy1)), (cx2 * fps, transform(cy2))))
+            else:
+                keys.add(frame, value, curve if curve == 'LINEAR' else 'CONSTANT')
+    return channels
+
+
+def id_action(id_data):
+    if not id_data.animation_data:
+        id_data.animation_data_create()
+    if not id_data.animation_data.action:
+        id_data.animation_data.action = bpy.data.actions.new(id_data.name + 'Action')
+    return id_data.animation_data.action
+
+
+# replaces the f-curve of data_path[index] in action by keys
+def write_fcurve(action, data_path, index, keys, group=''):
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    if not len(keys):
+        return fcurve
+
+    co = np.asarray(keys.co, dtype=np.float32)
+    handle_left = np.array([co[i] if handle is None else handle for i, handle in enumerate(keys.handle_left)], dtype=np.float32)
+    handle_right = np.array([co[i] if handle is None else handle for i, handle in enumerate(keys.handle_right)], dtype=np.float32)
+    handle_types = [[HANDLE_ENUM['AUTO_CLAMPED' if handle is None else 'FREE'] for handle in handles] for handles in (keys.handle_left, keys.handle_right)]
+
+    points = fcurve.keyframe_points
+    points.add(len(keys))
+    points.foreach_set('co', co.ravel())
+    points.foreach_set('handle_left', handle_left.ravel())
+    points.foreach_set('handle_right', handle_right.ravel())
+    points.foreach_set('interpolation', [INTERPOLATION_ENUM[interpolation] for interpolation in keys.interpolation])
+    points.foreach_set('handle_left_type', handle_types[0])
+    points.foreach_set('handle_right_type', handle_types[1])
+    fcurve.update()
+    return fcurve
+
+
+###
+# Key reduction after import, on the keyframe arrays read with foreach_get and written back in bulk.
+# A channel that never moves keeps a single key, or is dropped when it holds the staticAction (rest) value.
+# Stepped keys repeating the previous value (hide, visibility, draw order) and linear keys the line through
+#   their kept neighbours reproduces within tolerance are removed, bezier keys are kept as their handles carry spine's curves.
+POINT_ATTRIBUTES = [
+    ('co', 2, np.float32), ('handle_left', 2, np.float32), ('handle_right', 2, np.float32),
+    ('interpolation', 1, np.int32), ('handle_left_type', 1, np.int32), ('handle_right_type', 1, np.int32),
+]
+
+
+def read_points(fcurve):
+    points = fcurve.keyframe_points
+    arrays = {}
+    for name, width, dtype in POINT_ATTRIBUTES:
+        values = np.zeros(len(points) * width, dtype=dtype)
+        points.foreach_get(name, values)
+        arrays[name] = values.reshape(-1, width) if width > 1 else values
+    return arrays
+
+
+# rewrites fcurve with the keys at indices keep, returns the new f-curve
+def write_points(action, fcurve, arrays, keep):
+    data_path, index = fcurve.data_path, fcurve.array_index
+    group = fcurve.group.name if fcurve.group else ''
+    action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    points = fcurve.keyframe_points
+    points.add(len(keep))
+    for name, _, _ in POINT_ATTRIBUTES:
+        points.foreach_set(name, arrays[name][keep].ravel())
+    fcurve.update()
+    return fcurve
+
+
+# indices of the keys needed to reproduce the curve within tolerance
+def reduce_keys(co, interpolation, tolerance):
+    frames, values = co[:, 0], co[:, 1]
+    constant, linear = INTERPOLATION_ENUM['CONSTANT'], INTERPOLATION_ENUM['LINEAR']
+    keep = [0]
+    for i in range(1, len(co)):
+        prev = keep[-1]
+        last = i == len(co) - 1
+        if interpolation[prev] == constant and (last or interpolation[i] == constant):
+            if abs(values[i] - values[prev]) <= tolerance:
+                continue
+        elif interpolation[prev] == linear and (last or interpolation[i] == linear):
+            # the last key is only dropped when the curve already rests at the kept value
+            if last:
+                line = values[prev]
+            else:
+                line = values[prev] + (values[i + 1] - values[prev]) * (frames[prev + 1:i + 1] - frames[prev]) / (frames[i + 1] - frames[prev])
+            if np.all(np.abs(values[prev + 1:i + 1] - line) <= tolerance):
+                continue
+        keep.append(i)
+    return keep
+
+
+# rest: value by (data_path, index) a constant channel may be dropped for, returns the number of removed keys
+def reduce_action(action, tolerance, rest=None):
+    rest = rest or {}
+    removed = 0
+    for fcurve in list(action.fcurves):
+        arrays = read_points(fcurve)
+        count = len(arrays['co'])
+        if not count:
+            continue
+
+        bezier = arrays['interpolation'] == INTERPOLATION_ENUM['BEZIER']
+        values = np.concatenate([arrays['co'][:, 1], arrays['handle_left'][bezier, 1], arrays['handle_right'][bezier, 1]])
+        if np.ptp(values) <= tolerance:
+            key = (fcurve.data_path, fcurve.array_index)
+            if key in rest and abs(values[0] - rest[key]) <= tolerance:
+                action.fcurves.remove(fcurve)
+                removed += count
+                continue
+            keep = [0]
+        else:
+            keep = reduce_keys(arrays['co'], arrays['interpolation'], tolerance)
+
+        if len(keep) < count:
+            write_points(action, fcurve, arrays, keep)
+            removed += count - len(keep)
+    return removed
+
+
+# the actions recorded in rootControl['mdst_actions'], staticAction last: channels no other action animates are dropped there
+def reduce_actions(tolerance):
+    actions = imported_actions()
+    static_action = next((action for action in actions if action.name == 'staticAction'), None)
+    rest = {}
+    if static_action:
+        for fcurve in static_action.fcurves:
+            if len(fcurve.keyframe_points):
+                rest[(fcurve.data_path, fcurve.array_index)] = fcurve.keyframe_points[0].co[1]
+
+    removed = 0
+    animated = set()
+    for action in actions:
+        if action == static_action:
+            continue
+        removed += reduce_action(action, tolerance, rest)
+        animated.update((fcurve.data_path, fcurve.array_index) for fcurve in action.fcurves)
+
+    if static_action:
+        for fcurve in list(static_action.fcurves):
+            if (fcurve.data_path, fcurve.array_index) not in animated:
+                removed += len(fcurve.keyframe_points)
+                static_action.fcurves.remove(fcurve)
+
+    MDST_LOGGER.info(f'Removed {removed} keys within tolerance {tolerance}')
+    return removed
+
+
+# hidden while the attachment is null, visible before the first key
+def visibility_keys(attachments, fps, hidden=1.0, visible=0.0):
+    keys = FCurveKeys()
+    if attachments and round(attachments[0].get('time', 0) * fps) > 0:
+        keys.add(0, visible, 'CONSTANT')
+    for attachment in attachments:
+        keys.add(round(attachment.get('time', 0) * fps), hidden if attachment.get('name') is None else visible, 'CONSTANT')
+    return keys
 
-    control = '_Control' if is_armature_control else ''
-    pose_bones = [armature_obj.pose.bones[bone.name + control] for bone in bones]
+
+def key_merged_slot(obj, slot_idx, slot, color, fps, action=None):
+    keyframes = slot.get('rgba', slot.get('color', []))
+    attachments = slot.get('attachment', [])
+    if not keyframes and not attachments:
+        return 0
+
+    add_merged_slot(obj, slot_idx, color)
+    action = action or id_action(obj)
+    frame_end = key_slot_color(obj, keyframes, fps, '_{}'.format(slot_idx), action)
+
+    if attachments:
+        keys = visibility_keys(attachments, fps, hidden=0.0, visible=1.0)
+        write_fcurve(action, '["mdst_visible_{}"]'.format(slot_idx), 0, keys)
+        frame_end = max(frame_end, keys.co[-1][0])
+    return frame_end
+
+
+def color_keys(keyframes, fps, transforms=(float, float, float, float)):
+    colors = [RGBA(keyframe['color']) for keyframe in keyframes]
+    raw = [[getattr(color, channel) for color in colors] for channel in 'rgba']
+    return timeline_keys(keyframes, fps, raw, transforms)
+
+
+# slot rgba keys on the pooled material properties, one f-curve per channel with spine's bezier handles
+def key_slot_color(obj, keyframes, fps, suffix='', action=None):
+    if not keyframes:
+        return 0
+    color_path, alpha_path = '["mdst_color{}"]'.format(suffix), '["mdst_alpha{}"]'.format(suffix)
+    action = action or id_action(obj)
+    for keys, (data_path, idx) in zip(color_keys(keyframes, fps), [(color_path, 0), (color_path, 1), (color_path, 2), (alpha_path, 0)]):
+        write_fcurve(action, data_path, idx, keys)
+    return round(keyframes[-1].get('time', 0) * fps)
+
+
+###
+# Constraints are resolved once from the parsed rig into a flat list of plain (json serializable) specs,
+#   apply_constraint_plan then writes the same plan to rootControl and root with their bone name suffix.
+# type: Blender constraint type, or POLE (ik pole placement) and PATH (hooked path curve)
+# owner, subtarget: bone names without suffix, settings: constraint attributes set as is
+# toggle: enabled only on the rig applied with enabled=True, root follows rootControl through COPY_TRANSFORMS instead
+def build_constraint_plan(bones, iks, tks, paths):
+    plan = []
+    warnings = []
 
     for ik in iks:
-        ik_constraint = pose_bones[ik.child_bone.bone_idx if ik.child_bone else ik.parent_bone.bone_idx].constraints.new('IK')
-        ik_constraint.target = armature_obj
-        ik_constraint.subtarget = ik.target_bone.name + control
-        ik_constraint.chain_count = ik.chain_length
-        ik_constraint.use_stretch = ik.stretch
-
-        # spine uses softness, default 0, max 160 in spine?
-        # there isn't really a 'softness' in blender, hopefully this is close enough
-        ik_constraint.influence = (1 - ik.softness / 160) * ik.mix
-
-        ik_constraint.enabled = is_armature_control
-
-        if ik.child_bone and is_armature_control:
-            pole_bone = armature_obj.pose.bones[ik.name + '_Pole']
-            parent_bone = armature_obj.pose.bones[ik.parent_bone.name + control]
-            pole_bone.rotation_mode = 'XYZ'
-            angle = parent_bone.rotation_euler[0] + (- math.pi / 2 if ik.bendPositive else math.pi / 2)
-            pole_bone.rotation_euler[0] = angle
-            pole_bone.location = parent_bone.location + 10 * mathutils.Vector((0, math.cos(angle) - math.sin(angle), math.sin(angle) + math.cos(angle)))
-            pole_bone.scale = parent_bone.scale
-
-            # ik_constraint.pole_target = armature_obj
-            # ik_constraint.pole_subtarget = pole_bone.name + control
-            # ik_constraint.pole_angle = - math.pi / 2
-
-        # unused
-        # ik_constraint.use_tail = True
-        # ik_constraint.pole_target = armature_obj
-        # ik_constraint.pole_subtarget = ik.parent_bone.name + control
-        # ik_constraint.pole_angle = math.radians(ik.bendPositive * 180)
-        # ik_constraint.use_stretch = ik.stretch
-        # ik_constraint.use_location = True
-        # ik_constraint.use_rotation = True
-        # ik_constraint.use_scale = True
-        # ik_constraint.use_stretch = True
-        # ik_constraint.use_stretch_rotation = True
-        # ik_constraint.use_inverse_kinematics = True
-        # ik_constraint.weight = 1
-        # ik_constraint.use_chain_offset = True
+        plan.append({
+            'type': 'IK', 'owner': (ik.child_bone or ik.parent_bone).name, 'subtarget': ik.target_bone.name, 'toggle': True,
+            'settings': {
+                'chain_count': ik.chain_length,
+                'use_stretch': bool(ik.stretch),
+                # spine uses softness, default 0, max 160 in spine?
+                # there isn't really a 'softness' in blender, hopefully this is close enough
+                'influence': (1 - ik.softness / 160) * ik.mix,
+            },
+        })
+
+        if ik.child_bone:
+            # pole guide next to the parent bone's setup pose, only rootControl has pole bones
+            parent = ik.parent_bone
+            angle = parent.rotation + (- math.pi / 2 if ik.bendPositive else math.pi / 2)
+            plan.append({
+                'type': 'POLE', 'owner': ik.name + '_Pole', 'rotation': angle,
+                'location': [0, parent.x + 10 * (math.cos(angle) - math.sin(angle)), parent.y + 10 * (math.sin(angle) + math.cos(angle))],
+                'scale': [1, parent.scaleX, parent.scaleY],
+            })
 
     # create transform constraints modifier
     for transform in tks:
+        if transform.mixX and transform.mixX != -1:
+            warnings.append('Copy Transformation Mode not implemented')
+        if transform.mixScaleX and transform.mixScaleX != -1:
+            warnings.append('Copy Scale Mode not implemented')
+        if transform.mixShearY and transform.mixShearY != -1:
+            warnings.append('Copy Shear Mode not implemented')
+
         for bone in transform.bone_list:
             if transform.mixX == -1:
-                tk_constraint = pose_bones[bone.bone_idx].constraints.new('COPY_LOCATION')
-                tk_constraint.target = armature_obj
-                tk_constraint.subtarget = transform.target + control
-                tk_constraint.influence = math.fabs(transform.mixX)
-                tk_constraint.use_x = tk_constraint.use_y = tk_constraint.use_z = tk_constraint.use_offset = True
-                tk_constraint.invert_x = tk_constraint.invert_y = tk_constraint.invert_z = transform.mixX < 0
+                plan.append({
+                    'type': 'COPY_LOCATION', 'owner': bone.name, 'subtarget': transform.target, 'toggle': True,
+                    'settings': {
+                        'influence': math.fabs(transform.mixX),
+                        'use_x': True, 'use_y': True, 'use_z': True, 'use_offset': True,
+                        'invert_x': True, 'invert_y': True, 'invert_z': True,
+                        # what is the difference between LOCAL_WITH_PARENT?
+                        'target_space': 'LOCAL', 'owner_space': 'LOCAL',
+                    },
+                })
+
+            if transform.mixRotate:
+                plan.append({
+                    'type': 'COPY_ROTATION', 'owner': bone.name, 'subtarget': transform.target, 'toggle': True,
+                    'settings': {'influence': transform.mixRotate, 'use_y': False, 'use_z': False, 'euler_order': 'XYZ'},
+                })
+
+    # Bezier point i holds the path vertices 3i, 3i + 1, 3i + 2 (handle left, point, handle right) as curve indices,
+    #   every vertex is hooked by its own influences, one hook per bone and distinct weight.
+    world = bone_world_matrix(bones)
+    for path in paths:
+        point_count = path.vertexCount // 3
+        # spine x, y to curve space x, y, z
+        points = skin_vertices(path.vertices, world)[:point_count * 3, [0, 2, 1]]
+        owner = _influence_owner(path.vertices)
+        keep = owner < point_count * 3
+        hooks = group_influences(owner[keep], np.asarray(path.vertices.bones)[keep], np.asarray(path.vertices.weights)[keep])
+        plan.append({
+            'type': 'PATH', 'owner': path.name, 'points': points.tolist(),
+            'hooks': [[bones[bone_idx].name, weight, indices] for bone_idx, weight, indices in hooks],
+        })
+        plan.append({'type': 'SPLINE_IK', 'owner': path.bones_list[0].name, 'curve': path.name, 'settings': {}})
+        plan.append({'type': 'SPLINE_IK', 'owner': path.bones_list[-1].name, 'curve': path.name, 'settings': {'chain_count': len(path.bones_list)}})
+
+    for warning in dict.fromkeys(warnings):
+        MDST_LOGGER.warning(warning)
+    return plan
+
+
+def create_path_curve(name, points):
+    points = np.asarray(points, dtype=np.float32)
+    curve_data = bpy.data.curves.new(name, 'CURVE')
+    spline = curve_data.splines.new('BEZIER')
+    spline.bezier_points.add(len(points) // 3 - 1)
+    spline.bezier_points.foreach_set('handle_left', points[0::3].ravel())
+    spline.bezier_points.foreach_set('co', points[1::3].ravel())
+    spline.bezier_points.foreach_set('handle_right', points[2::3].ravel())
+    return curve_data
+
+
+# curves: curve data by path name, pass the same dict for every rig so they share it
+def apply_constraint_plan(plan, armature_obj, suffix, enabled, curves=None):
+    curves = {} if curves is None else curves
+    pose_bones = armature_obj.pose.bones
+    curve_objs = {}
+
+    for spec in plan:
+        if spec['type'] == 'POLE':
+            pole_bone = pose_bones.get(spec['owner'])
+            if pole_bone:
+                pole_bone.rotation_mode = 'XYZ'
+                pole_bone.rotation_euler[0] = spec['rotation']
+                pole_bone.location = spec['location']
+                pole_bone.scale = spec['scale']
+            continue
 
-                # what is the difference between LOCAL_WITH_PARENT?
-                tk_constraint.target_space = tk_constraint.owner_space = 'LOCAL'
+        if spec['type'] == 'PATH':
+            if spec['owner'] not in curves:
+                curves[spec['owner']] = create_path_curve(spec['owner'], spec['points'])
+            curve = bpy.data.objects.new(spec['owner'] + suffix + '_Curve', curves[spec['owner']])
+            bpy.context.scene.collection.objects.link(curve)
+            curve.rotation_euler = (math.pi / 2, 0, 0)
+            for bone_name, weight, indices in spec['hooks']:
+                hook = curve.modifiers.new('HOOK', 'HOOK')
+                hook.vertex_indices_set(indices)
+                hook.object = armature_obj
+                hook.subtarget = bone_name + suffix
+                hook.strength = weight
+            curve_objs[spec['owner']] = curve
+            continue
 
-                tk_constraint.enabled = is_armature_control
+        constraint = pose_bones[spec['owner'] + suffix].constraints.new(spec['type'])
+        if spec['type'] == 'SPLINE_IK':
+            constraint.target = curve_objs[spec['curve']]
+        else:
+            constraint.target = armature_obj
+            constraint.subtarget = spec['subtarget'] + suffix
+        for k, v in spec['settings'].items():
+            setattr(constraint, k, v)
+        if spec.get('toggle'):
+            constraint.enabled = enabled
 
-            if transform.mixX and transform.mixX != -1:
-                MDST_LOGGER.warning('Copy Transformation Mode not implemented')
-            if transform.mixScaleX and transform.mixScaleX != -1:
-                MDST_LOGGER.warning('Copy Scale Mode not implemented')
-            if transform.mixShearY and transform.mixShearY != -1:
-                MDST_LOGGER.warning('Copy Shear Mode not implemented')
 
-            if transform.mixRotate:
-                tk_constraint = pose_bones[bone.bone_idx].constraints.new('COPY_ROTATION')
-                tk_constraint.target = armature_obj
-                tk_constraint.subtarget = transform.target + control
-                tk_constraint.influence = transform.mixRotate
-                tk_constraint.use_y = tk_constraint.use_z = False
-                tk_constraint.euler_order = 'XYZ'
+def load_vertex(vertex_data, vertex_count, single_bone_idx=None):
+    return VertexData(vertex_data, vertex_count, single_bone_idx)
 
-                tk_constraint.enabled = is_armature_control
 
-    # create path curve
-    for path in paths:
-        curve = bpy.data.objects.new(path.name + control + '_Curve', bpy.data.curves.new(path.name + control, 'CURVE'))
-        bpy.context.scene.collection.objects.link(curve)
-        curve.rotation_euler = (math.pi / 2, 0, 0)
-        curve_obj = curve.data.splines.new('BEZIER')
-        curve_obj.bezier_points.add(path.vertexCount // 3 - 1)
-        for bezier_idx, bezier_point in enumerate(curve_obj.bezier_points):
-            p_l, p_m, p_r = path.vertices[bezier_idx * 3:bezier_idx * 3 + 3]
-            bezier_point.co = p_m.euler_pos(bones, 'xzy')
-            bezier_point.handle_left = p_l.euler_pos(bones, 'xzy')
-            bezier_point.handle_right = p_r.euler_pos(bones, 'xzy')
-            # bezier_point.handle_left_type = 'AUTO'
-            # bezier_point.handle_right_type = 'AUTO'
-
-            for idx, bone_idx in enumerate(p_m.bone_idx):
-                hook = curve.modifiers.new('HOOK', 'HOOK')
-                hook.center = bezier_point.co
-                hook.vertex_indices_set([bezier_idx*3, bezier_idx*3+1, bezier_idx*3+2])
-                bpy.context.evaluated_depsgraph_get()
-                hook.object = armature_obj
-                hook.subtarget = bones[bone_idx].name + control
-                hook.strength = p_m.bone_weight[idx]
+def bone_world_matrix(bones):
+    # a, b, c, d, world x, world y for each bone, rows indexed by bone_idx
+    return np.array([bone.matrix + (bone.abs_x, bone.abs_y) for bone in bones], dtype=float).reshape(-1, 6)
+
+
+def _influence_owner(vertices):
+    offsets = np.asarray(vertices.offsets)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _sum_influence(vertices, x, y):
+    owner = _influence_owner(vertices)
+    weights = np.asarray(vertices.weights)
+    positions = np.zeros((len(vertices), 3))
+    positions[:, 0] = np.bincount(owner, x * weights, len(vertices))
+    positions[:, 2] = np.bincount(owner, y * weights, len(vertices))
+    return positions
 
-    # create spline ik constraints modifier
-    for path in paths:
-        spline_ik = pose_bones[path.bones_list[0].bone_idx].constraints.new('SPLINE_IK')
-        spline_ik.target = bpy.data.objects[path.name + control + '_Curve']
 
-        spline_ik = pose_bones[path.bones_list[-1].bone_idx].constraints.new('SPLINE_IK')
-        spline_ik.target = bpy.data.objects[path.name + control + '_Curve']
-        spline_ik.chain_count = len(path.bones_list)
+# setup pose position of every vertex in one go, as (x, 0, y) rows
+def skin_vertices(vertices, world):
+    x, y = np.asarray(vertices.x), np.asarray(vertices.y)
+    m = world[np.asarray(vertices.bones)]
+    return _sum_influence(vertices, m[:, 0] * x + m[:, 1] * y + m[:, 4], m[:, 2] * x + m[:, 3] * y + m[:, 5])
 
 
-def load_vertex(vertex_data, single_bone_idx=None):
-    vertices = []
-    while vertex_data:
-        vertices.append(Vertex(vertex_data, single_bone_idx))
-    return vertices
+# bind positions blended by weight, ignoring bone transforms, for the alternative mesh
+def skin_vertices_local(vertices):
+    return _sum_influence(vertices, np.asarray(vertices.x), np.asarray(vertices.y))
+
+
+# Mesh sized up front and filled from flat buffers:
+#   positions (n, 3) rows, triangles (t, 3) vertex indices, uvs (n, 2) per vertex spread over the loops.
+def write_mesh(mesh_object, positions, triangles, uvs=None, uv_name='UVMap'):
+    positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+    loops = np.ascontiguousarray(triangles, dtype=np.int32).ravel()
+
+    mesh_object.vertices.add(len(positions))
+    mesh_object.loops.add(len(loops))
+    mesh_object.polygons.add(len(loops) // 3)
+
+    mesh_object.vertices.foreach_set('co', positions.ravel())
+    mesh_object.loops.foreach_set('vertex_index', loops)
+    mesh_object.polygons.foreach_set('loop_start', np.arange(0, len(loops), 3, dtype=np.int32))
+    # polygon sizes follow from loop_start since Blender 4.0
+    if bpy.app.version < (4, 0, 0):
+        mesh_object.polygons.foreach_set('loop_total', np.full(len(loops) // 3, 3, dtype=np.int32))
+
+    if uvs is not None:
+        uv = mesh_object.uv_layers.new(name=uv_name)
+        uv.data.foreach_set('uv', np.ascontiguousarray(uvs, dtype=np.float32).reshape(-1, 2)[loops].ravel())
+
+    mesh_object.update(calc_edges=True)
+
+
+# weights are rounded to this precision so near-identical weights share one vertex_group.add
+WEIGHT_DECIMALS = 4
+
+
+# Influences as parallel vertex, bone and weight arrays grouped per bone and distinct weight,
+#   yields bone index, weight and the vertex indices sharing them.
+# The rounding error of a vertex goes to its largest weight, so the weights of every vertex keep their sum.
+def group_influences(influence_vertex, influence_bone, influence_weight):
+    vertex = np.asarray(influence_vertex, dtype=np.intp)
+    bone = np.asarray(influence_bone)
+    exact = np.asarray(influence_weight, dtype=float)
+    weight = np.round(exact, WEIGHT_DECIMALS)
+    if len(vertex):
+        largest = np.lexsort((-exact, vertex))
+        largest = largest[np.r_[True, vertex[largest][1:] != vertex[largest][:-1]]]
+        weight[largest] += np.bincount(vertex, exact - weight)[vertex[largest]]
+
+    order = np.lexsort((weight, bone))
+    vertex, bone, weight = vertex[order], bone[order], weight[order]
+    starts = np.flatnonzero(np.r_[True, (bone[1:] != bone[:-1]) | (weight[1:] != weight[:-1])])
+    ends = np.r_[starts[1:], len(order)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(bone[start]), float(weight[start]), vertex[start:end].tolist()
+
+
+# One vertex_group.add per bone and distinct weight instead of one per influence.
+# names: vertex group name per bone index
+def write_vertex_groups(obj, names, influence_vertex, influence_bone, influence_weight):
+    vertex_groups = {}
+    for bone_idx, weight, vertices in group_influences(influence_vertex, influence_bone, influence_weight):
+        if bone_idx not in vertex_groups:
+            vertex_groups[bone_idx] = obj.vertex_groups.new(name=names[bone_idx])
+        vertex_groups[bone_idx].add(vertices, weight, 'REPLACE')
+    return vertex_groups
+
+
+###
+# The alternative mesh only differs from the primary one by its vertex positions.
+# Copying the mesh keeps topology, uvs, weights and materials (shared, not duplicated, since Blender 3.6),
+#   the copied vertex groups are renamed to <bone>_Control so the weights drive the _Control bones.
+def create_alternative_mesh(obj, name, positions, armature_obj):
+    mesh_object = obj.data.copy()
+    mesh_object.name = obj.data.name + '_Control'
+    mesh_object.vertices.foreach_set('co', np.ascontiguousarray(positions, dtype=np.float32).ravel())
+    mesh_object.update()
+
+    alternative_obj = bpy.data.objects.new(name, mesh_object)
+    alternative_obj.location = obj.location
+    for vertex_group in alternative_obj.vertex_groups:
+        vertex_group.name += '_Control'
+    alternative_obj.modifiers.new('Armature', 'ARMATURE').object = armature_obj
+    return alternative_obj
+
+
+###
+# Import time clipping: masked attachments are cut against the setup pose clip polygon, no Boolean runs per frame.
+# The clip polygon is ear clipped into triangles, each masked triangle is clipped against them with Sutherland-Hodgman.
+# A clipped vertex is a barycentric combination of its source triangle, so positions, uvs and weights interpolate alike.
+def triangulate_polygon(points):
+    points = np.asarray(points, dtype=float)
+    indices = list(range(len(points)))
+    x, y = points[:, 0], points[:, 1]
+    if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0:
+        indices.reverse()
+
+    def cross(o, a, b):
+        return (points[a][0] - points[o][0]) * (points[b][1] - points[o][1]) - (points[a][1] - points[o][1]) * (points[b][0] - points[o][0])
+
+    triangles = []
+    while len(indices) > 3:
+        for i in range(len(indices)):
+            prev, curr, next = indices[i - 1], indices[i], indices[(i + 1) % len(indices)]
+            if cross(prev, curr, next) <= 0:
+                continue
+            if any(
+                cross(prev, curr, other) >= 0 and cross(curr, next, other) >= 0 and cross(next, prev, other) >= 0
+                for other in indices if other not in (prev, curr, next)
+            ):
+                continue
+            triangles.append((prev, curr, next))
+            indices.pop(i)
+            break
+        else:
+            # degenerate polygon, fan the rest
+            triangles.extend((indices[0], indices[i], indices[i + 1]) for i in range(1, len(indices) - 1))
+            return triangles
+    triangles.append(tuple(indices))
+    return triangles
+
+
+# counter clockwise convex clip against a polygon of (point, barycentric) pairs
+def clip_polygon(polygon, clip):
+    for edge in range(len(clip)):
+        c1, c2 = clip[edge], clip[(edge + 1) % len(clip)]
+        ex, ey = c2[0] - c1[0], c2[1] - c1[1]
+        output = []
+        for i in range(len(polygon)):
+            (p, bp), (q, bq) = polygon[i - 1], polygon[i]
+            side_p = ex * (p[1] - c1[1]) - ey * (p[0] - c1[0])
+            side_q = ex * (q[1] - c1[1]) - ey * (q[0] - c1[0])
+            if (side_p >= 0) != (side_q >= 0):
+                t = side_p / (side_p - side_q)
+                output.append(((p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t), bp + (bq - bp) * t))
+            if side_q >= 0:
+                output.append((q, bq))
+        polygon = output
+        if len(polygon) < 3:
+            return []
+    return polygon
+
+
+# 2d positions: (n, 2) setup pose vertex positions, polygon: (p, 2) clip polygon
+# Returns source vertex triples and barycentric weights of the output vertices and the output triangles.
+# Output vertices are welded on their rounded barycentric combination, so pieces of neighbouring ears and triangles share them.
+def clip_triangles(positions, triangles, polygon):
+    polygon = np.asarray(polygon, dtype=float)
+    clip_triangles = polygon[np.array(triangulate_polygon(polygon), dtype=np.intp).reshape(-1, 3)]
+    corners = positions[triangles]
+    edge_start = clip_triangles
+    edge_end = np.roll(clip_triangles, -1, axis=1)
+    edge = edge_end - edge_start
+    # side of every triangle corner against every clip edge: (t, 3 corners, c, 3 edges)
+    side = (edge[None, None, :, :, 0] * (corners[:, :, None, None, 1] - edge_start[None, None, :, :, 1])
+            - edge[None, None, :, :, 1] * (corners[:, :, None, None, 0] - edge_start[None, None, :, :, 0]))
+    outside = (side < 0).all(axis=1).any(axis=2).all(axis=1)
+
+    # inside the whole polygon: every corner in some ear and no triangle edge crossing a polygon edge
+    corner_inside = (side >= 0).all(axis=3).any(axis=2).all(axis=1)
+    a, b = corners, np.roll(corners, -1, axis=1)
+    c, d = polygon, np.roll(polygon, -1, axis=0)
+
+    def orient(p, q, r):
+        return (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+
+    # (t, 3 triangle edges, p polygon edges)
+    a, b, c, d = a[:, :, None], b[:, :, None], c[None, None], d[None, None]
+    crossing = (orient(a, b, c) * orient(a, b, d) < 0) & (orient(c, d, a) * orient(c, d, b) < 0)
+    inside = corner_inside & ~crossing.any(axis=(1, 2))
+
+    vertex_map = {}
+    sources, weights, output = [], [], []
+    identity = np.eye(3)
+
+    def vertex(triangle, barycentric):
+        key = tuple(sorted((idx, weight) for idx, weight in zip(triangle, np.round(barycentric, 6).tolist()) if weight))
+        if key not in vertex_map:
+            vertex_map[key] = len(sources)
+            sources.append(tuple(triangle))
+            weights.append(barycentric)
+        return vertex_map[key]
+
+    for tri_idx, triangle in enumerate(triangles.tolist()):
+        if outside[tri_idx]:
+            continue
+        if inside[tri_idx]:
+            output.append([vertex(triangle, identity[k]) for k in range(3)])
+            continue
+        for clip in clip_triangles.tolist():
+            piece = clip_polygon([(tuple(corners[tri_idx][k]), identity[k]) for k in range(3)], clip)
+            if len(piece) < 3:
+                continue
+            indices = [vertex(triangle, barycentric) for _, barycentric in piece]
+            # welding can collapse a sliver piece's corners
+            output.extend(
+                [indices[0], indices[i], indices[i + 1]] for i in range(1, len(indices) - 1)
+                if len({indices[0], indices[i], indices[i + 1]}) == 3
+            )
+
+    return (
+        np.array(sources, dtype=np.intp).reshape(-1, 3), np.array(weights, dtype=float).reshape(-1, 3),
+        np.array(output, dtype=np.int32).reshape(-1, 3)
+    )
+
+
+# a model attachment cut by a clip polygon, with the same fields write_mesh and write_vertex_groups read
+class ClippedAttachment:
+    def __init__(self, entry, polygon):
+        sources, barycentric, self.triangles = clip_triangles(np.asarray(entry.positions)[:, [0, 2]], np.asarray(entry.triangles), polygon)
+
+        def interpolate(values):
+            values = np.asarray(values)
+            return np.einsum('vk,vkc->vc', barycentric, values[sources]) if len(sources) else np.zeros((0, values.shape[1]))
+
+        self.positions = interpolate(entry.positions)
+        self.local_positions = interpolate(entry.local_positions)
+        self.uvs = interpolate(entry.uvs)
+
+        # influences of the three source vertices scaled by their barycentric weight, merged per (vertex, bone)
+        influence_vertex = np.asarray(entry.influence_vertex)
+        order = np.argsort(influence_vertex, kind='stable')
+        counts = np.bincount(influence_vertex, minlength=len(entry.positions))
+        starts = np.cumsum(counts) - counts
+        vertex, bone, weight = [], [], []
+        for k in range(3):
+            source_counts = counts[sources[:, k]]
+            total = int(source_counts.sum())
+            gather = np.repeat(starts[sources[:, k]] - (np.cumsum(source_counts) - source_counts), source_counts) + np.arange(total)
+            vertex.append(np.repeat(np.arange(len(sources)), source_counts))
+            bone.append(np.asarray(entry.influence_bone)[order][gather])
+            weight.append(np.asarray(entry.influence_weight)[order][gather] * np.repeat(barycentric[:, k], source_counts))
+        vertex, bone, weight = np.concatenate(vertex), np.concatenate(bone), np.concatenate(weight)
+
+        bone_count = int(bone.max()) + 1 if len(bone) else 1
+        keys, inverse = np.unique(vertex * bone_count + bone, return_inverse=True)
+        weight = np.bincount(inverse, weight, len(keys))
+        keep = weight > 0
+        self.influence_vertex = (keys // bone_count)[keep].astype(np.int32)
+        self.influence_bone = (keys % bone_count)[keep].astype(np.int32)
+        self.influence_weight = weight[keep]
 
 
 def load_edge(edges):
@@ -390,38 +1292,460 @@ def load_json(string):
     return json.loads(string)
 
 
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# everything up to the next brace outside of a string, in one match
+_BRACE = re.compile(r'[^"{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}]*)*[{}]')
+
+
+def _skip_whitespace(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+# end of the object starting at pos, without decoding it
+def _skip_object(text, pos):
+    depth = 0
+    for match in _BRACE.finditer(text, pos):
+        if text[match.end() - 1] == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if not depth:
+                return match.end()
+    raise ValueError('Unterminated object at %d' % pos)
+
+
+# (key, value start) of each member of the object starting at pos, value_end(key, start) returns where the value ends
+def _iter_members(text, pos, value_end):
+    pos = _skip_whitespace(text, pos)
+    if text[pos] != '{':
+        raise ValueError('Expecting object at %d' % pos)
+    pos = _skip_whitespace(text, pos + 1)
+    while text[pos] != '}':
+        key, pos = scanstring(text, pos + 1)
+        pos = _skip_whitespace(text, pos)
+        if text[pos] != ':':
+            raise ValueError('Expecting \':\' at %d' % pos)
+        start = _skip_whitespace(text, pos + 1)
+        pos = _skip_whitespace(text, value_end(key, start))
+        if text[pos] == ',':
+            pos = _skip_whitespace(text, pos + 1)
+    return pos + 1
+
+
+###
+# Spine json decoded eagerly except for animations: only the span of each animation in the source is indexed
+#   and an animation is decoded on demand, so memory and load time do not grow with the animation count.
+# data skips the span index, for skeletons already decoded elsewhere such as binary ones
+class SpineDocument:
+    def __init__(self, text, data=None):
+        self.text = text
+        self.data = {}
+        self.animation_spans = {}
+        self._decoder = json.JSONDecoder()
+        self.animations = {}
+        self._animation = (None, None)
+
+        if data is None:
+            try:
+                _iter_members(text, 1 if text.startswith('\ufeff') else 0, self._read_member)
+            except (ValueError, IndexError):
+                # let json report where the document is broken
+                data = load_json(text)
+        if data is not None:
+            self.data = {k: v for k, v in data.items() if k != 'animations'}
+            self.animations = data.get('animations', {})
+            self.animation_spans = {k: None for k in self.animations}
+
+    def _read_member(self, key, start):
+        if key == 'animations':
+            return _iter_members(self.text, start, self._index_animation)
+        self.data[key], end = self._decoder.raw_decode(self.text, start)
+        return end
+
+    def _index_animation(self, name, start):
+        end = _skip_object(self.text, start)
+        self.animation_spans[name] = (start, end)
+        return end
+
+    @property
+    def animation_names(self):
+        return list(self.animation_spans)
+
+    # default to the last animation, as MD uses the latest
+    def animation(self, name=None):
+        name = name or self.animation_names[-1]
+        if self._animation[0] != name:
+            span = self.animation_spans[name]
+            self._animation = (name, self.animations[name] if span is None else self._decoder.raw_decode(self.text, span[0])[0])
+        return self._animation[1]
+
+
+# parsed skeletons by content hash, shared by the import, load and animation operators
+SKELETON_CACHE = LRUCache(MDST_SETTINGS.skeleton_cache_size or 4)
+_skeleton_keys = {}
+
+
+def is_binary_skeleton(filepath):
+    return filepath.lower().endswith(('.skel', '.skel.bytes'))
+
+
+# json skeletons live in a text datablock or at spine_path for imports without one, binary ones are read from spine_path
+def skeleton_source(mdst_spine):
+    if mdst_spine.spine_ref:
+        return mdst_spine.spine_ref.name, mdst_spine.spine_ref.as_string()
+    source = bpy.path.abspath(mdst_spine.spine_path)
+    if is_binary_skeleton(source):
+        return source, _Path(source).read_bytes()
+    return source, _Path(source).read_text(encoding='utf-8')
+
+
+# atlas text datablock, or the file at atlas_path for imports without one
+def atlas_source(mdst_spine):
+    if mdst_spine.atlas_ref:
+        return mdst_spine.atlas_ref.filepath, mdst_spine.atlas_ref.as_string()
+    source = bpy.path.abspath(mdst_spine.atlas_path)
+    return source, _Path(source).read_text(encoding='utf-8')
+
+
+def load_skeleton(mdst_spine, source=None, content=None):
+    if content is None:
+        source, content = skeleton_source(mdst_spine)
+    key = content_hash(content)
+
+    # drop the stale entry once the text datablock or file has been edited or reloaded
+    previous_key = _skeleton_keys.get(source)
+    if previous_key and previous_key != key:
+        SKELETON_CACHE.pop(previous_key)
+    _skeleton_keys[source] = key
+
+    document = SKELETON_CACHE.get(key)
+    if document is None:
+        if isinstance(content, str):
+            document = SpineDocument(content)
+        else:
+            document = SpineDocument('', read_skeleton_binary(content))
+            MDST_LOGGER.info(f'Read binary skeleton {source}, spine {document.data["skeleton"].get("spine")}')
+        SKELETON_CACHE.put(key, document)
+    return document
+
+
+# bump whenever the model layout or its preprocessing changes, old entries are simply never hit again
+MODEL_VERSION = 'mdst-model-2'
+MODEL_ARRAYS = [
+    'local', 'world', 'regions', 'positions', 'local_positions', 'uvs', 'triangles',
+    'influence_vertex', 'influence_bone', 'influence_weight', 'influence_bind',
+]
+# decoded into the model arrays, dropped from the cached skeleton data
+MODEL_KEYS = ('vertices', 'uvs', 'triangles', 'edges')
+
+MODEL_CACHE = DiskCache(
+    str(_Path(MDST_SETTINGS.config_dir or '.') / 'cache'), (MDST_SETTINGS.disk_cache_size or 512) * 1024 * 1024
+)
+
+
+###
+# Skeleton and atlas preprocessed into flat arrays, the form kept in the disk cache.
+# local, world: Skeleton.local and Skeleton.world of the setup pose
+# regions: page, x, y, width, height, offset x, offset y, orig width, orig height, rotate, index per atlas region
+# positions, local_positions, uvs: per vertex of every mesh, region and clipping attachment of the default skin
+# triangles: per triangle, vertex indices local to the attachment
+# influence_*: per influence, vertex local to the attachment, bone index, weight and bind position
+# Each attachment entry holds its [start, count] ranges into the vertex, triangle and influence arrays.
+class SpineModel:
+    def __init__(self, meta, arrays):
+        self.data = meta['skeleton']
+        self.pages = meta['pages']
+        self.region_names = meta['region_names']
+        self.attachments = {(entry['slot'], entry['name']): entry for entry in meta['attachments']}
+        for name in MODEL_ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def attachment(self, slot_name, name):
+        return ModelAttachment(self, self.attachments[(slot_name, name)])
+
+    def atlas(self):
+        atlas_image = []
+        for page_data in self.pages:
+            page = AtlasImage(page_data['image'])
+            for k, v in page_data.items():
+                setattr(page, k, v)
+            atlas_image.append(page)
+
+        atlas_dict = {}
+        for name, row in zip(self.region_names, self.regions.tolist()):
+            page_idx, x, y, width, height, offset_x, offset_y, orig_width, orig_height, rotate, index = (int(i) for i in row)
+            region = Atlas(name, atlas_image[page_idx])
+            region.xy, region.size = [x, y], [width, height]
+            region.offset, region.orig = [offset_x, offset_y], [orig_width, orig_height]
+            region.rotate, region.index = rotate, index
+            atlas_image[page_idx].atlas.append(region)
+            atlas_dict.setdefault(name, region)
+        return atlas_image, atlas_dict
+
+
+class ModelAttachment:
+    def __init__(self, model, entry):
+        for k, v in entry.items():
+            setattr(self, k, v)
+
+        vertex_start, vertex_count = self.vertex
+        self.positions = model.positions[vertex_start:vertex_start + vertex_count]
+        self.local_positions = model.local_positions[vertex_start:vertex_start + vertex_count]
+        self.uvs = model.uvs[vertex_start:vertex_start + vertex_count]
+
+        triangle_start, triangle_count = self.triangle
+        self.triangles = model.triangles[triangle_start:triangle_start + triangle_count]
+
+        influence_start, influence_count = self.influence
+        influence = slice(influence_start, influence_start + influence_count)
+        self.influence_vertex = model.influence_vertex[influence]
+        self.influence_bone = model.influence_bone[influence]
+        self.influence_weight = model.influence_weight[influence]
+        self.influence_bind = model.influence_bind[influence]
+
+
+# mesh uvs mapped from the region into page space, as (u, v) rows
+def region_uvs(region, uv_data):
+    page = region.atlas_image
+    u, v = np.asarray(uv_data, dtype=float).reshape(-1, 2).T
+    x = u * region.size[0] / page.size_x
+    y = v * region.size[1] / page.size_y
+    if region.rotate:
+        # Assume rotate is 90 for now
+        if region.rotate != 90:
+            MDST_LOGGER.error('Unsupported atlas rotation: %s' % region.rotate)
+        return np.stack([y + region.xy[0] / page.size_x, x + 1 - ((region.size[0] + region.xy[1]) / page.size_x)], axis=1)
+    return np.stack([x + region.xy[0] / page.size_x, 1 - (y + region.xy[1] / page.size_y)], axis=1)
+
+
+# region attachment columns gathered for region_corners
+REGION_FIELDS = [('x', 0), ('y', 0), ('rotation', 0), ('scaleX', 1), ('scaleY', 1), ('width', 32), ('height', 32)]
+REGION_TRIANGLES = [[0, 1, 2], [1, 3, 2]]
+
+
+###
+# Corners of every region attachment in one pass, following spine's RegionAttachment.updateRegion:
+#   whitespace stripped in the atlas (offset, orig) shrinks the quad, then attachment and slot bone transforms apply.
+# attachments: rows of REGION_FIELDS, regions: rows of the model region table, world: slot bone rows of Skeleton.world
+# Returns local (attachment space on the bone) and world corners as (n, 4, 2) arrays,
+#   corner order top left, top right, bottom left, bottom right.
+def region_corners(attachments, regions, world):
+    x, y, rotation, scale_x, scale_y, width, height = attachments.T
+    region_width, region_height, offset_x, offset_y, orig_width, orig_height = regions[:, 3:9].T
+    region_scale_x = width / np.where(orig_width > 0, orig_width, 1) * scale_x
+    region_scale_y = height / np.where(orig_height > 0, orig_height, 1) * scale_y
+
+    left = -width / 2 * scale_x + offset_x * region_scale_x
+    bottom = -height / 2 * scale_y + offset_y * region_scale_y
+    right = left + region_width * region_scale_x
+    top = bottom + region_height * region_scale_y
+    corner_x = np.stack([left, right, left, right], axis=1)
+    corner_y = np.stack([top, top, bottom, bottom], axis=1)
+
+    cos, sin = np.cos(np.radians(rotation))[:, None], np.sin(np.radians(rotation))[:, None]
+    local = np.stack([corner_x * cos - corner_y * sin + x[:, None], corner_x * sin + corner_y * cos + y[:, None]], axis=2)
+
+    a, b, c, d, world_x, world_y = (world[:, i, None] for i in range(6))
+    return local, np.stack([a * local[..., 0] + b * local[..., 1] + world_x, c * local[..., 0] + d * local[..., 1] + world_y], axis=2)
+
+
+# page uvs of region corners in region_corners order, rotated regions are packed turned by 90 degrees
+def region_page_uvs(regions, page_sizes):
+    page, x, y, width, height = regions[:, :5].T
+    rotated = (regions[:, 9] != 0)[:, None]
+    page_x = np.where(rotated, np.stack([x, x, x + height, x + height], axis=1), np.stack([x, x + width, x, x + width], axis=1))
+    page_y = np.where(rotated, np.stack([y + width, y, y + width, y], axis=1), np.stack([y, y, y + height, y + height], axis=1))
+    size_x, size_y = page_sizes[page, 0, None], page_sizes[page, 1, None]
+    return np.stack([page_x / size_x, 1 - page_y / size_y], axis=2)
+
+
+def build_model(data, atlas_text):
+    atlas_image, atlas_dict = load_atlas(atlas_text)
+    bones = [Bone(idx, bone_data) for idx, bone_data in enumerate(data['bones'])]
+    skeleton = Skeleton(bones)
+    slot_bone = {slot['name']: skeleton.index[slot['bone']] for slot in data['slots']}
+
+    region_names, regions, region_idx = [], [], {}
+    for page_idx, page in enumerate(atlas_image):
+        for region in page.atlas:
+            region_idx[id(region)] = len(regions)
+            region_names.append(region.name)
+            regions.append([page_idx] + region.xy + region.size + region.offset + region.orig + [region.rotate, region.index])
+
+    # empty shape and dtype of the per attachment arrays
+    columns = {
+        'positions': ((0, 3), float), 'local_positions': ((0, 3), float), 'uvs': ((0, 2), float),
+        'triangles': ((0, 3), np.int32), 'influence_vertex': ((0,), np.int32), 'influence_bone': ((0,), np.int32),
+        'influence_weight': ((0,), float), 'influence_bind': ((0, 2), float),
+    }
+    entries = []
+    arrays = {name: [] for name in columns}
+    vertex_total = triangle_total = influence_total = 0
+    region_attachments, region_rows, region_entries = [], [], []
+    skins = [dict(skin) for skin in data['skins']]
+    if skins:
+        skins[0]['attachments'] = {slot_name: dict(slot_attachment) for slot_name, slot_attachment in skins[0]['attachments'].items()}
+
+    for slot_name, slot_attachment in (skins[0]['attachments'] if skins else {}).items():
+        for name, attachment in slot_attachment.items():
+            attachment_type = attachment.get('type', 'region')
+            if attachment_type == 'region':
+                # solved together once every region is known
+                region = find_region(atlas_dict, name, attachment, slot_name)
+                region_attachments.append([attachment.get(k, default) for k, default in REGION_FIELDS] + [slot_bone[slot_name]])
+                region_rows.append(regions[region_idx[id(region)]] if region else [-1, 0, 0, attachment.get('width', 32), attachment.get('height', 32), 0, 0, attachment.get('width', 32), attachment.get('height', 32), 0, -1])
+                region_entries.append({'slot': slot_name, 'name': name, 'type': 'region', 'region': region_idx[id(region)] if region else -1})
+                continue
+            if attachment_type not in ('mesh', 'clipping'):
+                continue
+
+            vertex_count = len(attachment['uvs']) // 2 if attachment_type == 'mesh' else attachment['vertexCount']
+            vertices = load_vertex(attachment['vertices'], vertex_count, slot_bone[slot_name])
+            arrays['positions'].append(skin_vertices(vertices, skeleton.world))
+            arrays['local_positions'].append(skin_vertices_local(vertices))
+
+            region = find_region(atlas_dict, name, attachment, slot_name) if attachment_type == 'mesh' else None
+            arrays['uvs'].append(region_uvs(region, attachment['uvs']) if region else np.zeros((vertex_count, 2)))
+            triangles = np.asarray(attachment.get('triangles', []), dtype=np.int32).reshape(-1, 3)
+            arrays['triangles'].append(triangles)
+
+            arrays['influence_vertex'].append(_influence_owner(vertices).astype(np.int32))
+            arrays['influence_bone'].append(np.asarray(vertices.bones, dtype=np.int32))
+            arrays['influence_weight'].append(np.asarray(vertices.weights))
+            arrays['influence_bind'].append(np.stack([np.asarray(vertices.x), np.asarray(vertices.y)], axis=1).reshape(-1, 2))
+
+            entries.append({
+                'slot': slot_name, 'name': name, 'type': attachment_type,
+                'region': region_idx[id(region)] if region else -1,
+                'vertex': [vertex_total, vertex_count],
+                'triangle': [triangle_total, len(triangles)],
+                'influence': [influence_total, len(vertices.bones)],
+            })
+            vertex_total += vertex_count
+            triangle_total += len(triangles)
+            influence_total += len(vertices.bones)
+            slot_attachment[name] = {k: v for k, v in attachment.items() if k not in MODEL_KEYS}
+
+    if region_entries:
+        region_attachments = np.array(region_attachments, dtype=float)
+        region_rows = np.array(region_rows, dtype=float)
+        page_sizes = np.array([[page.size_x or 1, page.size_y or 1] for page in atlas_image] + [[1, 1]], dtype=float)
+        bone_idx = region_attachments[:, -1].astype(np.intp)
+        local, corners = region_corners(region_attachments[:, :-1], region_rows, skeleton.world[bone_idx])
+
+        count = len(region_entries)
+        arrays['positions'].append(np.insert(corners.reshape(-1, 2), 1, 0, axis=1))
+        arrays['local_positions'].append(np.insert(local.reshape(-1, 2), 1, 0, axis=1))
+        arrays['uvs'].append(region_page_uvs(region_rows.astype(np.intp), page_sizes).reshape(-1, 2))
+        arrays['triangles'].append(np.tile(np.array(REGION_TRIANGLES, dtype=np.int32), (count, 1)))
+        arrays['influence_vertex'].append(np.tile(np.arange(4, dtype=np.int32), count))
+        arrays['influence_bone'].append(np.repeat(bone_idx, 4).astype(np.int32))
+        arrays['influence_weight'].append(np.ones(count * 4))
+        arrays['influence_bind'].append(local.reshape(-1, 2))
+
+        for idx, entry in enumerate(region_entries):
+            entry['vertex'] = [vertex_total + idx * 4, 4]
+            entry['triangle'] = [triangle_total + idx * 2, 2]
+            entry['influence'] = [influence_total + idx * 4, 4]
+        entries.extend(region_entries)
+
+    for name, (shape, dtype) in columns.items():
+        arrays[name] = np.concatenate(arrays[name]).astype(dtype) if arrays[name] else np.zeros(shape, dtype=dtype)
+    arrays['local'], arrays['world'] = skeleton.local, skeleton.world
+    arrays['regions'] = np.array(regions, dtype=np.int32).reshape(-1, 11)
+
+    meta = {
+        'skeleton': dict(data, skins=skins),
+        'pages': [{k: v for k, v in page.__dict__.items() if k != 'atlas'} for page in atlas_image],
+        'region_names': region_names,
+        'attachments': entries,
+    }
+    return meta, arrays
+
+
+# a warm import maps the cached arrays and skips parsing the skeleton and atlas altogether
+def load_model(mdst_spine):
+    source, content = skeleton_source(mdst_spine)
+    _, atlas_text = atlas_source(mdst_spine)
+    key = content_hash(content, atlas_text, MODEL_VERSION)
+
+    cached = MODEL_CACHE.get(key)
+    if cached is not None:
+        MDST_LOGGER.info(f'Loaded {source} from disk cache')
+        return SpineModel(*cached)
+
+    meta, arrays = build_model(load_skeleton(mdst_spine, source, content).data, atlas_text)
+    MODEL_CACHE.put(key, meta, arrays)
+    return SpineModel(meta, arrays)
+
+
+def clear_cache():
+    SKELETON_CACHE.clear()
+    _skeleton_keys.clear()
+    return MODEL_CACHE.clear()
+
+
+# mode switches act on obj rather than whatever happens to be active
+def set_mode(obj, mode):
+    bpy.context.view_layer.objects.active = obj
+    if obj.mode != mode:
+        bpy.ops.object.mode_set(mode=mode)
+
+
+def delete_helper(objs):
+    try:
+        bpy.ops.object.mode_set(mode="OBJECT")
+    except:
+        pass
+
+    for obj in objs:
+        for data in getattr(bpy.data, obj):
+            getattr(bpy.data, obj).remove(data)
+
+
+# Returns the control armature, the deform armature and the created mesh objects.
+# Needs no window: mode switches go through set_mode and the viewport is only adjusted when there is a screen.
 def load_spine(mdst_spine):
 
-    data = load_json(mdst_spine.spine_ref.as_string())
-    atlas = mdst_spine.atlas_ref.as_string()
-    filepath = _Path(mdst_spine.atlas_ref.filepath).parent
+    model = load_model(mdst_spine)
+    data = model.data
+    filepath = _Path(atlas_source(mdst_spine)[0]).parent
+    existing_objs = set(bpy.data.objects)
 
     layer_gap = mdst_spine.layer_gap
-    separate_material = mdst_spine.chk_separate_material
-    alternative_mesh = mdst_spine.chk_alternative_mesh
+    pool_material = mdst_spine.chk_pool_material
+    separate_material = mdst_spine.chk_separate_material and not pool_material
+    # merged meshes have no per attachment objects to build an alternative from
+    merge_mode = mdst_spine.merge_mode
+    alternative_mesh = mdst_spine.chk_alternative_mesh and merge_mode == 'NONE'
+    clipping_mode = mdst_spine.clipping_mode
 
     if alternative_mesh:
         # create collection:
         alt_collection = bpy.data.collections.new('AlternativeMesh')
         bpy.context.scene.collection.children.link(alt_collection)
 
-    atlas_image = [AtlasImage(img[0]) for img in re.findall(r'^((.|\n)*?\n)(?=^\n|\Z)', atlas, re.MULTILINE)]
-    atlas_dict = {a.name: a for atlas in atlas_image for a in atlas.atlas}
+    atlas_image, atlas_dict = model.atlas()
 
     attachments = data['skins'][0]['attachments']
 
     bones = [Bone(idx, bone_data) for idx, bone_data in enumerate(data['bones'])]
-    [bone.set_parent([b for b in bones if b.name == bone.parent][0]) for bone in bones if bone.name != 'root']
+    skeleton = Skeleton(bones)
     bone_dict = {bone.name: bone for bone in bones}
 
+    if any(bone.shearX or bone.shearY for bone in bones):
+        MDST_LOGGER.warning('Shear is applied to the setup pose only, pose bones cannot shear')
+
     slots = {slot['name']: Slot(slot, bone_dict, slot_idx) for slot_idx, slot in enumerate(data['slots'])}
     iks = [IK_Bone(ik_data, bone_dict) for ik_data in data['ik']] if 'ik' in data else []
     tks = [TK_Bone(tk_data, bone_dict) for tk_data in data['transform']] if 'transform' in data else []
-    paths = [Path(path_data, bone_dict, attachments) for path_data in data['path']] if 'path' in data else []
+    paths = [Path(path_data, bone_dict, slots, attachments) for path_data in data['path']] if 'path' in data else []
 
     # As mesh have its own keyframe, create material for each mesh instead
     # create material for each atlas
-    materials = {atlas.image: (atlas if separate_material else create_material(atlas, None, filepath)) for atlas in atlas_image}
+    # pages and their shared materials are only created once an attachment uses them
+    page_images = PageImages(filepath)
+    materials = {}
     mask_material = None
 
     # create armature for control
@@ -430,21 +1754,19 @@ def load_spine(mdst_spine):
     armature_control.display_type = 'STICK'
     armature_control_obj = bpy.data.objects.new('rootControl', armature_control)
     bpy.context.scene.collection.objects.link(armature_control_obj)
-    bpy.context.view_layer.objects.active = armature_control_obj
-
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode(armature_control_obj, 'EDIT')
 
     bone_control_objs = [None for _ in bones]
-    for bone in bones:
+    for bone in (bones[idx] for idx in skeleton.order.tolist()):
         new_bone = armature_control.edit_bones.new(name=bone.name + '_Control')
         new_bone.select = True
         bone_control_objs[bone.bone_idx] = new_bone
 
-        if bone.name != 'root':
+        if bone.parent_bone:
             new_bone.parent = bone_control_objs[bone.parent_bone.bone_idx]
             new_bone.use_connect = False
-            new_bone.use_inherit_rotation = True
-            new_bone.use_inherit_scale = True
+            new_bone.use_inherit_rotation = bone.transform not in ('onlyTranslation', 'noRotationOrReflection')
+            new_bone.inherit_scale = 'NONE' if bone.transform in ('onlyTranslation', 'noScale', 'noScaleOrReflection') else 'FULL'
 
             new_bone.head = (0, 0, 0)
             new_bone.tail = (bone.length or 1, 0, 0)
@@ -482,7 +1804,7 @@ def load_spine(mdst_spine):
             armature_control.edit_bones[idx].parent = parent
             parent = armature_control.edit_bones[idx]
 
-    bpy.ops.object.mode_set(mode='OBJECT')
+    set_mode(armature_control_obj, 'OBJECT')
 
     # create armature
     armature = bpy.data.armatures.new('armature')
@@ -490,19 +1812,17 @@ def load_spine(mdst_spine):
     armature.display_type = 'STICK'
     armature_obj = bpy.data.objects.new('root', armature)
     bpy.context.scene.collection.objects.link(armature_obj)
-    bpy.context.view_layer.objects.active = armature_obj
     armature_obj.show_in_front = True
     armature_obj.select_set(state=True)
 
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode(armature_obj, 'EDIT')
     bone_objs = [None for _ in bones]
-    for bone in bones:
+    for bone in (bones[idx] for idx in skeleton.order.tolist()):
         new_bone = armature.edit_bones.new(name=bone.name)
         new_bone.select = True
         bone_objs[bone.bone_idx] = new_bone
 
-        if bone.name != 'root':
+        if bone.parent_bone:
             new_bone.parent = bone_objs[bone.parent_bone.bone_idx]
             new_bone.use_connect = False
             new_bone.use_inherit_rotation = True
@@ -539,7 +1859,7 @@ def load_spine(mdst_spine):
             armature.edit_bones[idx].parent = parent
             parent = armature.edit_bones[idx]
 
-    bpy.ops.object.mode_set(mode='OBJECT')
+    set_mode(armature_obj, 'OBJECT')
 
     # apply transformation for each bone
     for bone in bones:
@@ -554,78 +1874,70 @@ def load_spine(mdst_spine):
         copy_constraint.target = armature_control_obj
         copy_constraint.subtarget = bone_obj.name + '_Control'
 
+    merged_parts = []
     parts = data['skins'][0]['attachments']
+
+    # setup pose clip polygon of every masked slot, its attachments are cut at import
+    clip_polygons = {}
+    if clipping_mode == 'GEOMETRY':
+        slot_names = list(slots)
+        for slot_name, slot_attachment in parts.items():
+            for k, attachment in slot_attachment.items():
+                if attachment.get('type') != 'clipping':
+                    continue
+                polygon = model.attachment(slot_name, k).positions[:, [0, 2]]
+                for masked_name in slot_names[slot_names.index(slot_name) + 1:slot_names.index(attachment['end']) + 1]:
+                    clip_polygons[masked_name] = polygon
+
     for slot_name, slot_attachment in parts.items():
         # attachment = v[k]
         for k, attachment in slot_attachment.items():
 
             attachment_type = attachment.get('type', 'region')
+            if attachment_type == 'clipping' and clipping_mode == 'GEOMETRY':
+                # masked attachments are already cut, nothing to build for the clip itself
+                continue
+
+            if merge_mode != 'NONE' and attachment_type in ('mesh', 'region'):
+                atlas = find_region(atlas_dict, k, attachment, slot_name)
+                entry = model.attachment(slot_name, k)
+                if slot_name in clip_polygons:
+                    entry = ClippedAttachment(entry, clip_polygons[slot_name])
+                merged_parts.append({
+                    'page': atlas.atlas_image, 'slot': slots[slot_name], 'positions': entry.positions, 'triangles': entry.triangles, 'uvs': entry.uvs,
+                    'influence': (entry.influence_vertex, entry.influence_bone, entry.influence_weight),
+                })
+                continue
+
+            if merge_mode != 'NONE' and attachment_type == 'clipping':
+                MDST_LOGGER.warning('Boolean clipping {} is not supported in merged mode'.format(k))
+                continue
+
             if attachment_type == 'mesh':
 
-                vertices = load_vertex(attachment['vertices'], slots[slot_name].bone_obj.bone_idx if attachment['hull'] * 2 == len(attachment['vertices']) or not str(attachment['vertices'][0]).isdigit() else None)
+                entry = model.attachment(slot_name, k)
+                if slot_name in clip_polygons:
+                    entry = ClippedAttachment(entry, clip_polygons[slot_name])
+                atlas = find_region(atlas_dict, k, attachment, slot_name)
 
-                triangles = load_triangle(attachment['triangles'])
                 mesh_object = bpy.data.meshes.new(k)
                 mesh = bpy.data.objects.new(slot_name, mesh_object)
 
                 bpy.context.scene.collection.objects.link(mesh)
 
-                vertices_list = [vertex.global_pos(bones) for vertex in vertices]
-
-                mesh_object.from_pydata(vertices_list, [], triangles)
+                write_mesh(mesh_object, entry.positions, entry.triangles, entry.uvs, atlas.atlas_image.image)
                 # adjust layer order
                 mesh.location.y = slots[slot_name].slot_idx * layer_gap
 
-                vertex_group = [None for _ in bones]
-                for idx, vertex in enumerate(vertices):
-                    for vertex_bone_idx in range(len(vertex.bone_idx)):
-                        if not vertex_group[vertex.bone_idx[vertex_bone_idx]]:
-                            vertex_group[vertex.bone_idx[vertex_bone_idx]] = mesh.vertex_groups.new(name=bones[vertex.bone_idx[vertex_bone_idx]].name)
-                        vertex_group[vertex.bone_idx[vertex_bone_idx]].add([idx], vertex.bone_weight[vertex_bone_idx], 'REPLACE')
+                write_vertex_groups(mesh, [bone.name for bone in bones], entry.influence_vertex, entry.influence_bone, entry.influence_weight)
 
-                mesh_object.update()
                 mesh.modifiers.new('Armature', 'ARMATURE').object = armature_obj
 
-                if alternative_mesh:
-                    mesh_control_object = bpy.data.meshes.new(k + '_Control')
-                    mesh_control = bpy.data.objects.new(slot_name + '_Control', mesh_control_object)
-                    alt_collection.objects.link(mesh_control)
-                    vertices_control_list = [vertex.local_pos() for vertex in vertices]
-                    mesh_control_object.from_pydata(vertices_control_list, [], triangles)
-                    mesh_control.location.y = slots[slot_name].slot_idx * layer_gap
-
-                    vertex_group = [None for _ in bones]
-                    for idx, vertex in enumerate(vertices):
-                        for vertex_bone_idx in range(len(vertex.bone_idx)):
-                            if not vertex_group[vertex.bone_idx[vertex_bone_idx]]:
-                                vertex_group[vertex.bone_idx[vertex_bone_idx]] = mesh_control.vertex_groups.new(name=bones[vertex.bone_idx[vertex_bone_idx]].name + '_Control')
-                            vertex_group[vertex.bone_idx[vertex_bone_idx]].add([idx], vertex.bone_weight[vertex_bone_idx], 'REPLACE')
-
-                    mesh_control_object.update()
-                    mesh_control.modifiers.new('Armature', 'ARMATURE').object = armature_control_obj
-
-                uv_data = attachment['uvs']
-                uvs = []
-                atlas = atlas_dict[slot_name] if slot_name in atlas_dict else atlas_dict[k] if k in atlas_dict else atlas_dict[attachment['path']] if 'path' in attachment else None
-                for idx in range(len(uv_data)//2):
-                    x, y = uv_data[idx*2:idx*2+2]
-                    x = x * atlas.size[0] / atlas.atlas_image.size_x
-                    y = y * atlas.size[1] / atlas.atlas_image.size_y
-                    if atlas.rotate:
-
-                        # Assume rotate is 90 for now
-                        if atlas.rotate != 90:
-                            MDST_LOGGER.error('Unsupported atlas rotation: %s' % atlas.rotate)
-
-                        x, y = y, x
-                        x += atlas.xy[0] / atlas.atlas_image.size_x
-                        y += 1 - ((atlas.size[0] + atlas.xy[1]) / atlas.atlas_image.size_x)
+                # deform timelines find their mesh by these, clipped meshes lost spine's vertex order
+                mesh['mdst_slot_name'] = slot_name
+                mesh['mdst_attachment'] = k
+                mesh['mdst_clipped'] = slot_name in clip_polygons
 
-                    else:
-                        x += atlas.xy[0] / atlas.atlas_image.size_x
-                        y += atlas.xy[1] / atlas.atlas_image.size_y
-                        y = 1 - y
-                    uvs.append((x, y))
 
             elif attachment_type == 'path':
                 # already handled in path / spline ik constraint
@@ -644,13 +1956,12 @@ def load_spine(mdst_spine):
 
                 # create polygon
                 # FIXME do mask has multiple vertex group?
-                vertices = load_vertex(attachment['vertices'], slots[slot_name].bone_obj.bone_idx)
+                entry = model.attachment(slot_name, k)
 
                 masked_slot = list(slots.values())[list(slots.keys()).index(k) + 1:list(slots.keys()).index(attachment['end']) + 1]
 
                 bm = bmesh.new()
-                for v in vertices:
-                    x, _, y = v.global_pos(bones)
+                for x, _, y in entry.positions.tolist():
 
                     # prevent backface culling
                     if layer_gap < 0:
@@ -707,76 +2018,59 @@ def load_spine(mdst_spine):
 
                 bpy.context.scene.collection.objects.link(mesh)
 
-                bone = slots[slot_name].bone_obj
-                abs_rotation = bone.abs_rotation + math.radians(attachment['rotation']) if 'rotation' in attachment else bone.abs_rotation
-
-                dx = attachment.get('x', 0) * math.cos(bone.abs_rotation) - attachment.get('y', 0) * math.sin(bone.abs_rotation)
-                dy = attachment.get('x', 0) * math.sin(bone.abs_rotation) + attachment.get('y', 0) * math.cos(bone.abs_rotation)
-
-                vertices_list = [
-                    (
-                        ((-attachment['width'] / 2) * math.cos(abs_rotation) - (attachment['height'] / 2) * math.sin(abs_rotation) + dx) * bone.abs_scale_x + bone.abs_x,
-                        0,
-                        ((-attachment['width'] / 2) * math.sin(abs_rotation) + (attachment['height'] / 2) * math.cos(abs_rotation) + dy) * bone.abs_scale_y + bone.abs_y
-                    ), (
-                        ((attachment['width'] / 2) * math.cos(abs_rotation) - (attachment['height'] / 2) * math.sin(abs_rotation) + dx) * bone.abs_scale_x + bone.abs_x,
-                        0,
-                        ((attachment['width'] / 2) * math.sin(abs_rotation) + (attachment['height'] / 2) * math.cos(abs_rotation) + dy) * bone.abs_scale_y + bone.abs_y
-                    ), (
-                        ((-attachment['width'] / 2) * math.cos(abs_rotation) - (-attachment['height'] / 2) * math.sin(abs_rotation) + dx) * bone.abs_scale_x + bone.abs_x,
-                        0,
-                        ((-attachment['width'] / 2) * math.sin(abs_rotation) + (-attachment['height'] / 2) * math.cos(abs_rotation) + dy) * bone.abs_scale_y + bone.abs_y
-                    ), (
-                        ((attachment['width'] / 2) * math.cos(abs_rotation) - (-attachment['height'] / 2) * math.sin(abs_rotation) + dx) * bone.abs_scale_x + bone.abs_x,
-                        0,
-                        ((attachment['width'] / 2) * math.sin(abs_rotation) + (-attachment['height'] / 2) * math.cos(abs_rotation) + dy) * bone.abs_scale_y + bone.abs_y
-                    )
-                ]
-
-                mesh_object.from_pydata(vertices_list, [], [[0, 1, 2], [1, 3, 2]])
-                mesh.location.y = slots[slot_name].slot_idx * layer_gap
+                atlas = find_region(atlas_dict, k, attachment, slot_name)
+                entry = model.attachment(slot_name, k)
+                if slot_name in clip_polygons:
+                    entry = ClippedAttachment(entry, clip_polygons[slot_name])
 
-                mesh_object.update()
+                write_mesh(mesh_object, entry.positions, entry.triangles, entry.uvs, atlas.atlas_image.image)
+                mesh.location.y = slots[slot_name].slot_idx * layer_gap
 
-                mesh.vertex_groups.new(name=slots[k].bone).add([0, 1, 2, 3], 1, 'REPLACE')
+                if slot_name in clip_polygons:
+                    write_vertex_groups(mesh, [bone.name for bone in bones], entry.influence_vertex, entry.influence_bone, entry.influence_weight)
+                else:
+                    mesh.vertex_groups.new(name=slots[slot_name].bone).add([0, 1, 2, 3], 1, 'REPLACE')
                 mesh.modifiers.new('Armature', 'ARMATURE').object = armature_obj
 
-                atlas = atlas_dict[slot_name] if slot_name in atlas_dict else atlas_dict[k] if k in atlas_dict else atlas_dict[attachment['path']] if 'path' in attachment else None
-                uvs = [(x / atlas.atlas_image.size_x, 1 - y / atlas.atlas_image.size_y) for x, y in ([
-                    (atlas.xy[0], atlas.xy[1] + atlas.size[0]),
-                    (atlas.xy[0], atlas.xy[1]),
-                    (atlas.xy[0] + atlas.size[1], atlas.xy[1] + atlas.size[0]),
-                    (atlas.xy[0] + atlas.size[1], atlas.xy[1]),
-                ] if atlas.rotate else [
-                    (atlas.xy[0], atlas.xy[1]),
-                    (atlas.xy[0] + atlas.size[0], atlas.xy[1]),
-                    (atlas.xy[0], atlas.xy[1] + atlas.size[1]),
-                    (atlas.xy[0] + atlas.size[0], atlas.xy[1] + atlas.size[1]),
-                ])]
-
             else:
                 MDST_LOGGER.error('Unknown attachment type: ' + attachment_type)
                 # raise Exception('Unknown attachment type: ' + attachment_type)
                 continue
 
             if attachment_type in ['region', 'mesh']:
-                # uv = mesh.data.uv_layers.new(name=k)
-                uv = mesh.data.uv_layers.new(name=atlas.atlas_image.image)
-                for idx, loop in enumerate(mesh.data.loops):
-                    uv.data[idx].uv = uvs[loop.vertex_index]
-
                 # assign material
-                material = create_material(materials[atlas.atlas_image.image], k, filepath)
-                mesh.data.materials.append(material if separate_material else materials[atlas.atlas_image.image])
+                page = atlas.atlas_image
+                if pool_material:
+                    material_key = (page.image, slots[slot_name].blend)
+                    if material_key not in materials:
+                        materials[material_key] = create_pooled_material(page, slots[slot_name].blend, page_images.get(page))
+                    material = materials[material_key]
+                    set_slot_color(mesh, RGBA(slots[slot_name].color))
+                elif separate_material:
+                    material = create_material(page, k, page_images.get(page))
+                else:
+                    if page.image not in materials:
+                        materials[page.image] = create_material(page, None, page_images.get(page))
+                    material = materials[page.image]
+                mesh.data.materials.append(material)
 
                 if attachment_type == 'mesh' and alternative_mesh:
-                    uv = mesh_control.data.uv_layers.new(name=atlas.atlas_image.image)
-                    for idx, loop in enumerate(mesh_control.data.loops):
-                        uv.data[idx].uv = uvs[loop.vertex_index]
-                    mesh_control.data.materials.append(material if separate_material else materials[atlas.atlas_image.image])
+                    mesh_control = create_alternative_mesh(mesh, slot_name + '_Control', entry.local_positions, armature_control_obj)
+                    alt_collection.objects.link(mesh_control)
+                    mesh['mdst_control'] = mesh_control
+                    if pool_material:
+                        set_slot_color(mesh_control, RGBA(slots[slot_name].color))
 
-    create_constrains(bones, armature_control_obj, iks, tks, paths, True)
-    create_constrains(bones, armature_obj, iks, tks, paths, False)
+    if merged_parts:
+        write_merged_meshes(merged_parts, merge_mode, bones, armature_obj, layer_gap, page_images)
+
+    constraint_plan = build_constraint_plan(bones, iks, tks, paths)
+    curves = {}
+    apply_constraint_plan(constraint_plan, armature_control_obj, '_Control', True, curves)
+    apply_constraint_plan(constraint_plan, armature_obj, '', False, curves)
+    if curves:
+        # hooks of both rigs resolve in a single evaluation
+        bpy.context.evaluated_depsgraph_get()
 
     if alternative_mesh:
         # bpy.context.view_layer.layer_collection.children.get('AlternativeMesh').hide_viewport = True
@@ -798,8 +2092,9 @@ def load_spine(mdst_spine):
     #     bone['_scale_x'] = 1 if bone.name == 'root' else bone_dict[bone.name].parent_bone.abs_scale_x
     #     bone['_scale_y'] = 1 if bone.name == 'root' else bone_dict[bone.name].parent_bone.abs_scale_y
 
-    # adajust viewport
-    for a in bpy.context.screen.areas:
+    # adajust viewport, background sessions have no screen
+    screen = bpy.context.screen
+    for a in (screen.areas if screen else []):
         if a.type == 'VIEW_3D':
             for s in a.spaces:
                 if s.type == 'VIEW_3D':
@@ -812,19 +2107,215 @@ def load_spine(mdst_spine):
                     s.region_3d.view_perspective = 'ORTHO'
     bpy.context.view_layer.update()
 
+    return armature_control_obj, armature_obj, [obj for obj in bpy.data.objects if obj.type == 'MESH' and obj not in existing_objs]
 
-def load_animation(mdst_spine):
 
-    data = load_json(mdst_spine.spine_ref.as_string())
-    animation_name = mdst_spine.animation
+###
+# Actions of one animation, one per animated datablock (rootControl, slot objects, material node trees).
+# Without a name the datablocks keep their single active action (rootControlAction, <object>Action),
+#   named ones get an action with a fake user, pushed to an NLA track by push_nla_tracks.
+#   The primary datablock's action is named after the animation, the others <animation>_<datablock>,
+#   embedded node trees (all named "Shader Nodetree") go by their owning material.
+# leftover: actions the previous import recorded on rootControl, shared by every AnimationActions of one load.
+#   A leftover action of the same name is cleared and rewritten once instead of leaving it behind as a fake user orphan,
+#   any other name clash gets a new action (.001), so user actions and actions claimed by this load are never reused.
+def named_action(name, leftover):
+    action = bpy.data.actions.get(name)
+    if action is None or action not in leftover:
+        action = bpy.data.actions.new(name)
+    else:
+        leftover.discard(action)
+        while action.fcurves:
+            action.fcurves.remove(action.fcurves[0])
+        while action.groups:
+            action.groups.remove(action.groups[0])
+    action.use_fake_user = True
+    return action
+
+
+# the actions the last load_animation wrote, reused ones included
+def imported_actions():
+    control_obj = bpy.data.objects.get('rootControl')
+    names = control_obj.get('mdst_actions', []) if control_obj else []
+    return [bpy.data.actions[name] for name in names if name in bpy.data.actions]
+
+
+class AnimationActions:
+    def __init__(self, name=None, primary=None, leftover=None):
+        self.name = name
+        self.primary = primary
+        self.leftover = leftover if leftover is not None else set()
+        self.actions = {}
+
+    # owner: the datablock an embedded id_data belongs to, names its action
+    def get(self, id_data, owner=None):
+        if id_data not in self.actions:
+            if self.name is None:
+                action = id_action(id_data)
+            elif id_data == self.primary:
+                action = named_action(self.name, self.leftover)
+            else:
+                action = named_action('{}_{}'.format(self.name, (owner or id_data).name), self.leftover)
+            self.actions[id_data] = action
+        return self.actions[id_data]
+
+    # muted tracks, unmute or solo one to play it, the active actions stay in charge otherwise
+    def push_nla_tracks(self):
+        for id_data, action in self.actions.items():
+            if not id_data.animation_data:
+                id_data.animation_data_create()
+            tracks = id_data.animation_data.nla_tracks
+            if tracks.get(self.name):
+                tracks.remove(tracks[self.name])
+            track = tracks.new()
+            track.name = self.name
+            track.mute = True
+            track.strips.new(self.name, int(action.frame_range[0]), action)
+
+    def assign(self):
+        for id_data, action in self.actions.items():
+            if not id_data.animation_data:
+                id_data.animation_data_create()
+            id_data.animation_data.action = action
+
 
-    bones = bpy.data.objects['rootControl'].pose.bones
-    if bpy.context.object.name != 'rootControl':
-        bpy.context.view_layer.objects.active = bpy.data.objects['rootControl']
-        bpy.data.objects['rootControl'].select_set(True)
+###
+# Deform timelines as shape keys on the mesh objects load_spine tagged with mdst_slot_name / mdst_attachment.
+# Every key decodes to per influence offsets in bone space (weighted and unweighted alike, vertices placed at offset),
+#   all keys of a timeline become setup pose object space deltas in one array step and are written with foreach_set.
+# Identical frames share a shape key named by its content, consecutive frames cross fade with the timeline's curve,
+#   which is spine's blend between two deform frames. Shape keys run before the Armature modifier, like spine's offsets.
+# The AlternativeMesh copy load_spine stores as mdst_control gets the same shape keys from bind space deltas.
+class DeformShapes:
+    def __init__(self, mdst_spine, setup):
+        self.mdst_spine = mdst_spine
+        self.setup = setup
+        self.objects = {(obj['mdst_slot_name'], obj['mdst_attachment']): obj for obj in bpy.data.objects if 'mdst_attachment' in obj}
+        self.model = self.world = None
+
+    # (skin, slot, attachment, keys), 4.0 keeps deform timelines under deform, 4.1 under attachments next to sequence timelines
+    @staticmethod
+    def timelines(animation):
+        for skin_name, skin in animation.get('deform', {}).items():
+            for slot_name, slot in skin.items():
+                for attachment_name, keys in slot.items():
+                    yield skin_name, slot_name, attachment_name, keys
+        for skin_name, skin in animation.get('attachments', {}).items():
+            for slot_name, slot in skin.items():
+                for attachment_name, timelines in slot.items():
+                    if timelines.get('sequence'):
+                        MDST_LOGGER.warning('Sequence timeline of {} is not supported'.format(attachment_name))
+                    if timelines.get('deform'):
+                        yield skin_name, slot_name, attachment_name, timelines['deform']
+
+    def write(self, animation, actions, fps):
+        if self.mdst_spine.merge_mode != 'NONE':
+            if next(self.timelines(animation), None):
+                MDST_LOGGER.warning('Deform keys are not supported in merged mode')
+            return 0
+
+        frame_end = 0
+        for skin_name, slot_name, attachment_name, keys in self.timelines(animation):
+            obj = self.objects.get((slot_name, attachment_name))
+            if skin_name != 'default' or obj is None:
+                MDST_LOGGER.warning('Deform of {} in skin {} skipped, no mesh loaded for it'.format(attachment_name, skin_name))
+                continue
+            if obj['mdst_clipped']:
+                MDST_LOGGER.warning('Deform of clipped {} skipped, the cut mesh has no spine vertex order'.format(attachment_name))
+                continue
+            if keys:
+                self.write_timeline(obj, self.deltas(slot_name, attachment_name, keys), keys, actions, fps)
+                mesh_control = obj.get('mdst_control')
+                if mesh_control is not None:
+                    self.write_timeline(mesh_control, self.deltas(slot_name, attachment_name, keys, True), keys, actions, fps)
+                frame_end = max(frame_end, round(keys[-1].get('time', 0) * fps))
+        return frame_end
+
+    # setup pose object space delta of every key, (keys, vertices, 3)
+    # bind: bind space deltas of the AlternativeMesh copy instead, its vertices blend the influences without bone transforms
+    def deltas(self, slot_name, attachment_name, keys, bind=False):
+        if self.model is None:
+            self.model = load_model(self.mdst_spine)
+            self.world = Skeleton(list(self.setup.values())).world
+        entry = self.model.attachment(slot_name, attachment_name)
+        influence_vertex = np.asarray(entry.influence_vertex)
+
+        offsets = np.zeros((len(keys), len(influence_vertex) * 2))
+        for idx, key in enumerate(keys):
+            vertices = key.get('vertices')
+            if vertices:
+                start = key.get('offset', 0)
+                offsets[idx, start:start + len(vertices)] = vertices
+
+        m = np.tile([1.0, 0.0, 0.0, 1.0], (len(influence_vertex), 1)) if bind else self.world[np.asarray(entry.influence_bone)]
+        weights = np.asarray(entry.influence_weight)
+        dx, dy = offsets[:, 0::2], offsets[:, 1::2]
+        starts = np.flatnonzero(np.r_[True, np.diff(influence_vertex) != 0])
+
+        deltas = np.zeros((len(keys), len(entry.positions), 3))
+        deltas[:, influence_vertex[starts], 0] = np.add.reduceat((m[:, 0] * dx + m[:, 1] * dy) * weights, starts, axis=1)
+        deltas[:, influence_vertex[starts], 2] = np.add.reduceat((m[:, 2] * dx + m[:, 3] * dy) * weights, starts, axis=1)
+        return deltas
+
+    def write_timeline(self, obj, deltas, keys, actions, fps):
+        deltas = np.round(deltas, 4)
+        mesh = obj.data
+        if not mesh.shape_keys:
+            obj.shape_key_add(name='Basis', from_mix=False)
+        basis = np.zeros(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', basis)
+
+        # shape key name per key, None for frames without offsets
+        names = []
+        for delta in deltas:
+            if not delta.any():
+                names.append(None)
+                continue
+            name = 'deform_' + content_hash(delta.tobytes())[:10]
+            if name not in mesh.shape_keys.key_blocks:
+                block = obj.shape_key_add(name=name, from_mix=False)
+                block.data.foreach_set('co', basis + delta.astype(np.float32).ravel())
+            names.append(name)
+
+        action = actions.get(mesh.shape_keys)
+        for name, shape_keys in deform_keys(keys, names, fps).items():
+            write_fcurve(action, mesh.shape_keys.key_blocks[name].path_from_id('value'), 0, shape_keys)
+
+
+# Value keys of each shape, 1 on its own frames and 0 on the frames around them, so the curve between two frames
+#   fades one shape out as the next fades in. Deform curves run from 0 to 1, cy scales the step of each shape.
+def deform_keys(keys, names, fps):
+    frames = [round(key.get('time', 0) * fps) for key in keys]
+    channels = {}
+    for name in dict.fromkeys(filter(None, names)):
+        used = [idx for idx, key_name in enumerate(names) if key_name == name]
+        indices = sorted({near for idx in used for near in (idx - 1, idx, idx + 1) if 0 <= near < len(keys)})
+
+        shape_keys = channels[name] = FCurveKeys()
+        # spine shows the setup mesh before the first deform frame
+        if frames[0] > 0 and names[0] == name:
+            shape_keys.add(0, 0.0, 'CONSTANT')
+        for idx in indices:
+            value = 1.0 if names[idx] == name else 0.0
+            curve = keys[idx].get('curve', 'LINEAR')
+            if type(curve) == list and idx + 1 < len(keys):
+                step = (1.0 if names[idx + 1] == name else 0.0) - value
+                cx1, cy1, cx2, cy2 = curve[:4]
+                shape_keys.add(frames[idx], value, handles=((cx1 * fps, value + step * cy1), (cx2 * fps, value + step * cy2)))
+            else:
+                shape_keys.add(frames[idx], value, curve if curve == 'LINEAR' else 'CONSTANT')
+    return channels
+
+
+def load_animation(mdst_spine):
 
-    if not bpy.context.object.animation_data:
-        bpy.context.object.animation_data_create()
+    document = load_skeleton(mdst_spine)
+    data = document.data
+
+    control_obj = bpy.data.objects['rootControl']
+    bones = control_obj.pose.bones
+    if not control_obj.animation_data:
+        control_obj.animation_data_create()
 
     if mdst_spine.chk_create_static_action:
 
@@ -832,31 +2323,89 @@ def load_animation(mdst_spine):
         MDST_LOGGER.info('Create static action')
         if not bpy.data.actions.get('staticAction'):
             bpy.data.actions.new('staticAction')
-        bpy.context.object.animation_data.action = bpy.data.actions['staticAction']
+        static_action = bpy.data.actions['staticAction']
+        control_obj.animation_data.action = static_action
 
-        for bone in bpy.data.objects['rootControl'].pose.bones:
-            bone.keyframe_insert('location', frame=0)
-            bone.keyframe_insert('rotation_euler', frame=0)
-            bone.keyframe_insert('scale', frame=0)
+        for bone in bones:
+            for prop in ['location', 'rotation_euler', 'scale']:
+                for idx, value in enumerate(getattr(bone, prop)):
+                    keys = FCurveKeys()
+                    keys.add(0, value)
+                    write_fcurve(static_action, bone.path_from_id(prop), idx, keys, bone.name)
 
-    action_name = 'rootControlAction'
-    if not bpy.data.actions.get(action_name):
-        bpy.data.actions.new(action_name)
-    bpy.context.object.animation_data.action = bpy.data.actions[action_name]
     bpy.data.objects['root'].animation_data_clear()
 
-    separate_material = mdst_spine.chk_separate_material
-    layer_gap = mdst_spine.layer_gap
+    # merged meshes by slot index
+    merged_objs = {}
+    if mdst_spine.merge_mode != 'NONE':
+        for obj in bpy.data.objects:
+            for slot_idx in obj.get('mdst_slots', []):
+                merged_objs.setdefault(slot_idx, []).append(obj)
+
+    # setup pose of every bone and draw order offsets, shared by all animations
+    setup = {bone.name: bone for bone in (Bone(idx, bone_data) for idx, bone_data in enumerate(data['bones']))}
+    setup_offsets = {}
+    deform_shapes = DeformShapes(mdst_spine, setup)
 
     fps = data['skeleton'].get('fps', 30)
     bpy.context.scene.render.fps = fps
+
+    # default to the last animation, as MD uses the latest
+    animation_name = mdst_spine.animation or document.animation_names[-1]
+    written = [static_action] if mdst_spine.chk_create_static_action else []
+    leftover = set(imported_actions())
+    if mdst_spine.chk_import_all_animations:
+        # one parse, every animation into its own actions
+        active = None
+        for name in document.animation_names:
+            actions = AnimationActions(name, control_obj, leftover)
+            frame_end = write_animation(document.animation(name), actions, mdst_spine, data, setup, setup_offsets, merged_objs, deform_shapes, fps)
+            actions.push_nla_tracks()
+            written.extend(actions.actions.values())
+            if name == animation_name:
+                active = (actions, frame_end)
+        # an unknown selection falls back to the last animation
+        actions, frame_end = active or (actions, frame_end)
+        actions.assign()
+    else:
+        action_name = 'rootControlAction'
+        if not bpy.data.actions.get(action_name):
+            bpy.data.actions.new(action_name)
+        control_obj.animation_data.action = bpy.data.actions[action_name]
+        actions = AnimationActions()
+        frame_end = write_animation(document.animation(animation_name), actions, mdst_spine, data, setup, setup_offsets, merged_objs, deform_shapes, fps)
+        written.extend(actions.actions.values())
+    control_obj['mdst_actions'] = list(dict.fromkeys(action.name for action in written))
+
+    bpy.context.scene.frame_end = round(frame_end)
+    bpy.context.view_layer.update()
+    return control_obj.animation_data.action
+
+
+# writes one animation into actions, returns its last frame
+# setup: parsed setup pose bones by name, setup_offsets: draw order offset per slot object, filled on first use
+# deform_shapes: DeformShapes shared by every animation, so identical deform frames share a shape key
+def write_animation(animation, actions, mdst_spine, data, setup, setup_offsets, merged_objs, deform_shapes, fps):
+    pool_material = mdst_spine.chk_pool_material
+    separate_material = mdst_spine.chk_separate_material and not pool_material
+    layer_gap = mdst_spine.layer_gap
+    merge_mode = mdst_spine.merge_mode
+    slot_index = {slot['name']: slot_idx for slot_idx, slot in enumerate(data['slots'])}
+
+    control_obj = bpy.data.objects['rootControl']
+    bones = control_obj.pose.bones
+    action = actions.get(control_obj)
     frame_end = 0
 
-    # create animation
-    # for animation_name, animation in data['animations'].items():
-    animation = data['animations'][animation_name if animation_name else list(data['animations'].keys())[-1]]
     for slot_name, slot in animation.get('slots', {}).items():
-        if not separate_material:
+        if merge_mode != 'NONE':
+            slot_idx = slot_index.get(slot_name)
+            for obj in merged_objs.get(slot_idx, []):
+                color = RGBA(data['slots'][slot_idx].get('color', 'ffffffff'))
+                frame_end = max(frame_end, key_merged_slot(obj, slot_idx, slot, color, fps, actions.get(obj)))
+            continue
+
+        if not (separate_material or pool_material):
             break
         try:
             slot_obj = bpy.data.objects[slot_name]
@@ -868,54 +2417,33 @@ def load_animation(mdst_spine):
             continue
 
         # what version does spine use color instead of rgba?
-        handle_left = []
-        for keyframe in slot.get('rgba', slot.get('color', [])):
-            material_node = slot_obj.material_slots[0].material.node_tree
+        keyframes = slot.get('rgba', slot.get('color', []))
+        if pool_material:
+            # mask objects have no slot color
+            if 'mdst_alpha' in slot_obj:
+                frame_end = max(frame_end, key_slot_color(slot_obj, keyframes, fps, action=actions.get(slot_obj)))
+                if slot_name + '_Control' in bpy.data.objects:
+                    control_slot_obj = bpy.data.objects[slot_name + '_Control']
+                    key_slot_color(control_slot_obj, keyframes, fps, action=actions.get(control_slot_obj))
+
+        if separate_material and keyframes:
+            material = slot_obj.material_slots[0].material
+            material_node = material.node_tree
 
             # skip mask material (for now)
             mix_node = get_material_node(material_node.nodes, 'MIX')
-            if not mix_node:
-                continue
-
-            color = RGBA(keyframe['color'])
-            curve = keyframe.get('curve', 'LINEAR')
-
-            # alpha keyframe
-            mix_node.inputs[0].default_value = 1 - color.a
-            mix_node.inputs[0].keyframe_insert('default_value', frame=round(keyframe.get('time', 0) * fps))
-
-            if handle_left:
-                material_node.animation_data.action.fcurves[-1].keyframe_points[-1].handle_left_type = 'FREE'
-                material_node.animation_data.action.fcurves[-1].keyframe_points[-1].handle_left = handle_left[-1]
-
-            # set f-curve
-            if type(curve) == list:
-                curve = [(t * fps, v) for t, v in zip(keyframe['curve'][0::2], keyframe['curve'][1::2])]
-
-                # set bezier curve handle for alpha
-                material_node.animation_data.action.fcurves[-1].keyframe_points[-1].handle_right_type = 'FREE'
-                material_node.animation_data.action.fcurves[-1].keyframe_points[-1].handle_right = curve[-2]
-                handle_left = curve[1::2]
-            else:
-                curve_type = curve if curve == 'LINEAR' else 'CONSTANT'
-                material_node.animation_data.action.fcurves[-1].keyframe_points[-1].interpolation = curve_type
-                handle_left = []
-
-            frame_end = max(frame_end, round(keyframe.get('time', 0) * fps))
-
-        zero_keyframe_stat = False
-        for attachment in slot.get('attachment', []):
-            if not zero_keyframe_stat and round(attachment.get('time', 0) * fps) > 0:
-                zero_keyframe_stat = True
-                slot_obj.hide_render = slot_obj.hide_viewport = False
-                slot_obj.keyframe_insert('hide_viewport', frame=0)
-                slot_obj.keyframe_insert('hide_render', frame=0)
-            elif round(attachment.get('time', 0) * fps) == 0:
-                zero_keyframe_stat = True
-
-            slot_obj.hide_render = slot_obj.hide_viewport = 'name' not in attachment
-            slot_obj.keyframe_insert('hide_viewport', frame=round(attachment.get('time', 0) * fps))
-            slot_obj.keyframe_insert('hide_render', frame=round(attachment.get('time', 0) * fps))
+            if mix_node:
+                # alpha keyframe, the mix factor is the transparency
+                alpha_keys = color_keys(keyframes, fps, (float, float, float, lambda v: 1 - v))[3]
+                write_fcurve(actions.get(material_node, material), mix_node.inputs[0].path_from_id('default_value'), 0, alpha_keys)
+                frame_end = max(frame_end, alpha_keys.co[-1][0])
+
+        attachments = slot.get('attachment', [])
+        if attachments:
+            slot_action = actions.get(slot_obj)
+            keys = visibility_keys(attachments, fps)
+            write_fcurve(slot_action, 'hide_viewport', 0, keys)
+            write_fcurve(slot_action, 'hide_render', 0, keys)
 
     for bone_name, bone in animation.get('bones', {}).items():
         try:
@@ -923,171 +2451,55 @@ def load_animation(mdst_spine):
         except KeyError:
             MDST_LOGGER.error('Bone {} not found'.format(bone_name))
             continue
-        _, static_x, static_y = bone_obj.location
-        static_rotation = bone_obj.rotation_euler[0]
-        _, static_scale_x, static_scale_y = bone_obj.scale
-
-        handle_left = []
-        for translate in bone.get('translate', []):
-
-            # legacy approach
-            # if legacy_load_fix:
-            #     # roll = bone_obj['_roll']
-            #     # if bone_obj.name.startswith('IK_'):
-            #     # MDST_LOGGER.info(bone_obj.name)
-            #     # MDST_LOGGER.info(math.degrees(bone_obj.rotation_euler.x))
-            #     if scene.frame_current != round(translate.get('time', 0) * fps):
-            #         scene.frame_set(round(translate.get('time', 0) * fps))
-            #     # roll = context_bones[bone_obj.name].matrix.to_euler().x
-            #     # roll = context_bones[bone_obj.name].rotation_euler.x - bone_obj['_parent_local_rotation']
-            #     roll = bone_obj['_parent_local_rotation'] - context_bones[bone_obj.name].rotation_euler.x
-            #     # roll = context_bones[bone_obj.name].rotation_euler.x - bone_obj['_parent_local_rotation']
-            #     # roll = bone_obj['_parent_rotation'] - context_bones[bone_obj.name].rotation_euler.x
-            #     # roll = bone_obj['_rotation']
-            #     # MDST_LOGGER.info(math.degrees(roll))
-            #     tr_x = (translate.get('x', 0) * math.cos(roll) - translate.get('y', 0) * math.sin(roll)) * 1
-            #     tr_y = (translate.get('x', 0) * math.sin(roll) + translate.get('y', 0) * math.cos(roll)) * 1
-            # else:
-            #     tr_x = translate.get('x', 0)
-            #     tr_y = translate.get('y', 0)
-
-            tr_x = static_x + translate.get('x', 0)
-            tr_y = static_y + translate.get('y', 0)
-
-            # but why x, 0, y become 0, x, y?
-            bone_obj.location = mathutils.Vector((0, tr_x, tr_y))
-            bone_obj.keyframe_insert('location', frame=round(translate.get('time', 0) * fps))
-            curve = translate.get('curve', 'LINEAR')
-
-            if handle_left:
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_left_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_left_type = 'FREE'
-
-                # if legacy_load_fix:
-                #     tr_x = (handle_left[0][1] * math.cos(roll) - handle_left[1][1] * math.sin(roll)) * 1
-                #     tr_y = (handle_left[0][1] * math.sin(roll) + handle_left[1][1] * math.cos(roll)) * 1
-                # else:
-                #     tr_x = handle_left[0][1]
-                #     tr_y = handle_left[1][1]
-
-                tr_x = static_x + handle_left[0][1]
-                tr_y = static_y + handle_left[1][1]
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_left = (handle_left[0][0], tr_x)
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_left = (handle_left[1][0], tr_y)
-
-            if type(curve) == list:
-                curve = [(t * fps, v) for t, v in zip(translate['curve'][::2], translate['curve'][1::2])]
-
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_right_type = 'FREE'
-
-                # if legacy_load_fix:
-                #     tr_x = (curve[0][1] * math.cos(roll) - curve[2][1] * math.sin(roll)) * 1
-                #     tr_y = (curve[0][1] * math.sin(roll) + curve[2][1] * math.cos(roll)) * 1
-                # else:
-                #     tr_x = curve[0][1]
-                #     tr_y = curve[2][1]
-
-                tr_x = static_x + curve[0][1]
-                tr_y = static_y + curve[2][1]
-
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_right = (curve[0][0], tr_x)
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_right = (curve[2][0], tr_y)
-                handle_left = curve[1], curve[3]
-            else:
-                curve_type = curve if curve == 'LINEAR' else 'CONSTANT'
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].interpolation = curve_type
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].interpolation = curve_type
-                handle_left = []
-
-        handle_left = []
-        for rotate in bone.get('rotate', []):
-            # bone_obj.rotation_euler[0] = math.radians(rotate.get('value', 0))
-
-            bone_obj.rotation_euler[0] = static_rotation + math.radians(rotate.get('value', 0))
-            bone_obj.keyframe_insert('rotation_euler', frame=round(rotate.get('time', 0) * fps))
-            curve = rotate.get('curve', 'LINEAR')
-
-            if handle_left:
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].handle_left = handle_left
-
-            if type(curve) == list:
-
-                # curve = [(t * fps, math.radians(v)) for t, v in zip(rotate['curve'][::2], rotate['curve'][1::2])]
-
-                curve = [(t * fps, static_rotation + math.radians(v)) for t, v in zip(rotate['curve'][::2], rotate['curve'][1::2])]
-
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].interpolation = 'BEZIER'
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].handle_right = curve[0]
-                handle_left = curve[1]
-            else:
-                curve_type = curve if curve == 'LINEAR' else 'CONSTANT'
-                bpy.data.actions[action_name].fcurves[-3].keyframe_points[-1].interpolation = curve_type
-                handle_left = []
-
-        handle_left = []
-        for scale in bone.get('scale', []):
-            # bone_obj.scale = (1, scale.get('x', 1), scale.get('y', 1))
-
-            bone_obj.scale = (1, static_scale_x * scale.get('x', 1), static_scale_y * scale.get('y', 1))
-            bone_obj.keyframe_insert('scale', frame=round(scale.get('time', 0) * fps))
-            curve = scale.get('curve', 'LINEAR')
-
-            if handle_left:
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_left = handle_left[0]
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_left = handle_left[1]
-
-            if type(curve) == list:
-                curve = [(t * fps, v) for t, v in zip(scale['curve'][::2], scale['curve'][1::2])]
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_right_type = 'FREE'
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].handle_right = curve[0]
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].handle_right = curve[2]
-                handle_left = [curve[1], curve[3]]
-            else:
-                curve_type = curve if curve == 'LINEAR' else 'CONSTANT'
-                bpy.data.actions[action_name].fcurves[-2].keyframe_points[-1].interpolation = curve_type
-                bpy.data.actions[action_name].fcurves[-1].keyframe_points[-1].interpolation = curve_type
-                handle_left = []
+        static_x, static_y = setup[bone_name].x, setup[bone_name].y
+        static_rotation = setup[bone_name].rotation
+        static_scale_x, static_scale_y = setup[bone_name].scaleX, setup[bone_name].scaleY
+
+        # but why x, 0, y become 0, x, y?
+        timelines = [
+            ('location', 'translate', [1, 2], ['x', 'y'], 0, [lambda v: static_x + v, lambda v: static_y + v]),
+            ('rotation_euler', 'rotate', [0], ['value'], 0, [lambda v: static_rotation + math.radians(v)]),
+            ('scale', 'scale', [1, 2], ['x', 'y'], 1, [lambda v: static_scale_x * v, lambda v: static_scale_y * v]),
+        ]
+        for prop, timeline_name, indices, fields, default, transforms in timelines:
+            timeline = bone.get(timeline_name, [])
+            if not timeline:
+                continue
+            channels = timeline_keys(timeline, fps, [[key.get(field, default) for key in timeline] for field in fields], transforms)
+            for idx, keys in zip(indices, channels):
+                write_fcurve(action, bone_obj.path_from_id(prop), idx, keys, bone_obj.name)
+            frame_end = max(frame_end, channels[0].co[-1][0])
 
         for _ in bone.get('shear', []):
             ...
 
-    for _, _ in animation.get('attachments', {}).items():
-        ...
-
-    for _, _ in animation.get('deform', {}).items():
-        ...
+    frame_end = max(frame_end, deform_shapes.write(animation, actions, fps))
 
     offset_dict = {}
-    for draw_order in animation.get('drawOrder', []):
+    offset_keys = {}
+    if merge_mode != 'NONE' and animation.get('drawOrder'):
+        MDST_LOGGER.warning('Draw order keys are not supported in merged mode, the setup order is kept')
+    for draw_order in (animation.get('drawOrder', []) if merge_mode == 'NONE' else []):
         time = round(draw_order.get('time', 0) * fps)
         offsets = {slot['slot']: slot['offset'] for slot in draw_order.get('offsets', [])}
 
         for slot_name in offsets.keys():
+            if slot_name not in setup_offsets:
+                setup_offsets[slot_name] = bpy.data.objects[slot_name].location[1]
             if slot_name not in offset_dict:
-                offset_dict[slot_name] = bpy.data.objects[slot_name].location[1]
+                offset_dict[slot_name] = setup_offsets[slot_name]
+                offset_keys[slot_name] = FCurveKeys()
 
         for slot_name, orig_offset in offset_dict.items():
-            offset = offset_dict[slot_name] + offsets[slot_name] * layer_gap if slot_name in offsets else offset_dict[slot_name]
-
-            bpy.data.objects[slot_name].location = (0, offset, 0)
-            bpy.data.objects[slot_name].keyframe_insert('location', frame=time)
-
-            bpy.data.actions[slot_name + 'Action'].fcurves[-2].keyframe_points[-1].interpolation = 'CONSTANT'
+            offset = orig_offset + offsets[slot_name] * layer_gap if slot_name in offsets else orig_offset
+            offset_keys[slot_name].add(time, offset, 'CONSTANT')
 
-            if slot_name + '_Control' in bpy.data.objects:
-                bpy.data.objects[slot_name + '_Control'].location = (0, offset, 0)
-                bpy.data.objects[slot_name + '_Control'].keyframe_insert('location', frame=time)
+    for slot_name, keys in offset_keys.items():
+        write_fcurve(actions.get(bpy.data.objects[slot_name]), 'location', 1, keys)
+        if slot_name + '_Control' in bpy.data.objects:
+            write_fcurve(actions.get(bpy.data.objects[slot_name + '_Control']), 'location', 1, keys)
 
-                bpy.data.actions[slot_name + '_ControlAction'].fcurves[-2].keyframe_points[-1].interpolation = 'CONSTANT'
-
-    bpy.context.scene.frame_end = round(frame_end)
-    bpy.context.view_layer.update()
+    return frame_end
 
 
 def apply_pose():
@@ -0,0 +1,505 @@
+import struct
+
+
+# Spine binary skeleton (.skel) reader for 4.0 and 4.1
+# Decodes into the same dict layout as the Spine json format, so load_spine and load_animation consume it unchanged.
+# Spine binary format: http://esotericsoftware.com/spine-binary-format
+
+TRANSFORM_MODES = ['normal', 'onlyTranslation', 'noRotationOrReflection', 'noScale', 'noScaleOrReflection']
+BLEND_MODES = ['normal', 'additive', 'multiply', 'screen']
+POSITION_MODES = ['fixed', 'percent']
+SPACING_MODES = ['length', 'fixed', 'percent', 'proportional']
+ROTATE_MODES = ['tangent', 'chain', 'chainScale']
+ATTACHMENT_TYPES = ['region', 'boundingbox', 'mesh', 'linkedmesh', 'path', 'point', 'clipping']
+SEQUENCE_MODES = ['hold', 'once', 'loop', 'pingpong', 'onceReverse', 'loopReverse', 'pingpongReverse']
+
+BONE_TIMELINES = [
+    ('rotate', ['value']), ('translate', ['x', 'y']), ('translatex', ['value']), ('translatey', ['value']),
+    ('scale', ['x', 'y']), ('scalex', ['value']), ('scaley', ['value']),
+    ('shear', ['x', 'y']), ('shearx', ['value']), ('sheary', ['value']),
+]
+
+SLOT_ATTACHMENT, SLOT_RGBA, SLOT_RGB, SLOT_RGBA2, SLOT_RGB2, SLOT_ALPHA = range(6)
+PATH_POSITION, PATH_SPACING, PATH_MIX = range(3)
+ATTACHMENT_DEFORM, ATTACHMENT_SEQUENCE = range(2)
+CURVE_LINEAR, CURVE_STEPPED, CURVE_BEZIER = range(3)
+
+
+class SkeletonInput:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.strings = []
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def read_byte(self):
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def read_sbyte(self):
+        return self.unpack('>b')[0]
+
+    def read_bool(self):
+        return self.read_byte() != 0
+
+    def read_int(self):
+        return self.unpack('>i')[0]
+
+    def read_long(self):
+        return self.unpack('>q')[0]
+
+    def read_float(self):
+        return self.unpack('>f')[0]
+
+    def read_floats(self, count):
+        return list(self.unpack('>%df' % count))
+
+    def read_shorts(self):
+        count = self.read_varint()
+        return list(self.unpack('>%dH' % count))
+
+    # variable length int, 32 bit like the java runtime
+    def read_varint(self, optimize_positive=True):
+        b = self.read_byte()
+        result = b & 0x7F
+        shift = 7
+        while b & 0x80 and shift <= 28:
+            b = self.read_byte()
+            result |= (b & 0x7F) << shift
+            shift += 7
+        result &= 0xFFFFFFFF
+        if not optimize_positive:
+            return (result >> 1) ^ -(result & 1)
+        return result - (1 << 32) if result & 0x80000000 else result
+
+    def read_string(self):
+        byte_count = self.read_varint()
+        if byte_count == 0:
+            return None
+        self.pos += byte_count - 1
+        return bytes(self.data[self.pos - byte_count + 1:self.pos]).decode('utf-8', 'replace')
+
+    def read_string_ref(self):
+        idx = self.read_varint()
+        return self.strings[idx - 1] if idx else None
+
+    def read_color(self):
+        return '%08x' % (self.read_int() & 0xFFFFFFFF)
+
+
+class SkeletonBinary:
+    def __init__(self, data):
+        self.input = SkeletonInput(data)
+        self.data = {}
+        self.version = ''
+        self.nonessential = False
+
+    def read(self):
+        _input = self.input
+
+        skeleton = {'hash': str(_input.read_long())}
+        self.version = skeleton['spine'] = _input.read_string() or ''
+        skeleton['x'], skeleton['y'], skeleton['width'], skeleton['height'] = _input.read_floats(4)
+        self.nonessential = _input.read_bool()
+        if self.nonessential:
+            skeleton['fps'] = _input.read_float()
+            skeleton['images'] = _input.read_string()
+            skeleton['audio'] = _input.read_string()
+        self.data['skeleton'] = skeleton
+
+        _input.strings = [_input.read_string() for _ in range(_input.read_varint())]
+
+        bones = self.data['bones'] = []
+        for idx in range(_input.read_varint()):
+            bone = {'name': _input.read_string()}
+            if idx:
+                bone['parent'] = bones[_input.read_varint()]['name']
+            for k in ['rotation', 'x', 'y', 'scaleX', 'scaleY', 'shearX', 'shearY', 'length']:
+                bone[k] = _input.read_float()
+            bone['transform'] = TRANSFORM_MODES[_input.read_varint()]
+            bone['skin'] = _input.read_bool()
+            if self.nonessential:
+                bone['color'] = _input.read_color()
+            bones.append(bone)
+
+        slots = self.data['slots'] = []
+        for _ in range(_input.read_varint()):
+            slot = {'name': _input.read_string()}
+            slot['bone'] = bones[_input.read_varint()]['name']
+            slot['color'] = _input.read_color()
+            dark = _input.read_int()
+            if dark != -1:
+                slot['dark'] = '%06x' % (dark & 0xFFFFFF)
+            attachment = _input.read_string_ref()
+            if attachment is not None:
+                slot['attachment'] = attachment
+            slot['blend'] = BLEND_MODES[_input.read_varint()]
+            slots.append(slot)
+
+        self.data['ik'] = []
+        for _ in range(_input.read_varint()):
+            ik = self.read_constraint_header()
+            ik['target'] = bones[_input.read_varint()]['name']
+            ik['mix'] = _input.read_float()
+            ik['softness'] = _input.read_float()
+            ik['bendPositive'] = _input.read_sbyte() == 1
+            ik['compress'] = _input.read_bool()
+            ik['stretch'] = _input.read_bool()
+            ik['uniform'] = _input.read_bool()
+            self.data['ik'].append(ik)
+
+        self.data['transform'] = []
+        for _ in range(_input.read_varint()):
+            transform = self.read_constraint_header()
+            transform['target'] = bones[_input.read_varint()]['name']
+            transform['local'] = _input.read_bool()
+            transform['relative'] = _input.read_bool()
+            for k in ['rotation', 'x', 'y', 'scaleX', 'scaleY', 'shearY', 'mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY']:
+                transform[k] = _input.read_float()
+            self.data['transform'].append(transform)
+
+        self.data['path'] = []
+        for _ in range(_input.read_varint()):
+            path = self.read_constraint_header()
+            path['target'] = slots[_input.read_varint()]['name']
+            path['positionMode'] = POSITION_MODES[_input.read_varint()]
+            path['spacingMode'] = SPACING_MODES[_input.read_varint()]
+            path['rotateMode'] = ROTATE_MODES[_input.read_varint()]
+            for k in ['rotation', 'position', 'spacing', 'mixRotate', 'mixX', 'mixY']:
+                path[k] = _input.read_float()
+            self.data['path'].append(path)
+
+        skins = self.data['skins'] = []
+        default_skin = self.read_skin(True)
+        if default_skin:
+            skins.append(default_skin)
+        for _ in range(_input.read_varint()):
+            skins.append(self.read_skin(False))
+
+        events = self.data['events'] = {}
+        for _ in range(_input.read_varint()):
+            name = _input.read_string_ref()
+            event = events[name] = {'int': _input.read_varint(False), 'float': _input.read_float(), 'string': _input.read_string()}
+            audio = _input.read_string()
+            if audio is not None:
+                event['audio'] = audio
+                event['volume'] = _input.read_float()
+                event['balance'] = _input.read_float()
+
+        animations = self.data['animations'] = {}
+        for _ in range(_input.read_varint()):
+            name = _input.read_string()
+            animations[name] = self.read_animation()
+
+        return self.data
+
+    def read_constraint_header(self):
+        _input = self.input
+        constraint = {'name': _input.read_string(), 'order': _input.read_varint(), 'skin': _input.read_bool()}
+        constraint['bones'] = [self.data['bones'][_input.read_varint()]['name'] for _ in range(_input.read_varint())]
+        return constraint
+
+    def read_skin(self, default_skin):
+        _input = self.input
+        if default_skin:
+            slot_count = _input.read_varint()
+            if not slot_count:
+                return None
+            skin = {'name': 'default'}
+        else:
+            skin = {'name': _input.read_string_ref()}
+            skin['bones'] = [self.data['bones'][_input.read_varint()]['name'] for _ in range(_input.read_varint())]
+            for k in ['ik', 'transform', 'path']:
+                skin[k] = [self.data[k][_input.read_varint()]['name'] for _ in range(_input.read_varint())]
+            slot_count = _input.read_varint()
+
+        attachments = skin['attachments'] = {}
+        for _ in range(slot_count):
+            slot_name = self.data['slots'][_input.read_varint()]['name']
+            slot_attachments = attachments[slot_name] = {}
+            for _ in range(_input.read_varint()):
+                name = _input.read_string_ref()
+                slot_attachments[name] = self.read_attachment(name)
+        return skin
+
+    def read_sequence(self):
+        _input = self.input
+        if not self.version.startswith('4.1') or not _input.read_bool():
+            return None
+        return {'count': _input.read_varint(), 'start': _input.read_varint(), 'digits': _input.read_varint(), 'setup': _input.read_varint()}
+
+    def read_vertices(self, vertex_count):
+        _input = self.input
+        if not _input.read_bool():
+            return _input.read_floats(vertex_count * 2)
+
+        vertices = []
+        for _ in range(vertex_count):
+            bone_count = _input.read_varint()
+            vertices.append(bone_count)
+            for _ in range(bone_count):
+                vertices.append(_input.read_varint())
+                vertices.extend(_input.read_floats(3))
+        return vertices
+
+    def read_attachment(self, attachment_name):
+        _input = self.input
+        attachment = {}
+        name = _input.read_string_ref()
+        if name is not None and name != attachment_name:
+            attachment['name'] = name
+
+        attachment_type = attachment['type'] = ATTACHMENT_TYPES[_input.read_byte()]
+        if attachment_type == 'region':
+            path = _input.read_string_ref()
+            for k in ['rotation', 'x', 'y', 'scaleX', 'scaleY', 'width', 'height']:
+                attachment[k] = _input.read_float()
+            attachment['color'] = _input.read_color()
+            sequence = self.read_sequence()
+
+        elif attachment_type == 'mesh':
+            path = _input.read_string_ref()
+            attachment['color'] = _input.read_color()
+            vertex_count = _input.read_varint()
+            attachment['uvs'] = _input.read_floats(vertex_count * 2)
+            attachment['triangles'] = _input.read_shorts()
+            attachment['vertices'] = self.read_vertices(vertex_count)
+            attachment['hull'] = _input.read_varint()
+            sequence = self.read_sequence()
+            if self.nonessential:
+                attachment['edges'] = _input.read_shorts()
+                attachment['width'], attachment['height'] = _input.read_floats(2)
+
+        elif attachment_type == 'linkedmesh':
+            path = _input.read_string_ref()
+            attachment['color'] = _input.read_color()
+            skin = _input.read_string_ref()
+            if skin is not None:
+                attachment['skin'] = skin
+            attachment['parent'] = _input.read_string_ref()
+            attachment['timelines'] = _input.read_bool()
+            sequence = self.read_sequence()
+            if self.nonessential:
+                attachment['width'], attachment['height'] = _input.read_floats(2)
+
+        else:
+            path = sequence = None
+            if attachment_type == 'path':
+                attachment['closed'] = _input.read_bool()
+                attachment['constantSpeed'] = _input.read_bool()
+            elif attachment_type == 'point':
+                attachment['rotation'], attachment['x'], attachment['y'] = _input.read_floats(3)
+            elif attachment_type == 'clipping':
+                attachment['end'] = self.data['slots'][_input.read_varint()]['name']
+
+            if attachment_type != 'point':
+                vertex_count = attachment['vertexCount'] = _input.read_varint()
+                attachment['vertices'] = self.read_vertices(vertex_count)
+            if attachment_type == 'path':
+                attachment['lengths'] = _input.read_floats(vertex_count // 3)
+            if self.nonessential:
+                attachment['color'] = _input.read_color()
+
+        if path is not None:
+            attachment['path'] = path
+        if sequence is not None:
+            attachment['sequence'] = sequence
+        return attachment
+
+    # frames of a curve timeline as json keys, read_values returns the values of one frame
+    def read_curve_timeline(self, frame_count, names, read_values=None, read_extra=None):
+        _input = self.input
+        read_values = read_values or (lambda: _input.read_floats(len(names)))
+        frames = []
+        time, values = _input.read_float(), read_values()
+        for frame in range(frame_count):
+            key = {'time': time}
+            key.update(zip(names, values))
+            if read_extra:
+                key.update(read_extra())
+            frames.append(key)
+            if frame == frame_count - 1:
+                break
+
+            time, values = _input.read_float(), read_values()
+            curve = _input.read_byte()
+            if curve == CURVE_STEPPED:
+                key['curve'] = 'stepped'
+            elif curve == CURVE_BEZIER:
+                key['curve'] = _input.read_floats(4 * len(names))
+        return frames
+
+    def read_color_timeline(self, frame_count, channels, names):
+        _input = self.input
+
+        def read_values():
+            return [_input.read_byte() / 255 for _ in range(channels)]
+
+        frames = self.read_curve_timeline(frame_count, ['c%d' % i for i in range(channels)], read_values)
+        for key in frames:
+            color = [round(key.pop('c%d' % i) * 255) for i in range(channels)]
+            for name, start, end in names:
+                key[name] = ''.join('%02x' % c for c in color[start:end])
+        return frames
+
+    def read_animation(self):
+        _input = self.input
+        animation = {}
+        _input.read_varint()
+
+        slots = {}
+        for _ in range(_input.read_varint()):
+            slot = slots.setdefault(self.data['slots'][_input.read_varint()]['name'], {})
+            for _ in range(_input.read_varint()):
+                timeline_type, frame_count = _input.read_byte(), _input.read_varint()
+                if timeline_type == SLOT_ATTACHMENT:
+                    slot['attachment'] = [{'time': _input.read_float(), 'name': _input.read_string_ref()} for _ in range(frame_count)]
+                    continue
+
+                _input.read_varint()
+                if timeline_type == SLOT_RGBA:
+                    slot['rgba'] = self.read_color_timeline(frame_count, 4, [('color', 0, 4)])
+                elif timeline_type == SLOT_RGB:
+                    slot['rgb'] = self.read_color_timeline(frame_count, 3, [('color', 0, 3)])
+                elif timeline_type == SLOT_RGBA2:
+                    slot['rgba2'] = self.read_color_timeline(frame_count, 7, [('light', 0, 4), ('dark', 4, 7)])
+                elif timeline_type == SLOT_RGB2:
+                    slot['rgb2'] = self.read_color_timeline(frame_count, 6, [('light', 0, 3), ('dark', 3, 6)])
+                elif timeline_type == SLOT_ALPHA:
+                    slot['alpha'] = self.read_curve_timeline(frame_count, ['value'], lambda: [_input.read_byte() / 255])
+        if slots:
+            animation['slots'] = slots
+
+        bones = {}
+        for _ in range(_input.read_varint()):
+            bone = bones.setdefault(self.data['bones'][_input.read_varint()]['name'], {})
+            for _ in range(_input.read_varint()):
+                timeline_type, frame_count = _input.read_byte(), _input.read_varint()
+                _input.read_varint()
+                name, fields = BONE_TIMELINES[timeline_type]
+                bone[name] = self.read_curve_timeline(frame_count, fields)
+        if bones:
+            animation['bones'] = bones
+
+        def read_ik_extra():
+            return {'bendPositive': _input.read_sbyte() == 1, 'compress': _input.read_bool(), 'stretch': _input.read_bool()}
+
+        ik = {}
+        for _ in range(_input.read_varint()):
+            name = self.data['ik'][_input.read_varint()]['name']
+            frame_count = _input.read_varint()
+            _input.read_varint()
+            ik[name] = self.read_curve_timeline(frame_count, ['mix', 'softness'], read_extra=read_ik_extra)
+        if ik:
+            animation['ik'] = ik
+
+        transform = {}
+        for _ in range(_input.read_varint()):
+            name = self.data['transform'][_input.read_varint()]['name']
+            frame_count = _input.read_varint()
+            _input.read_varint()
+            transform[name] = self.read_curve_timeline(frame_count, ['mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY'])
+        if transform:
+            animation['transform'] = transform
+
+        path = {}
+        for _ in range(_input.read_varint()):
+            constraint = path.setdefault(self.data['path'][_input.read_varint()]['name'], {})
+            for _ in range(_input.read_varint()):
+                timeline_type, frame_count = _input.read_byte(), _input.read_varint()
+                _input.read_varint()
+                if timeline_type == PATH_MIX:
+                    constraint['mix'] = self.read_curve_timeline(frame_count, ['mixRotate', 'mixX', 'mixY'])
+                else:
+                    constraint['position' if timeline_type == PATH_POSITION else 'spacing'] = self.read_curve_timeline(frame_count, ['value'])
+        if path:
+            animation['path'] = path
+
+        # 4.0 json keeps deform timelines under deform, 4.1 under attachments with sequence timelines
+        attachments = {}
+        for _ in range(_input.read_varint()):
+            skin = attachments.setdefault(self.data['skins'][_input.read_varint()]['name'], {})
+            for _ in range(_input.read_varint()):
+                slot = skin.setdefault(self.data['slots'][_input.read_varint()]['name'], {})
+                for _ in range(_input.read_varint()):
+                    attachment_name = _input.read_string_ref()
+                    if self.version.startswith('4.1'):
+                        timeline_type = _input.read_byte()
+                        timelines = slot.setdefault(attachment_name, {})
+                        if timeline_type == ATTACHMENT_SEQUENCE:
+                            timelines['sequence'] = self.read_sequence_timeline()
+                        else:
+                            timelines['deform'] = self.read_deform_timeline()
+                    else:
+                        slot[attachment_name] = self.read_deform_timeline()
+        if attachments:
+            animation['attachments' if self.version.startswith('4.1') else 'deform'] = attachments
+
+        draw_order = []
+        for _ in range(_input.read_varint()):
+            key = {'time': _input.read_float(), 'offsets': []}
+            for _ in range(_input.read_varint()):
+                slot_name = self.data['slots'][_input.read_varint()]['name']
+                key['offsets'].append({'slot': slot_name, 'offset': _input.read_varint()})
+            draw_order.append(key)
+        if draw_order:
+            animation['drawOrder'] = draw_order
+
+        events = []
+        event_data = list(self.data['events'].items())
+        for _ in range(_input.read_varint()):
+            time = _input.read_float()
+            name, data = event_data[_input.read_varint()]
+            event = {'time': time, 'name': name, 'int': _input.read_varint(False), 'float': _input.read_float()}
+            event['string'] = _input.read_string() if _input.read_bool() else data['string']
+            if 'audio' in data:
+                event['volume'], event['balance'] = _input.read_floats(2)
+            events.append(event)
+        if events:
+            animation['events'] = events
+
+        return animation
+
+    def read_deform_timeline(self):
+        _input = self.input
+        frame_count = _input.read_varint()
+        _input.read_varint()
+
+        frames = []
+        time = _input.read_float()
+        for frame in range(frame_count):
+            key = {'time': time}
+            end = _input.read_varint()
+            if end:
+                key['offset'] = _input.read_varint()
+                key['vertices'] = _input.read_floats(end)
+            frames.append(key)
+            if frame == frame_count - 1:
+                break
+
+            time = _input.read_float()
+            curve = _input.read_byte()
+            if curve == CURVE_STEPPED:
+                key['curve'] = 'stepped'
+            elif curve == CURVE_BEZIER:
+                key['curve'] = _input.read_floats(4)
+        return frames
+
+    def read_sequence_timeline(self):
+        _input = self.input
+        frames = []
+        for _ in range(_input.read_varint()):
+            time = _input.read_float()
+            mode_and_index = _input.read_int()
+            frames.append({
+                'time': time, 'mode': SEQUENCE_MODES[mode_and_index & 0xF], 'index': mode_and_index >> 4, 'delay': _input.read_float()
+            })
+        return frames
+
+
+def read_skeleton_binary(data):
+    return SkeletonBinary(data).read()
@@ -4,21 +4,11 @@ from bpy.props import StringProperty, IntProperty, BoolProperty, CollectionPrope
 from bpy_extras.io_utils import ImportHelper
 
 from . import MDST_LOGGER, MDST_SETTINGS
-from .mdst_io import load_json, load_spine, load_animation, apply_pose, toggle_armature_constrain
+from .mdst_bake import bake_constraints
+from .mdst_io import clear_cache, delete_helper, is_binary_skeleton, load_skeleton, load_spine, load_animation, apply_pose, reduce_actions, toggle_armature_constrain
 
 
 # ['objects', 'armatures', 'meshes', 'curves', 'materials', 'actions']
-def delete_helper(objs):
-    try:
-        bpy.ops.object.mode_set(mode="OBJECT")
-    except:
-        pass
-
-    for obj in objs:
-        for data in getattr(bpy.data, obj):
-            getattr(bpy.data, obj).remove(data)
-
-
 def animation_list_callback(self, context):
     return context.scene.mdst_spine.animation_list
 
@@ -29,13 +19,28 @@ def attachment_list_callback(self, context):
 
 class MDSTSpine(PropertyGroup):
     spine_ref: PointerProperty(type=Text)
+    spine_path: StringProperty(name='Binary Spine', subtype='FILE_PATH')
     atlas_ref: PointerProperty(type=Text)
     layer_gap: FloatProperty(name='Layer Gap', default=-0.01)
     chk_auto_load_animation: BoolProperty(name='Auto Load Animation', default=True)
     chk_alternative_mesh: BoolProperty(name='Create Alternative Mesh', default=True)
     chk_separate_material: BoolProperty(name='Separate Material', default=True)
+    chk_pool_material: BoolProperty(name='Pool Material', default=False)
+    merge_mode: EnumProperty(name='Merge Mesh', default='NONE', items=[
+        ('NONE', 'None', 'One object per attachment'),
+        ('PAGE', 'Atlas Page', 'One mesh per atlas page'),
+        ('CHARACTER', 'Character', 'One mesh for the whole character'),
+    ])
+    clipping_mode: EnumProperty(name='Clipping', default='GEOMETRY', items=[
+        ('GEOMETRY', 'Geometry', 'Cut masked attachments by the setup pose clip polygon at import'),
+        ('BOOLEAN', 'Boolean', 'Intersect masked attachments with an animated clip object'),
+    ])
     chk_generate_ik_pole: BoolProperty(name='Generate IK Pole', default=True)
     chk_create_static_action: BoolProperty(name='Create Static Action', default=True)
+    chk_import_all_animations: BoolProperty(name='Import All Animations', default=False)
+    chk_bake_constraints: BoolProperty(name='Bake Constraints', default=False)
+    chk_reduce_keys: BoolProperty(name='Reduce Keys', default=False)
+    reduce_tolerance: FloatProperty(name='Tolerance', default=0.001, min=0.0, precision=4)
 
     spine_loaded: BoolProperty(name='Spine Loaded', default=False)
     armature_constrain: BoolProperty(name='Spine Loaded', default=True)
@@ -48,24 +53,30 @@ class MDSTSpine(PropertyGroup):
 
 class MDST_OT_ImportSpine(Operator, ImportHelper):
     bl_idname = 'md_spine_tools.import_spine'
-    bl_description = bl_label = 'Import MD Spine json'
+    bl_description = bl_label = 'Import MD Spine json or skel'
     bl_options = {'REGISTER', 'UNDO'}
 
-    filename_ext = '*.json;.*.spine-json;*.asset'
-    filter_glob: StringProperty(default='*.json;.*.spine-json;*.asset', options={'HIDDEN'})
+    filename_ext = '*.json;.*.spine-json;*.skel;*.skel.bytes;*.asset'
+    filter_glob: StringProperty(default='*.json;.*.spine-json;*.skel;*.skel.bytes;*.asset', options={'HIDDEN'})
     filepath: StringProperty(name='File Path', maxlen=1024)
 
     def execute(self, context):
         self.report({'INFO'}, f'[md_spine_tools] Finished importing {self.filepath}')
         MDST_SETTINGS.last_import = self.filepath
         scene = context.scene
-        scene.mdst_spine.spine_ref = bpy.data.texts.load(self.filepath)
-        data = load_json(scene.mdst_spine.spine_ref.as_string())
+        # binary skeletons stay on disk, there is no text datablock for them
+        if is_binary_skeleton(self.filepath):
+            scene.mdst_spine.spine_ref = None
+            scene.mdst_spine.spine_path = self.filepath
+        else:
+            scene.mdst_spine.spine_ref = bpy.data.texts.load(self.filepath)
+            scene.mdst_spine.spine_path = ''
+        document = load_skeleton(scene.mdst_spine)
         scene.mdst_spine.animation_list.clear()
-        for i, animation in enumerate(data.get('animations', {}).items()):
-            scene.mdst_spine.animation_list.append((animation[0], animation[0], '', i))
+        for i, animation in enumerate(document.animation_names):
+            scene.mdst_spine.animation_list.append((animation, animation, '', i))
             # select the last animation
-            scene.mdst_spine.animation = animation[0]
+            scene.mdst_spine.animation = animation
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -106,6 +117,10 @@ class MDST_OT_LoadSpine(Operator):
         load_spine(mdst_spine)
         if mdst_spine.chk_auto_load_animation:
             load_animation(mdst_spine)
+            if mdst_spine.chk_bake_constraints:
+                bake_constraints(mdst_spine)
+            if mdst_spine.chk_reduce_keys:
+                reduce_actions(mdst_spine.reduce_tolerance)
         mdst_spine.spine_loaded = True
         return {'FINISHED'}
 
@@ -141,6 +156,32 @@ class MDST_OT_LoadAnimation(Operator):
         delete_helper(['actions'])
         mdst_spine = context.scene.mdst_spine
         load_animation(mdst_spine)
+        if mdst_spine.chk_bake_constraints:
+            bake_constraints(mdst_spine)
+        if mdst_spine.chk_reduce_keys:
+            reduce_actions(mdst_spine.reduce_tolerance)
+        return {'FINISHED'}
+
+
+class MDST_OT_BakeConstraints(Operator):
+    bl_idname = 'md_spine_tools.bake_constraints'
+    bl_description = bl_label = 'Bake Spine Constraints into the loaded Animation'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        count = bake_constraints(context.scene.mdst_spine)
+        self.report({'INFO'}, f'[md_spine_tools] Baked constraints into {count} animations')
+        return {'FINISHED'}
+
+
+class MDST_OT_ReduceKeys(Operator):
+    bl_idname = 'md_spine_tools.reduce_keys'
+    bl_description = bl_label = 'Remove keys the animation curves reproduce within tolerance'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        removed = reduce_actions(context.scene.mdst_spine.reduce_tolerance)
+        self.report({'INFO'}, f'[md_spine_tools] Removed {removed} keys')
         return {'FINISHED'}
 
 
@@ -154,6 +195,17 @@ class MDST_OT_ClearAnimation(Operator):
         return {'FINISHED'}
 
 
+class MDST_OT_ClearCache(Operator):
+    bl_idname = 'md_spine_tools.clear_cache'
+    bl_description = bl_label = 'Clear MD Spine Cache'
+    bl_options = {'REGISTER'}
+
+    def execute(self, _):
+        count = clear_cache()
+        self.report({'INFO'}, f'[md_spine_tools] Cleared {count} cached skeletons')
+        return {'FINISHED'}
+
+
 class MDST_PT_Tools(Panel):
     bl_category = 'MDST Spine Tools'
     bl_label = 'Import'
@@ -165,6 +217,9 @@ class MDST_PT_Tools(Panel):
         row = self.layout.row(align=True)
         spine = context.scene.mdst_spine
         row.template_ID(spine, 'spine_ref', open='md_spine_tools.import_spine')
+        if not spine.spine_ref and spine.spine_path:
+            row = self.layout.row(align=True)
+            row.prop(spine, 'spine_path', text='')
         self.layout.label(text='Atlas:', icon='UV')
         row = self.layout.row(align=True)
         row.template_ID(spine, 'atlas_ref', open='md_spine_tools.import_atlas')
@@ -178,16 +233,24 @@ class MDST_PT_Tools(Panel):
         row = self.layout.row(align=True)
         row.prop(spine, 'chk_separate_material')
         row = self.layout.row(align=True)
+        row.prop(spine, 'chk_pool_material')
+        row = self.layout.row(align=True)
+        row.prop(spine, 'merge_mode')
+        row = self.layout.row(align=True)
+        row.prop(spine, 'clipping_mode')
+        row = self.layout.row(align=True)
         row.prop(spine, 'chk_generate_ik_pole')
         self.layout.label(text='Load:', icon='IMPORT')
         row = self.layout.row(align=True)
         row.operator('md_spine_tools.load_spine', icon='MESH_CUBE', text='Load Spine')
-        if not spine.spine_ref or not spine.atlas_ref:
+        if not (spine.spine_ref or spine.spine_path) or not spine.atlas_ref:
             row.enabled = False
         row = self.layout.row(align=True)
         row.operator('md_spine_tools.toggle_armature_constrain', icon='MODIFIER_ON' if spine.armature_constrain else 'MODIFIER_OFF', text='Toggle Armature Constrain')
         if not context.scene.mdst_spine.spine_loaded:
             row.enabled = False
+        row = self.layout.row(align=True)
+        row.operator('md_spine_tools.clear_cache', icon='TRASH', text='Clear Cache')
 
 
 class MDST_PT_Animation(Panel):
@@ -197,23 +260,36 @@ class MDST_PT_Animation(Panel):
     bl_region_type = 'UI'
 
     def draw(self, context):
-        if context.scene.mdst_spine.spine_ref and context.scene.mdst_spine.chk_separate_material:
+        if (context.scene.mdst_spine.spine_ref or context.scene.mdst_spine.spine_path) and (context.scene.mdst_spine.chk_separate_material or context.scene.mdst_spine.chk_pool_material or context.scene.mdst_spine.merge_mode != 'NONE'):
             if context.scene.mdst_spine.animation_list:
                 row = self.layout.row(align=True)
                 row.prop(context.scene.mdst_spine, 'chk_create_static_action')
                 row = self.layout.row(align=True)
+                row.prop(context.scene.mdst_spine, 'chk_import_all_animations')
+                row = self.layout.row(align=True)
+                row.prop(context.scene.mdst_spine, 'chk_bake_constraints')
+                row = self.layout.row(align=True)
                 row.prop(context.scene.mdst_spine, 'animation', text='', icon='RENDER_ANIMATION')
                 row = self.layout.row(align=True)
                 row.operator('md_spine_tools.load_animation', icon='ANIM', text='Load Animation')
                 if not context.scene.mdst_spine.spine_loaded:
                     row.enabled = False
                 row = self.layout.row(align=True)
+                row.operator('md_spine_tools.bake_constraints', icon='CONSTRAINT_BONE', text='Bake Constraints')
+                if not context.scene.mdst_spine.spine_loaded:
+                    row.enabled = False
+                row = self.layout.row(align=True)
+                row.prop(context.scene.mdst_spine, 'chk_reduce_keys')
+                row.prop(context.scene.mdst_spine, 'reduce_tolerance')
+                row = self.layout.row(align=True)
+                row.operator('md_spine_tools.reduce_keys', icon='IPO_LINEAR', text='Reduce Keys')
+                row = self.layout.row(align=True)
                 row.operator('md_spine_tools.clear_animation', icon='BRUSH_DATA', text='Clear All Animation')
             else:
                 self.layout.label(text='No Data', icon='ERROR')
 
 
-classes = [MDSTSpine, MDST_OT_ImportSpine, MDST_OT_ImportAtlas, MDST_OT_LoadSpine, MDST_OT_ApplyPose, MDST_OT_ToggleArmatureConstrain, MDST_OT_LoadAnimation, MDST_OT_ClearAnimation, MDST_PT_Tools, MDST_PT_Animation]
+classes = [MDSTSpine, MDST_OT_ImportSpine, MDST_OT_ImportAtlas, MDST_OT_LoadSpine, MDST_OT_ApplyPose, MDST_OT_ToggleArmatureConstrain, MDST_OT_LoadAnimation, MDST_OT_BakeConstraints, MDST_OT_ReduceKeys, MDST_OT_ClearAnimation, MDST_OT_ClearCache, MDST_PT_Tools, MDST_PT_Animation]
 
 
 def register():
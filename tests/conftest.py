@@ -0,0 +1,27 @@
+# The parsers and solvers only touch bpy, bmesh and mathutils inside the functions that build Blender data,
+#   so outside of Blender empty modules stand in for them and the repository is imported as md_spine_tools.
+# Settings and the model cache go to a temporary data dir instead of the user's.
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import bpy  # noqa: F401
+except ImportError:
+    for name in ('bpy', 'bmesh', 'mathutils'):
+        sys.modules[name] = types.ModuleType(name)
+    os.environ['XDG_DATA_HOME'] = tempfile.mkdtemp(prefix='mdst-tests-')
+
+if 'md_spine_tools' not in sys.modules:
+    try:
+        import md_spine_tools  # noqa: F401
+    except ImportError:
+        spec = importlib.util.spec_from_file_location(
+            'md_spine_tools', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT]
+        )
+        module = sys.modules['md_spine_tools'] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
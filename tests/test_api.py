@@ -0,0 +1,39 @@
+# runs inside Blender's python with the add-on installed, e.g. blender -b --python-expr "import pytest; pytest.main(['tests'])"
+import json
+
+import pytest
+
+# bpy.types only exists in Blender, conftest.py puts an empty bpy in place outside of it
+pytest.importorskip('bpy.types')
+md_spine_tools = pytest.importorskip('md_spine_tools')
+
+
+SKELETON = {
+    'skeleton': {'spine': '4.0.64'},
+    'bones': [{'name': 'root'}, {'name': 'body', 'parent': 'root', 'length': 10}],
+    'slots': [],
+    'skins': [{'name': 'default', 'attachments': {}}],
+    'animations': {'idle': {'bones': {'body': {'rotate': [{'value': 0}, {'time': 1, 'value': 30}]}}}},
+}
+
+
+@pytest.fixture
+def spine_files(tmp_path):
+    spine_path, atlas_path = tmp_path / 'winda.json', tmp_path / 'winda.atlas.txt'
+    spine_path.write_text(json.dumps(SKELETON), encoding='utf-8')
+    atlas_path.write_text('', encoding='utf-8')
+    return spine_path, atlas_path
+
+
+def test_load_skeleton_json_by_path(spine_files):
+    from md_spine_tools.mdst_io import load_skeleton
+
+    document = load_skeleton(md_spine_tools.ImportOptions(spine_path=str(spine_files[0])))
+    assert document.data['bones'] == SKELETON['bones']
+    assert document.animation_names == ['idle']
+
+
+def test_import_spine_json_by_path(spine_files):
+    result = md_spine_tools.import_spine(*spine_files)
+    assert result.armature.name == 'root'
+    assert result.action is not None
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+import pytest
+
+from md_spine_tools.mdst_bake import IkConstraint, Pose, TransformConstraint, sample
+from md_spine_tools.mdst_io import Bone, Skeleton
+
+
+def pose(*bones):
+    bones = [Bone(idx, dict(bone_data)) for idx, bone_data in enumerate(bones)]
+    skeleton = Skeleton(bones)
+    return bones, skeleton, Pose(skeleton, skeleton.local)
+
+
+def rotation(world):
+    return math.degrees(math.atan2(world[2], world[0]))
+
+
+def tip(world, length):
+    a, b, c, d, x, y = world
+    return x + a * length, y + c * length
+
+
+def test_sample():
+    keys = [{'time': 0.5, 'value': 0}, {'time': 1, 'value': 10, 'curve': 'stepped'}, {'time': 2, 'value': 20}]
+    assert sample(keys, 0, 'value', 7) == 7
+    assert sample(keys, 0.75, 'value', 7) == pytest.approx(5)
+    assert sample(keys, 1.5, 'value', 7) == 10
+    assert sample(keys, 3, 'value', 7) == 20
+    # symmetric ease, the second channel's curve follows the first's four values
+    keys = [{'time': 0, 'a': 0, 'b': 0, 'curve': [0, 0, 1, 1, 0.25, 0, 0.75, 10]}, {'time': 1, 'a': 1, 'b': 10}]
+    assert sample(keys, 0.5, 'b', 0, 1) == pytest.approx(5, abs=1e-4)
+    assert sample(keys, 0.25, 'b', 0, 1) < 2.5
+
+
+ONE_BONE = (
+    {'name': 'root'},
+    {'name': 'arm', 'parent': 'root', 'length': 10},
+    {'name': 'target', 'parent': 'root', 'x': 0, 'y': 10},
+)
+
+
+def test_ik_one_bone():
+    bones, skeleton, current = pose(*ONE_BONE)
+    IkConstraint({'name': 'ik', 'bones': ['arm'], 'target': 'target'}, skeleton.index, bones, {}).apply(current, 0)
+    assert rotation(current.world[1]) == pytest.approx(90)
+    assert current.local[1, 2] == pytest.approx(90)
+
+
+def test_ik_one_bone_mix_and_stretch():
+    bones, skeleton, current = pose(*ONE_BONE)
+    ik_data = {'name': 'ik', 'bones': ['arm'], 'target': 'target', 'mix': 0.5}
+    IkConstraint(ik_data, skeleton.index, bones, {}).apply(current, 0)
+    assert rotation(current.world[1]) == pytest.approx(45)
+
+    bones, skeleton, current = pose(*ONE_BONE[:2], {'name': 'target', 'parent': 'root', 'x': 30})
+    ik_data = {'name': 'ik', 'bones': ['arm'], 'target': 'target', 'stretch': True}
+    IkConstraint(ik_data, skeleton.index, bones, {}).apply(current, 0)
+    assert current.local[1, 3] == pytest.approx(3)
+    assert tip(current.world[1], 10) == pytest.approx((30, 0))
+
+
+def test_ik_animated_mix():
+    bones, skeleton, current = pose(*ONE_BONE)
+    animation = {'ik': {'ik': [{'mix': 0}, {'time': 1, 'mix': 1}]}}
+    constraint = IkConstraint({'name': 'ik', 'bones': ['arm'], 'target': 'target'}, skeleton.index, bones, animation)
+    constraint.apply(current, 0)
+    assert rotation(current.world[1]) == pytest.approx(0)
+    constraint.apply(current, 1)
+    assert rotation(current.world[1]) == pytest.approx(90)
+
+
+# elbow at (10, 0) bending positive, at (0, 10) bending negative
+@pytest.mark.parametrize('bend, elbow', [(True, (10, 0)), (False, (0, 10))])
+def test_ik_two_bones(bend, elbow):
+    bones, skeleton, current = pose(
+        {'name': 'root'},
+        {'name': 'upper', 'parent': 'root', 'length': 10},
+        {'name': 'lower', 'parent': 'upper', 'x': 10, 'length': 10},
+        {'name': 'target', 'parent': 'root', 'x': 10, 'y': 10},
+    )
+    ik_data = {'name': 'ik', 'bones': ['upper', 'lower'], 'target': 'target', 'bendPositive': bend}
+    IkConstraint(ik_data, skeleton.index, bones, {}).apply(current, 0)
+    assert tuple(current.world[2, 4:]) == pytest.approx(elbow, abs=1e-6)
+    assert tip(current.world[2], 10) == pytest.approx((10, 10), abs=1e-6)
+
+
+FOLLOWER = (
+    {'name': 'root'},
+    {'name': 'follower', 'parent': 'root', 'rotation': 10, 'x': 1},
+    {'name': 'target', 'parent': 'root', 'x': 5, 'y': 5, 'rotation': 90, 'scaleX': 2},
+)
+
+
+def test_transform_world():
+    bones, skeleton, current = pose(*FOLLOWER)
+    TransformConstraint({'name': 'tc', 'bones': ['follower'], 'target': 'target', 'x': 2}, skeleton.index, {}).apply(current, 0)
+    # the offset is in the target's space, rotated 90 degrees and scaled 2
+    np.testing.assert_allclose(current.world[1], [0, -1, 2, 0, 5, 9], atol=1e-9)
+    np.testing.assert_allclose(current.local[1], [5, 9, 90, 2, 1, 0, 0], atol=1e-9)
+
+
+def test_transform_world_mix():
+    bones, skeleton, current = pose(*FOLLOWER)
+    tk_data = {'name': 'tc', 'bones': ['follower'], 'target': 'target', 'mixRotate': 0, 'mixX': 0.5, 'mixScaleX': 0, 'mixShearY': 0}
+    TransformConstraint(tk_data, skeleton.index, {}).apply(current, 0)
+    # mixY follows mixX when omitted
+    assert tuple(current.world[1, 4:]) == pytest.approx((3, 2.5))
+    assert current.local[1, 2] == pytest.approx(10)
+
+
+@pytest.mark.parametrize('relative, expected', [
+    (False, [5, 5, 90, 2, 1, 0, 0]),
+    (True, [6, 5, 100, 2, 1, 0, 0]),
+])
+def test_transform_local(relative, expected):
+    bones, skeleton, current = pose(*FOLLOWER)
+    tk_data = {'name': 'tc', 'bones': ['follower'], 'target': 'target', 'local': True, 'relative': relative}
+    TransformConstraint(tk_data, skeleton.index, {}).apply(current, 0)
+    np.testing.assert_allclose(current.local[1], expected, atol=1e-9)
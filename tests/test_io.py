@@ -0,0 +1,250 @@
+import json
+
+import numpy as np
+import pytest
+
+from md_spine_tools.mdst_io import (
+    INTERPOLATION_ENUM, Bone, Skeleton, SpineDocument, clip_triangles, group_influences, load_atlas, reduce_keys,
+    triangulate_polygon
+)
+
+
+def skeleton(*bones):
+    return Skeleton([Bone(idx, dict(bone_data)) for idx, bone_data in enumerate(bones)])
+
+
+# parent rotated 90 degrees and scaled 2, child 10 along the parent's x axis
+@pytest.mark.parametrize('mode, matrix', [
+    ('normal', [0, -2, 2, 0]),
+    ('onlyTranslation', [1, 0, 0, 1]),
+    ('noRotationOrReflection', [2, 0, 0, 2]),
+    ('noScale', [0, -1, 1, 0]),
+    ('noScaleOrReflection', [0, -1, 1, 0]),
+])
+def test_inherit_modes(mode, matrix):
+    bones = skeleton(
+        {'name': 'root', 'rotation': 90, 'scaleX': 2, 'scaleY': 2},
+        {'name': 'child', 'parent': 'root', 'x': 10, 'transform': mode},
+    )
+    np.testing.assert_allclose(bones.world[1], matrix + [0, 20], atol=1e-9)
+
+
+@pytest.mark.parametrize('mode, d', [('noScale', -1), ('noScaleOrReflection', 1), ('normal', -1)])
+def test_inherit_reflection(mode, d):
+    bones = skeleton({'name': 'root', 'scaleY': -1}, {'name': 'child', 'parent': 'root', 'transform': mode})
+    np.testing.assert_allclose(bones.world[1, :4], [1, 0, 0, d], atol=1e-9)
+
+
+def test_solve_levels():
+    bones = skeleton(
+        {'name': 'root', 'x': 1, 'y': 2},
+        {'name': 'upper', 'parent': 'root', 'x': 10, 'rotation': 90, 'length': 5},
+        {'name': 'lower', 'parent': 'upper', 'x': 5, 'rotation': 90, 'scaleX': 3},
+    )
+    assert bones.levels[0].tolist() == [0] and bones.levels[2].tolist() == [2]
+    np.testing.assert_allclose(bones.world[2], [-3, 0, 0, -1, 11, 7], atol=1e-9)
+    upper = bones.bones[1]
+    assert (upper.abs_x, upper.abs_y) == pytest.approx((11, 2))
+    assert (upper.dx, upper.dy) == pytest.approx((0, 5), abs=1e-9)
+
+    # an animated pose solves from the same hierarchy
+    local = bones.local.copy()
+    local[1, 2] = 0
+    np.testing.assert_allclose(bones.solve(local)[2], [0, -1, 3, 0, 16, 2], atol=1e-9)
+
+
+ATLAS_40 = '''
+pages.png
+size: 64,32
+format: RGBA8888
+filter: Linear,Linear
+repeat: none
+head
+  rotate: true
+  xy: 2, 4
+  size: 10, 20
+  orig: 12, 22
+  offset: 1, 1
+  index: -1
+eye
+  rotate: false
+  xy: 20, 4
+  size: 8, 8
+  orig: 8, 8
+  offset: 0, 0
+  index: 0
+eye
+  rotate: false
+  xy: 30, 4
+  size: 8, 8
+  orig: 8, 8
+  offset: 0, 0
+  index: 1
+
+pages2.png
+size: 16,16
+format: RGBA8888
+filter: Nearest,Linear
+repeat: none
+body
+  rotate: false
+  xy: 0, 0
+  size: 16, 16
+  orig: 16, 16
+  offset: 0, 0
+  index: -1
+'''
+
+ATLAS_41 = '''pages.png
+\tsize: 64, 32
+\tfilter: Linear, Linear
+\tpma: true
+\tscale: 0.5
+head
+\tbounds: 2, 4, 10, 20
+\toffsets: 1, 1, 12, 22
+\trotate: 90
+body
+\tbounds: 20, 4, 16, 16
+'''
+
+
+def test_load_atlas_40():
+    pages, regions = load_atlas(ATLAS_40)
+    assert [page.image for page in pages] == ['pages.png', 'pages2.png']
+    assert (pages[0].size_x, pages[0].size_y) == (64, 32)
+    assert (pages[1].filter_x, pages[1].filter_y) == ('Nearest', 'Linear')
+    head = regions['head']
+    assert (head.rotate, head.xy, head.size, head.orig, head.offset) == (90, [2, 4], [10, 20], [12, 22], [1, 1])
+    assert head.atlas_image is pages[0]
+    # indexed sequences keep their first region
+    assert regions['eye'].index == 0 and len(pages[0].atlas) == 3
+    assert regions['body'].atlas_image is pages[1]
+
+
+def test_load_atlas_41():
+    pages, regions = load_atlas(ATLAS_41)
+    assert pages[0].pma is True and pages[0].scale == 0.5
+    head, body = regions['head'], regions['body']
+    assert (head.rotate, head.xy, head.size, head.offset, head.orig) == (90, [2, 4], [10, 20], [1, 1], [12, 22])
+    # without offsets the region is not stripped
+    assert (body.rotate, body.offset, body.orig) == (0, [0, 0], [16, 16])
+
+
+DOCUMENT = {
+    'skeleton': {'spine': '4.0.64', 'fps': 30},
+    'bones': [{'name': 'root'}],
+    'animations': {
+        'walk': {'events': [{'time': 0, 'name': 'step', 'string': 'a } { "quoted" \\ brace'}]},
+        'idle': {'bones': {'root': {'rotate': [{'value': 1}, {'time': 1, 'value': {'nested': []}}]}}},
+    },
+    'events': {'step': {}},
+}
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_document_spans(indent):
+    text = json.dumps(DOCUMENT, indent=indent)
+    document = SpineDocument(text)
+    assert document.animation_names == ['walk', 'idle']
+    assert document.data == {k: v for k, v in DOCUMENT.items() if k != 'animations'}
+    for name, (start, end) in document.animation_spans.items():
+        assert json.loads(text[start:end]) == DOCUMENT['animations'][name]
+    assert document.animation() == DOCUMENT['animations']['idle']
+    assert document.animation('walk') == DOCUMENT['animations']['walk']
+
+
+def test_document_bom_and_errors():
+    assert SpineDocument('\ufeff' + json.dumps(DOCUMENT)).animation_names == ['walk', 'idle']
+    with pytest.raises(json.JSONDecodeError):
+        SpineDocument(json.dumps(DOCUMENT)[:-10])
+
+
+def test_document_decoded():
+    document = SpineDocument('', DOCUMENT)
+    assert document.animation_names == ['walk', 'idle']
+    assert document.animation('walk') is DOCUMENT['animations']['walk']
+
+
+LINEAR, CONSTANT, BEZIER = INTERPOLATION_ENUM['LINEAR'], INTERPOLATION_ENUM['CONSTANT'], INTERPOLATION_ENUM['BEZIER']
+
+
+@pytest.mark.parametrize('values, interpolation, keep', [
+    ([0, 1, 2, 3], LINEAR, [0, 3]),
+    ([0, 5, 0], LINEAR, [0, 1, 2]),
+    ([0, 1, 1, 1], LINEAR, [0, 1]),
+    ([0, 0.0005, 0], LINEAR, [0]),
+    ([1, 1, 1, 2, 2], CONSTANT, [0, 3]),
+    ([0, 1, 2, 3], BEZIER, [0, 1, 2, 3]),
+])
+def test_reduce_keys(values, interpolation, keep):
+    co = np.array([(frame, value) for frame, value in enumerate(values)], dtype=np.float32)
+    assert reduce_keys(co, np.full(len(values), interpolation), 0.001) == keep
+
+
+def test_reduce_keys_mixed_interpolation():
+    co = np.array([(0, 0), (1, 0), (2, 1), (3, 2)], dtype=np.float32)
+    # the stepped key before a linear segment stays
+    assert reduce_keys(co, np.array([CONSTANT, LINEAR, LINEAR, LINEAR]), 0.001) == [0, 1, 3]
+
+
+def test_group_influences():
+    vertex = [0, 0, 1, 1, 2, 2, 2]
+    bone = [0, 1, 0, 1, 0, 1, 2]
+    weight = [0.123456, 0.876544, 0.12346, 0.87654, 0.33333, 0.33333, 0.33334]
+    groups = list(group_influences(vertex, bone, weight))
+    # near-identical weights share a group, a thirds split rounds to 0.9999 and its largest weight takes the rest
+    assert groups == [(0, 0.1235, [0, 1]), (0, 0.3333, [2]), (1, 0.3333, [2]), (1, 0.8765, [0, 1]), (2, pytest.approx(0.3334), [2])]
+    sums = np.zeros(3)
+    for _, group_weight, vertices in groups:
+        sums[vertices] += group_weight
+    np.testing.assert_allclose(sums, 1, rtol=0, atol=1e-12)
+
+
+def area(positions, triangles):
+    a, b, c = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    return np.abs((b - a)[:, 0] * (c - a)[:, 1] - (b - a)[:, 1] * (c - a)[:, 0]).sum() / 2
+
+
+def clipped_positions(positions, result):
+    sources, barycentric, _ = result
+    return np.einsum('vk,vkc->vc', barycentric, positions[sources])
+
+
+L_SHAPE = [(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)]
+
+
+def test_triangulate_polygon():
+    triangles = np.array(triangulate_polygon(L_SHAPE))
+    assert len(triangles) == 4
+    assert area(np.array(L_SHAPE, dtype=float), triangles) == pytest.approx(7)
+
+
+def test_clip_inside_concave_polygon():
+    positions = np.array([(0.2, 0.2), (3, 0.5), (0.5, 0.8)])
+    sources, barycentric, triangles = clip_triangles(positions, np.array([[0, 1, 2]]), L_SHAPE)
+    assert triangles.tolist() == [[0, 1, 2]]
+    np.testing.assert_allclose(barycentric, np.eye(3))
+
+
+def test_clip_across_notch():
+    positions = np.array([(0.5, 3.5), (3.5, 0.5), (0.5, 0.5)])
+    result = clip_triangles(positions, np.array([[0, 1, 2]]), L_SHAPE)
+    # the corners are inside, the part over the notch (1, 1), (3, 1), (1, 3) is cut away
+    assert area(clipped_positions(positions, result), result[2]) == pytest.approx(4.5 - 2)
+
+
+def test_clip_welds_vertices():
+    grid = np.array([(x, y) for y in range(3) for x in range(3)], dtype=float)
+    triangles = np.array([[0, 1, 4], [1, 2, 5], [3, 4, 7], [4, 5, 8], [0, 4, 3], [1, 5, 4], [3, 7, 6], [4, 8, 7]])
+    result = clip_triangles(grid, triangles, [(0.5, 0.5), (1.5, 0.5), (1.5, 1.5), (0.5, 1.5)])
+    positions = clipped_positions(grid, result)
+    assert area(positions, result[2]) == pytest.approx(1)
+    # the 4 clip corners, 4 grid edge crossings and the grid vertex inside, each once
+    assert len(positions) == len(np.unique(np.round(positions, 6), axis=0)) == 9
+
+
+def test_clip_outside():
+    positions = np.array([(5, 5), (6, 5), (5, 6)], dtype=float)
+    sources, barycentric, triangles = clip_triangles(positions, np.array([[0, 1, 2]]), L_SHAPE)
+    assert len(sources) == len(triangles) == 0
@@ -0,0 +1,199 @@
+import struct
+
+import pytest
+
+from md_spine_tools.mdst_io import load_skeleton
+from md_spine_tools.mdst_skel import CURVE_BEZIER, CURVE_LINEAR, CURVE_STEPPED, SkeletonBinary, SkeletonInput, read_skeleton_binary
+
+
+# writes the primitives SkeletonInput reads, big endian like the spine runtimes
+class SkeletonOutput:
+    def __init__(self):
+        self.data = bytearray()
+
+    def pack(self, fmt, *values):
+        self.data += struct.pack(fmt, *values)
+        return self
+
+    def byte(self, value):
+        return self.pack('>B', value)
+
+    def bool(self, value):
+        return self.byte(1 if value else 0)
+
+    def int(self, value):
+        return self.pack('>i', value)
+
+    def floats(self, *values):
+        return self.pack('>%df' % len(values), *values)
+
+    def varint(self, value, optimize_positive=True):
+        if not optimize_positive:
+            value = (value << 1) ^ (value >> 31)
+        value &= 0xFFFFFFFF
+        while True:
+            if value < 0x80:
+                return self.byte(value)
+            self.byte(value & 0x7F | 0x80)
+            value >>= 7
+
+    def string(self, value):
+        if value is None:
+            return self.varint(0)
+        encoded = value.encode('utf-8')
+        self.varint(len(encoded) + 1)
+        self.data += encoded
+        return self
+
+    def color(self, value):
+        return self.pack('>I', int(value, 16))
+
+
+# root, arm; slot body on arm with a weighted mesh and a region, one ik constraint and the event mesh
+# animation idle: arm rotate (bezier then linear), body rgba (stepped), mesh deform, draw order and the event
+def write_skeleton(version):
+    out = SkeletonOutput()
+    out.pack('>q', 1234).string(version).floats(-10, -20, 100, 200).bool(True)
+    out.floats(30).string('./images/').string(None)
+    strings = ['mesh', 'region']
+    out.varint(len(strings))
+    for value in strings:
+        out.string(value)
+
+    out.varint(2)
+    out.string('root').floats(0, 0, 0, 1, 1, 0, 0, 0).varint(0).bool(False).color('989898ff')
+    out.string('arm').varint(0).floats(30, 5, 6, 2, 1, 0, 0, 40).varint(3).bool(False).color('ff0000ff')
+
+    out.varint(1)
+    out.string('body').varint(1).color('ffffff80').int(-1).varint(2).varint(0)
+
+    out.varint(1)
+    out.string('reach').varint(0).bool(False).varint(1).varint(1).varint(0)
+    out.floats(0.5, 2).pack('>b', -1).bool(False).bool(True).bool(False)
+    out.varint(0)
+    out.varint(0)
+
+    # default skin: body holds a weighted 2 vertex mesh and a region
+    out.varint(1).varint(0).varint(2)
+    out.varint(1).varint(0).byte(2).varint(1).color('ffffffff').varint(2)
+    out.floats(0, 0, 1, 1).varint(3).pack('>3H', 0, 1, 0).bool(True)
+    out.varint(1).varint(1).floats(1, 2, 1)
+    out.varint(2).varint(0).floats(3, 4, 0.25).varint(1).floats(5, 6, 0.75)
+    out.varint(0)
+    if version.startswith('4.1'):
+        out.bool(False)
+    out.varint(2).pack('>2H', 0, 1).floats(8, 8)
+    out.varint(2).varint(0).byte(0).varint(2).floats(0, 1, 2, 1, 1, 16, 32).color('ffffffff')
+    if version.startswith('4.1'):
+        out.bool(True).varint(3).varint(1).varint(2).varint(0)
+    out.varint(0)
+
+    out.varint(1)
+    out.varint(1).varint(-7, False).floats(0.5).string('hit').string(None)
+
+    out.varint(1)
+    out.string('idle').varint(0)
+    # slots: rgba, two stepped frames
+    out.varint(1).varint(0).varint(1).byte(1).varint(2).varint(0)
+    out.floats(0).byte(255).byte(0).byte(0).byte(255)
+    out.floats(1).byte(0).byte(0).byte(255).byte(128).byte(CURVE_STEPPED)
+    # bones: arm rotate, bezier to the second key, linear to the third
+    out.varint(1).varint(1).varint(1).byte(0).varint(3).varint(1)
+    out.floats(0, 0)
+    out.floats(0.5, 90).byte(CURVE_BEZIER).floats(0.1, 10, 0.4, 80)
+    out.floats(1, 45).byte(CURVE_LINEAR)
+    out.varint(0)
+    out.varint(0)
+    out.varint(0)
+    # deform of body/mesh in the default skin
+    out.varint(1).varint(0).varint(1).varint(0).varint(1).varint(1)
+    if version.startswith('4.1'):
+        out.byte(0)
+    out.varint(2).varint(0).floats(0).varint(2).varint(1).floats(0.5, -0.5)
+    out.floats(1).byte(CURVE_LINEAR).varint(0)
+    # draw order, event
+    out.varint(1).floats(0.25).varint(1).varint(0).varint(-1 & 0xFFFFFFFF)
+    out.varint(1).floats(0.75).varint(0).varint(-7, False).floats(0.5).bool(True).string('boom')
+    return bytes(out.data)
+
+
+def test_varint():
+    out = SkeletonOutput().varint(0).varint(300).varint(-1 & 0xFFFFFFFF).varint(-3, False).varint(2 ** 31 - 1)
+    skeleton_input = SkeletonInput(bytes(out.data))
+    assert [skeleton_input.read_varint() for _ in range(2)] == [0, 300]
+    assert skeleton_input.read_varint() == -1
+    assert skeleton_input.read_varint(False) == -3
+    assert skeleton_input.read_varint() == 2 ** 31 - 1
+    assert skeleton_input.pos == len(out.data)
+
+
+def test_skeleton_header_bones_slots():
+    data = read_skeleton_binary(write_skeleton('4.0.64'))
+    assert data['skeleton'] == {
+        'hash': '1234', 'spine': '4.0.64', 'x': -10, 'y': -20, 'width': 100, 'height': 200, 'fps': 30, 'images': './images/', 'audio': None,
+    }
+    root, arm = data['bones']
+    assert root['name'] == 'root' and 'parent' not in root
+    assert arm == {
+        'name': 'arm', 'parent': 'root', 'rotation': 30, 'x': 5, 'y': 6, 'scaleX': 2, 'scaleY': 1, 'shearX': 0, 'shearY': 0,
+        'length': 40, 'transform': 'noScale', 'skin': False, 'color': 'ff0000ff',
+    }
+    assert data['slots'] == [{'name': 'body', 'bone': 'arm', 'color': 'ffffff80', 'attachment': 'region', 'blend': 'normal'}]
+    assert data['ik'] == [{
+        'name': 'reach', 'order': 0, 'skin': False, 'bones': ['arm'], 'target': 'root', 'mix': 0.5, 'softness': 2,
+        'bendPositive': False, 'compress': False, 'stretch': True, 'uniform': False,
+    }]
+    assert data['events'] == {'mesh': {'int': -7, 'float': 0.5, 'string': 'hit'}}
+
+
+@pytest.mark.parametrize('version', ['4.0.64', '4.1.20'])
+def test_reads_to_the_end(version):
+    data = write_skeleton(version)
+    reader = SkeletonBinary(data)
+    reader.read()
+    assert reader.input.pos == len(data)
+
+
+@pytest.mark.parametrize('version', ['4.0.64', '4.1.20'])
+def test_skin_attachments(version):
+    attachments = read_skeleton_binary(write_skeleton(version))['skins'][0]['attachments']['body']
+    mesh, region = attachments['mesh'], attachments['region']
+    assert mesh['type'] == 'mesh' and mesh['path'] == 'mesh'
+    assert mesh['uvs'] == [0, 0, 1, 1]
+    assert mesh['triangles'] == [0, 1, 0]
+    assert mesh['vertices'] == [1, 1, 1, 2, 1, 2, 0, 3, 4, 0.25, 1, 5, 6, 0.75]
+    assert mesh['edges'] == [0, 1] and (mesh['width'], mesh['height']) == (8, 8)
+    assert region['type'] == 'region' and 'name' not in region
+    assert [region[k] for k in ['rotation', 'x', 'y', 'scaleX', 'scaleY', 'width', 'height']] == [0, 1, 2, 1, 1, 16, 32]
+    if version.startswith('4.1'):
+        assert region['sequence'] == {'count': 3, 'start': 1, 'digits': 2, 'setup': 0}
+    else:
+        assert 'sequence' not in region
+
+
+@pytest.mark.parametrize('version, deform_key', [('4.0.64', 'deform'), ('4.1.20', 'attachments')])
+def test_animation(version, deform_key):
+    animation = read_skeleton_binary(write_skeleton(version))['animations']['idle']
+    # the curve byte follows the next frame and belongs to the key before it
+    assert animation['slots']['body']['rgba'] == [
+        {'time': 0, 'color': 'ff0000ff', 'curve': 'stepped'}, {'time': 1, 'color': '0000ff80'},
+    ]
+
+    rotate = animation['bones']['arm']['rotate']
+    assert [(key['time'], key['value']) for key in rotate] == [(0, 0), (0.5, 90), (1, 45)]
+    assert rotate[0]['curve'] == pytest.approx([0.1, 10, 0.4, 80])
+    assert 'curve' not in rotate[1] and 'curve' not in rotate[2]
+
+    deform = animation[deform_key]['default']['body']['mesh']
+    if version.startswith('4.1'):
+        deform = deform['deform']
+    assert deform == [{'time': 0, 'offset': 1, 'vertices': [0.5, -0.5]}, {'time': 1}]
+    assert animation['drawOrder'] == [{'time': 0.25, 'offsets': [{'slot': 'body', 'offset': -1}]}]
+    assert animation['events'] == [{'time': 0.75, 'name': 'mesh', 'int': -7, 'float': 0.5, 'string': 'boom'}]
+
+
+def test_load_skeleton_bytes():
+    document = load_skeleton(None, 'winda.skel', write_skeleton('4.0.64'))
+    assert document.animation_names == ['idle']
+    assert [bone['name'] for bone in document.data['bones']] == ['root', 'arm']
+    assert document.animation('idle')['bones']['arm']['rotate'][1]['value'] == 90